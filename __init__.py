@@ -52,6 +52,11 @@ def register():
     bpy.types.Scene.sound_synth_selected = bpy.props.StringProperty()
 
 def unregister():
+    from . import jobs, spatial
+    # Рабочие потоки, таймер опроса и обработчики индекса источников не должны пережить отключение аддона
+    jobs.close_queue(wait=True)
+    spatial.remove_index_handlers()
+
     bpy.utils.unregister_class(SOUND_SYNTH_OT_LoadSound)
     bpy.utils.unregister_class(SOUND_SYNTH_PT_MainPanel)
     del bpy.types.Scene.sound_synth_sounds
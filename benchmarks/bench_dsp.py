@@ -0,0 +1,253 @@
+"""
+Нагрузочные тесты эффектов dsp.py без Blender.
+
+Для каждой комбинации длительности, частоты дискретизации и числа каналов
+генерируется синтетический сигнал (смесь синусов и шума) и замеряются
+apply_reverb, apply_delay (отводы при R = 2/5/10 и с обратной связью), apply_eq,
+apply_pitch_shift, apply_lowpass_filter и полная цепочка process_audio
+(WAV -> эффекты -> WAV 16 бит).
+
+Запуск:
+    python benchmarks/bench_dsp.py --quick                   # 1 и 10 с
+    python benchmarks/bench_dsp.py                           # 1 с ... 10 мин
+    python benchmarks/bench_dsp.py --save-baseline           # записать эталон
+    python benchmarks/bench_dsp.py --baseline benchmarks/baseline.json --threshold 0.2
+
+Результаты (сэмплов/с, кратность реальному времени, пиковая память по
+tracemalloc) пишутся в JSON. Если задан эталон, замеры сравниваются с ним:
+падение скорости или рост пиковой памяти больше порога считается регрессией,
+и скрипт завершается с кодом 1. Эталон зависит от машины, поэтому в
+репозиторий не входит — его записывают локально через --save-baseline.
+
+Ориентир для apply_eq: около 0.5 с на 3 минуты стерео 48 kHz (полка
++3 dB, столько же с полками и пиковой полосой). Каскад выполняется одной
+FFT-свёрткой overlap-save с усечённой IR в несколько сотен отсчётов.
+Рекурсия по секциям через блочный cumsum (как у однополюсных фильтров)
+на тех же данных занимает около 1.8 с, так что FFT-путь оставлен; цель
+в единицы миллисекунд этим не достигается и принята как ограничение.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dsp  # noqa: E402  (модуль аддона без bpy)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "bench_dsp_results.json")
+
+DURATIONS = [1, 10, 60, 600]
+QUICK_DURATIONS = [1, 10]
+FRAME_RATES = [22050, 44100, 48000]
+CHANNELS = [1, 2]
+
+# Короткие замеры повторяются, пока суммарное время не достигнет MIN_TOTAL_TIME
+MIN_TOTAL_TIME = 0.5
+MAX_REPEAT = 100
+
+# Параметры эффектов — типичные ненулевые значения, а не умолчания DSPChainSettings
+# (reverb 300 мс/12 dB, delay 500 мс/6 dB/2 повтора без обратной связи, EQ 0/0 dB):
+# при нулевых усилениях apply_eq не выполняет свёртку, и замер был бы пустым.
+# Задержка без обратной связи замеряется при нескольких числах повторов с длинной
+# задержкой: время не должно зависеть от R. Обратная связь — отдельный случай.
+DELAY_REPETITIONS = [2, 5, 10]
+
+
+def _delay_taps(repetitions):
+    return lambda x, fr: dsp.apply_delay(x, fr, delay_ms=2000, decay_dB=6, repetitions=repetitions)
+
+
+EFFECTS = {
+    "reverb": lambda x, fr: dsp.apply_reverb(x, fr, delay_ms=100, decay_dB=6),
+    **{f"delay_r{r}": _delay_taps(r) for r in DELAY_REPETITIONS},
+    "delay_feedback": lambda x, fr: dsp.apply_delay(x, fr, delay_ms=300, decay_dB=3, feedback=True),
+    "eq": lambda x, fr: dsp.apply_eq(x, fr, low_gain=3.0, high_gain=-2.0),
+    "pitch_shift": lambda x, fr: dsp.apply_pitch_shift(x, fr, semitones=3),
+    "lowpass": lambda x, fr: dsp.apply_lowpass_filter(x, fr, cutoff_frequency=3000),
+}
+
+CHAIN = [
+    ("gain", {"gain_db": -3.0}),
+    ("reverb", {"delay_ms": 100, "decay_dB": 6}),
+    ("delay", {"delay_ms": 300, "decay_dB": 3, "repetitions": 4}),
+    ("eq", {"low_gain": 3.0, "high_gain": -2.0}),
+    ("lowpass", {"cutoff_frequency": 3000}),
+    ("pitch_shift", {"semitones": 3}),
+]
+
+
+def synthetic_signal(seconds, frame_rate, channels, seed=0):
+    """Смесь синусов с разной фазой по каналам и белого шума, амплитуда ~0.5."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * frame_rate), dtype=np.float64) / frame_rate
+    signal = np.empty((len(t), channels), dtype=np.float32)
+    for channel in range(channels):
+        tones = sum(np.sin(2 * np.pi * f * t + channel) for f in (110.0, 440.0, 1760.0)) / 3
+        signal[:, channel] = 0.4 * tones + 0.05 * rng.standard_normal(len(t))
+    return signal
+
+
+def measure(func, make_input, repeat):
+    """
+    Лучшее время из не менее чем repeat запусков (короткие замеры повторяются
+    до MIN_TOTAL_TIME) и пиковая память отдельного запуска под tracemalloc
+    (numpy сообщает ему о своих буферах). Вход создаётся заново перед каждым
+    запуском, так как эффекты меняют буфер на месте.
+    """
+    best, total, runs = float("inf"), 0.0, 0
+    while runs < repeat or (total < MIN_TOTAL_TIME and runs < MAX_REPEAT):
+        args = make_input()
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best, total, runs = min(best, elapsed), total + elapsed, runs + 1
+    args = make_input()
+    tracemalloc.start()
+    try:
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_suite(durations, frame_rates, channel_counts, names, repeat, workdir):
+    results = []
+    for seconds in durations:
+        for frame_rate in frame_rates:
+            for channels in channel_counts:
+                signal = synthetic_signal(seconds, frame_rate, channels)
+                cases = [(name, EFFECTS[name]) for name in names if name in EFFECTS]
+                if "process_audio" in names:
+                    cases.append(("process_audio", None))
+
+                for name, effect in cases:
+                    if effect is not None:
+                        elapsed, peak = measure(effect, lambda: (signal.copy(), frame_rate), repeat)
+                    else:
+                        elapsed, peak = _measure_process_audio(signal, frame_rate, repeat, workdir)
+                    result = {
+                        "name": name,
+                        "seconds": float(seconds),
+                        "frame_rate": frame_rate,
+                        "channels": channels,
+                        "time_s": elapsed,
+                        "samples_per_s": signal.size / elapsed,
+                        "realtime": seconds / elapsed,
+                        "peak_mb": peak / (1024 * 1024),
+                    }
+                    results.append(result)
+                    print(f"{name:>14} | {seconds:>5} с | {frame_rate:>5} Гц | {channels} кан. | "
+                          f"{elapsed:8.3f} с | {result['realtime']:8.1f}x | "
+                          f"{result['samples_per_s'] / 1e6:7.2f} Мсэмпл/с | {result['peak_mb']:8.1f} МБ")
+    return results
+
+
+def _measure_process_audio(signal, frame_rate, repeat, workdir):
+    """Полная цепочка с декодированием: кэш PCM очищается перед каждым запуском."""
+    source = os.path.join(workdir, "source.wav")
+    output = os.path.join(workdir, "output.wav")
+    dsp.write_wav(signal, frame_rate, source)
+    cache = dsp.get_decode_cache()
+
+    def make_input():
+        cache.clear()
+        return source, output, CHAIN, "wav16"
+
+    return measure(dsp.process_audio, make_input, repeat)
+
+
+def case_key(result):
+    return f"{result['name']}|{result['seconds']}|{result['frame_rate']}|{result['channels']}"
+
+
+def compare(results, baseline, threshold):
+    """Возвращает список регрессий относительно эталона (строки для отчёта)."""
+    reference = {case_key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nСравнение с эталоном от {baseline['meta']['date']} (порог {threshold:.0%}):")
+    for result in results:
+        old = reference.get(case_key(result))
+        if old is None:
+            continue
+        speed = result["samples_per_s"] / old["samples_per_s"] - 1
+        memory = result["peak_mb"] / max(old["peak_mb"], 1e-6) - 1
+        status = "ok"
+        if speed < -threshold:
+            status = "РЕГРЕССИЯ скорости"
+        elif memory > threshold and result["peak_mb"] - old["peak_mb"] > 1.0:
+            status = "РЕГРЕССИЯ памяти"
+        if status != "ok":
+            regressions.append(f"{case_key(result)}: {status}")
+        print(f"{case_key(result):>36} | скорость {speed:+7.1%} | память {memory:+7.1%} | {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help=f"только длительности {QUICK_DURATIONS} с")
+    parser.add_argument("--durations", type=float, nargs="+", help="длительности сигналов, с")
+    parser.add_argument("--rates", type=int, nargs="+", default=FRAME_RATES, help="частоты дискретизации, Гц")
+    parser.add_argument("--channels", type=int, nargs="+", default=CHANNELS, help="число каналов")
+    parser.add_argument("--effects", nargs="+", default=list(EFFECTS) + ["process_audio"],
+                        help="замеряемые эффекты")
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов (берётся лучшее время)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="файл JSON с результатами")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="эталон для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение, доля")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как эталон")
+    args = parser.parse_args()
+
+    durations = args.durations or (QUICK_DURATIONS if args.quick else DURATIONS)
+    workdir = tempfile.mkdtemp(prefix="sound_synth_bench_")
+    dsp.init_decode_cache(directory=os.path.join(workdir, "pcm"))
+    try:
+        results = run_suite(durations, args.rates, args.channels, args.effects, args.repeat, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nРезультаты сохранены: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Эталон сохранён: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Эталон {args.baseline} не найден, сравнение пропущено (см. --save-baseline)")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print(f"\nНайдено регрессий: {len(regressions)}")
+        return 1
+    print("\nРегрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
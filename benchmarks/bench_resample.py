@@ -0,0 +1,78 @@
+"""
+Сравнение полифазной передискретизации dsp.resample с pydub set_frame_rate
+(audioop.ratecv), на который опирались apply_pitch_shift и ProcessSound.
+
+Запуск без Blender:  python benchmarks/bench_resample.py [--seconds 30]
+
+Для каждой пары частот выводится время и два показателя качества:
+- SNR синуса 1 kHz относительно аналитического сигнала на новой частоте;
+- подавление наложения: уровень синуса выше новой частоты Найквиста,
+  который должен быть полностью вырезан (чем ниже, тем лучше).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dsp  # noqa: E402  (модуль аддона без bpy)
+
+RATE_PAIRS = [(44100, 48000), (48000, 44100), (22050, 44100), (44100, 22050), (48000, 16000)]
+
+
+def sine(frequency, frame_rate, seconds, channels=2):
+    t = np.arange(int(frame_rate * seconds)) / frame_rate
+    return np.repeat((0.5 * np.sin(2 * np.pi * frequency * t))[:, None], channels, axis=1).astype(np.float32)
+
+
+def pydub_resample(samples, frame_rate, target_rate):
+    segment = dsp.array_to_segment(samples, frame_rate).set_frame_rate(target_rate)
+    return dsp.segment_to_array(segment)
+
+
+def poly_resample(samples, frame_rate, target_rate):
+    return dsp.resample(samples, frame_rate, target_rate)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def snr_db(result, frequency, target_rate):
+    reference = sine(frequency, target_rate, len(result) / target_rate, result.shape[1])[:len(result)]
+    edge = target_rate // 10  # Краевые эффекты фильтров не учитываются
+    error = result[edge:-edge] - reference[edge:-edge]
+    return 10 * np.log10(np.sum(reference[edge:-edge] ** 2) / max(np.sum(error ** 2), 1e-30))
+
+
+def alias_db(result):
+    return 20 * np.log10(max(np.sqrt(np.mean(result ** 2)) / (0.5 / np.sqrt(2)), 1e-10))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30.0, help="длина тестового сигнала, с")
+    args = parser.parse_args()
+
+    print(f"{'частоты':>14} | {'метод':>8} | {'время, с':>9} | {'SNR 1k, dB':>10} | {'наложение, dB':>13}")
+    print("-" * 68)
+    for frame_rate, target_rate in RATE_PAIRS:
+        tone = sine(1000, frame_rate, args.seconds)
+        # Синус выше новой частоты Найквиста: после понижения частоты его быть не должно
+        alias_frequency = min(1.3 * target_rate / 2, 0.97 * frame_rate / 2)
+        above = sine(alias_frequency, frame_rate, args.seconds) if target_rate < frame_rate else None
+
+        for name, func in (("pydub", pydub_resample), ("poly", poly_resample)):
+            func(tone[:frame_rate], frame_rate, target_rate)  # Прогрев (кэш банков фильтров)
+            result, elapsed = timed(func, tone, frame_rate, target_rate)
+            alias = f"{alias_db(func(above, frame_rate, target_rate)):13.1f}" if above is not None else f"{'-':>13}"
+            print(f"{frame_rate:>6}->{target_rate:<6} | {name:>8} | {elapsed:9.3f} | "
+                  f"{snr_db(result, 1000, target_rate):10.1f} | {alias}")
+
+
+if __name__ == "__main__":
+    main()
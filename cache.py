@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    from . import dsp
+except ImportError:  # Вне Blender (tests): модуль импортирован как верхнеуровневый
+    import dsp
+
+RENDER_CACHE = None  # Глобальный кэш обработанных файлов, инициализируется в init_cache()
+
+DEFAULT_CACHE_SIZE_MB = 1024
+
+
+class RenderCache:
+    """
+    Кэш обработанного аудио с адресацией по содержимому.
+
+    Ключ — SHA-256 от (хэш содержимого исходного файла, цепочка эффектов с
+    параметрами, формат вывода), поэтому разные наборы параметров не
+    перезаписывают друг друга, а возврат ползунка к прежнему значению
+    сразу находит готовый файл. Время последнего обращения хранится в mtime
+    файла; при превышении max_bytes удаляются давно не использованные записи (LRU).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._digests = {}  # (путь, mtime, размер) -> SHA-256 содержимого
+        # Незавершённые рендеры пишутся в подкаталог и не участвуют в вытеснении
+        self.incoming = os.path.join(directory, "incoming")
+        os.makedirs(self.incoming, exist_ok=True)
+        print(f"[DEBUG] Кэш обработанного аудио: {directory}, лимит {max_bytes // (1024 * 1024)} МБ")
+
+    def file_digest(self, filepath):
+        """Хэш содержимого файла; пересчитывается только при изменении mtime/размера."""
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        memo_key = (path, stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._digests[memo_key] = digest
+        return digest
+
+    def _normalize(self, value):
+        """Приводит параметры к JSON; пути к файлам (например, IR) заменяются хэшем содержимого."""
+        if isinstance(value, dict):
+            return {k: self._normalize(v) for k, v in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            return [self._normalize(v) for v in value]
+        if isinstance(value, str) and os.path.isfile(value):
+            return "file:" + self.file_digest(value)
+        if isinstance(value, float):
+            return round(value, 6)
+        return value
+
+    def key(self, source_filepath, effects, output_format, output_rate=None):
+        """Ключ записи; None, если цепочка содержит функции, которые нельзя хэшировать."""
+        if any(callable(effect) for effect in effects):
+            return None
+        parts = [self.file_digest(source_filepath), self._normalize(effects), output_format]
+        if output_rate:
+            parts.append(int(output_rate))
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key, output_format):
+        return os.path.join(self.directory, f"{key}.{dsp.output_extension(output_format)}")
+
+    def intermediate_for(self, filepath):
+        """
+        Для файла, ранее отрендеренного этим кэшем, возвращает его float32 .npy-копию
+        (если она ещё не вытеснена), иначе сам filepath. Повторная обработка
+        результата тогда не декодирует MP3 и не теряет качество.
+        """
+        path = os.path.abspath(filepath)
+        stem, extension = os.path.splitext(path)
+        if os.path.dirname(path) != os.path.abspath(self.directory) or extension == ".npy":
+            return filepath
+        intermediate = stem + ".npy"
+        if os.path.exists(intermediate) and os.path.exists(dsp.sidecar_path(intermediate)):
+            os.utime(intermediate)
+            return intermediate
+        return filepath
+
+    def lookup(self, key, output_format):
+        """Возвращает путь к готовому файлу (и отмечает обращение) или None."""
+        path = self.path_for(key, output_format)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        print(f"[DEBUG] Кэш: попадание {os.path.basename(path)}")
+        return path
+
+    def store(self, key, output_format, produced_filepath):
+        """Переносит готовый файл в кэш и вытесняет старые записи при превышении лимита."""
+        path = self.path_for(key, output_format)
+        os.replace(produced_filepath, path)
+        if os.path.exists(dsp.sidecar_path(produced_filepath)):
+            os.replace(dsp.sidecar_path(produced_filepath), dsp.sidecar_path(path))
+        self.evict(keep=path)
+        return path
+
+    def render(self, source_filepath, effects, output_format="mp3", progress=None, cancel_event=None,
+               streaming=False, output_rate=None):
+        """
+        Возвращает обработанный файл из кэша или рендерит его через dsp.process_audio.
+        progress, cancel_event, streaming и output_rate передаются в process_audio; при
+        отмене незавершённый файл удаляется, а dsp.ProcessingCancelled пробрасывается дальше.
+        """
+        key = self.key(source_filepath, effects, output_format, output_rate)
+        if key is not None:
+            cached = self.lookup(key, output_format)
+            if cached:
+                return cached
+
+        fd, tmp_path = tempfile.mkstemp(suffix=f".{dsp.output_extension(output_format)}", dir=self.incoming)
+        os.close(fd)
+        # Рядом с результатом сохраняется float32-копия для повторной обработки
+        intermediate = None
+        if key is not None and dsp.output_extension(output_format) != "npy":
+            intermediate = os.path.splitext(tmp_path)[0] + ".npy"
+        try:
+            result = dsp.process_audio(self.intermediate_for(source_filepath), tmp_path, effects, output_format,
+                                       progress=progress, cancel_event=cancel_event,
+                                       intermediate_filepath=intermediate, streaming=streaming,
+                                       output_rate=output_rate)
+        except dsp.ProcessingCancelled:
+            self._discard(tmp_path, intermediate)
+            raise
+        if not result:
+            self._discard(tmp_path, intermediate)
+            return None
+        if key is None:
+            return result
+        if intermediate:
+            self.store(key, "npy", intermediate)
+        return self.store(key, output_format, result)
+
+    def _discard(self, *paths):
+        for path in filter(None, paths):
+            for p in (path, dsp.sidecar_path(path)):
+                if os.path.exists(p):
+                    os.remove(p)
+
+    def entries(self):
+        """Записи кэша: список (mtime, размер, путь)."""
+        result = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path) and not name.endswith(".json"):
+                stat = os.stat(path)
+                result.append((stat.st_mtime, stat.st_size, path))
+        return result
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Удаляет наименее недавно использованные файлы, пока размер кэша превышает лимит."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                self._discard(path)
+                total -= size
+                print(f"[DEBUG] Кэш: вытеснен {os.path.basename(path)}")
+            except OSError as e:
+                print("Ошибка очистки кэша:", e)
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._discard(path)
+
+
+def init_cache(max_size_mb=DEFAULT_CACHE_SIZE_MB, directory=None):
+    global RENDER_CACHE
+    directory = directory or os.path.join(tempfile.gettempdir(), "sound_synth_cache")
+    RENDER_CACHE = RenderCache(directory, max_size_mb * 1024 * 1024)
+    return RENDER_CACHE
+
+
+def get_cache():
+    """Возвращает кэш, инициализируя его с настройками по умолчанию при первом обращении."""
+    return RENDER_CACHE or init_cache()
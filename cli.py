@@ -0,0 +1,286 @@
+"""
+Пакетная обработка сцен без интерфейса: прогрев кэша PCM, запекание затухания
+и офлайн-сведение звука для списка .blend-файлов.
+
+Запуск вне Blender — по одному процессу Blender на ядро, отчёт в JSON:
+    python cli.py shots/*.blend --blender /opt/blender/blender --report report.json
+    python cli.py shots/*.blend --tasks bake mixdown --jobs 4 --output-dir renders/
+
+Запуск внутри Blender для одного файла (каталог аддона должен
+импортироваться как пакет, например из каталога аддонов Blender):
+    blender -b shot.blend --python-expr "import sound_synth.cli as cli; cli.blender_main()" -- --tasks mixdown
+
+В отчёт для каждого файла пишутся статус, время каждой задачи, общее время
+с запуском Blender, результаты задач и путь к журналу вывода Blender.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+# Задачи выполняются в этом порядке: прогретый кэш PCM ускоряет сведение
+TASKS = ("warm-cache", "bake", "mixdown")
+
+_ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+_PACKAGE = os.path.basename(_ADDON_DIR)
+
+# Выражение для --python-expr: аддон импортируется как пакет из каталога рядом с этим файлом
+_BLENDER_EXPR = ("import sys; sys.path.insert(0, {parent!r}); "
+                 "import {package}.cli as cli; sys.exit(cli.blender_main())")
+
+
+# ------------------------------
+# Внутри Blender: один .blend-файл
+# ------------------------------
+def register_properties():
+    """
+    Регистрирует свойства аддона, которые читают запекание и сведение, если
+    аддон не включён в этом процессе Blender. Без регистрации данные,
+    сохранённые в .blend, недоступны как атрибуты объектов и сцены.
+    """
+    import bpy
+    from . import property_groups
+
+    if not hasattr(bpy.types.Object, "sound_synth_attached_sounds"):
+        if not getattr(property_groups.ObjectSoundItem, "is_registered", False):
+            bpy.utils.register_class(property_groups.ObjectSoundItem)
+        bpy.types.Object.sound_synth_attached_sounds = bpy.props.CollectionProperty(
+            type=property_groups.ObjectSoundItem)
+    if not hasattr(bpy.types.Scene, "sound_synth_attenuation_enable"):
+        bpy.types.Scene.sound_synth_attenuation_enable = bpy.props.BoolProperty(default=True)
+    if not hasattr(bpy.types.Scene, "sound_synth_attenuation_factor"):
+        bpy.types.Scene.sound_synth_attenuation_factor = bpy.props.FloatProperty(default=20.0, min=0.1)
+
+
+def _warm_cache(scene, options):
+    """Декодирует звуки источников сцены в общий каталог кэша PCM."""
+    import bpy
+    from . import dsp, spatial
+
+    cache = dsp.get_decode_cache()
+    sources = sorted({bpy.path.abspath(sound.filepath) for _, _, sound in spatial.find_emitters(scene)})
+    missing = [path for path in sources if not os.path.exists(path)]
+    for path in sources:
+        if path not in missing:
+            cache.persist(path)
+    return {"files": len(sources) - len(missing), "missing": missing}
+
+
+def _bake(scene, options):
+    """Создаёт дорожки источников, запекает затухание и сохраняет .blend."""
+    import bpy
+    from . import operators, spatial
+
+    operators.add_emitter_strips(scene)
+    strips, keys = spatial.bake_emitters(scene, simplify=True, bake_pan=True)
+    if strips and options.save:
+        bpy.ops.wm.save_mainfile()
+    return {"strips": strips, "keys": keys, "saved": bool(strips and options.save)}
+
+
+def _mixdown(scene, options):
+    """Сводит звук сцены в файл рядом с .blend или в options.output_dir."""
+    import bpy
+    from . import dsp, mixdown, spatial
+
+    specs = spatial.describe_emitters(scene, doppler=options.doppler)
+    if not specs:
+        return {"emitters": 0, "output": None}
+    blend_name = os.path.splitext(os.path.basename(bpy.data.filepath))[0] or "untitled"
+    directory = options.output_dir or os.path.dirname(bpy.data.filepath) or os.getcwd()
+    os.makedirs(directory, exist_ok=True)
+    name = f"{blend_name}_{bpy.path.clean_name(scene.name)}_mixdown.{dsp.output_extension(options.format)}"
+    output_filepath = os.path.join(directory, name)
+    stems_directory = os.path.splitext(output_filepath)[0] + "_stems" if options.stems else None
+    fps = scene.render.fps / scene.render.fps_base
+    mixdown.render_mixdown(specs, output_filepath, scene.render.ffmpeg.audio_mixrate, fps,
+                           scene.frame_start, scene.frame_end, options.format,
+                           stems_directory=stems_directory, max_workers=options.workers)
+    return {"emitters": len(specs), "output": output_filepath, "stems": stems_directory}
+
+
+TASK_FUNCTIONS = {
+    "warm-cache": _warm_cache,
+    "bake": _bake,
+    "mixdown": _mixdown,
+}
+
+
+def run_shot(options):
+    """
+    Выполняет задачи options.tasks для открытого в Blender файла. Ошибка
+    одной задачи не прерывает остальные. Возвращает запись отчёта.
+    """
+    import bpy
+
+    scene = bpy.context.scene
+    result = {"file": bpy.data.filepath, "scene": scene.name, "status": "ok", "tasks": {}}
+    register_properties()
+    for task in TASKS:
+        if task not in options.tasks:
+            continue
+        start = time.perf_counter()
+        try:
+            details = TASK_FUNCTIONS[task](scene, options)
+            record = {"status": "ok", **details}
+        except Exception as e:
+            traceback.print_exc()
+            record = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+            result["status"] = "failed"
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        result["tasks"][task] = record
+        print(f"[Sound Synth] {task}: {record['status']} за {record['seconds']:.2f} с")
+    return result
+
+
+def _shot_parser():
+    parser = argparse.ArgumentParser(prog="sound_synth.cli", description="Задачи для одного .blend-файла")
+    parser.add_argument("--tasks", nargs="+", choices=TASKS, default=list(TASKS), help="выполняемые задачи")
+    parser.add_argument("--output-dir", default=None, help="каталог результатов сведения (по умолчанию рядом с .blend)")
+    parser.add_argument("--format", default="wav16", help="формат сведения (см. dsp.OUTPUT_FORMATS)")
+    parser.add_argument("--stems", action="store_true", help="сохранить дорожки отдельных объектов")
+    parser.add_argument("--workers", type=int, default=1, help="процессов сведения на один файл")
+    parser.add_argument("--no-doppler", dest="doppler", action="store_false", help="сведение без эффекта Доплера")
+    parser.add_argument("--no-save", dest="save", action="store_false", help="не сохранять .blend после запекания")
+    parser.add_argument("--result", default=None, help="файл JSON для записи отчёта по файлу")
+    return parser
+
+
+def blender_main(argv=None):
+    """
+    Точка входа для `blender -b file.blend --python-expr`: аргументы берутся
+    после "--". Возвращает код выхода (1, если хотя бы одна задача не удалась).
+    """
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    options = _shot_parser().parse_args(argv)
+    result = run_shot(options)
+    if options.result:
+        with open(options.result, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0 if result["status"] == "ok" else 1
+
+
+# ------------------------------
+# Вне Blender: много файлов, по процессу Blender на ядро
+# ------------------------------
+def run_blender(blender, blend_file, shot_args, result_path, log_path, timeout=None):
+    """
+    Запускает Blender в фоне для одного файла и возвращает запись отчёта:
+    результат из result_path, дополненный временем с запуском Blender, кодом
+    выхода и путём к журналу. Если Blender упал, не записав результат, в
+    запись попадает конец журнала.
+    """
+    expression = _BLENDER_EXPR.format(parent=os.path.dirname(_ADDON_DIR), package=_PACKAGE)
+    command = [blender, "-b", blend_file, "--python-exit-code", "1", "--python-expr", expression,
+               "--", *shot_args, "--result", result_path]
+    if os.path.exists(result_path):
+        os.remove(result_path)
+    start = time.perf_counter()
+    try:
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, errors="replace", timeout=timeout)
+        output, returncode = completed.stdout, completed.returncode
+    except subprocess.TimeoutExpired as e:
+        output = e.stdout.decode("utf-8", "replace") if isinstance(e.stdout, bytes) else e.stdout or ""
+        output, returncode = output + f"\nПревышено время ожидания: {timeout} с", None
+    except OSError as e:
+        output, returncode = f"Не удалось запустить Blender: {e}", None
+    seconds = time.perf_counter() - start
+
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write(output)
+    try:
+        with open(result_path, encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        result = {"file": blend_file, "status": "failed", "tasks": {},
+                  "error": "\n".join(output.strip().splitlines()[-20:])}
+    if returncode != 0:
+        result["status"] = "failed"
+    result.update(input=blend_file, returncode=returncode, wall_seconds=round(seconds, 3), log=log_path)
+    return result
+
+
+def run_batch(blend_files, blender, shot_args, report_path, jobs=None, timeout=None):
+    """
+    Обрабатывает blend_files параллельно (jobs процессов Blender, по умолчанию
+    по числу ядер) и пишет отчёт report_path. Возвращает отчёт.
+    """
+    jobs = jobs or os.cpu_count()
+    log_directory = os.path.splitext(report_path)[0] + "_logs"
+    os.makedirs(log_directory, exist_ok=True)
+    start = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for i, blend_file in enumerate(blend_files):
+            stem = f"{i:04d}_{os.path.splitext(os.path.basename(blend_file))[0]}"
+            futures[executor.submit(run_blender, blender, os.path.abspath(blend_file), shot_args,
+                                    os.path.join(log_directory, stem + ".json"),
+                                    os.path.join(log_directory, stem + ".log"), timeout)] = i
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[futures[future]] = result
+            print(f"[Sound Synth] [{done}/{len(blend_files)}] {result['input']}: "
+                  f"{result['status']} за {result['wall_seconds']:.1f} с")
+
+    shots = [results[i] for i in range(len(blend_files))]
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "blender": blender,
+            "jobs": jobs,
+            "args": shot_args,
+            "seconds": round(time.perf_counter() - start, 3),
+            "failed": sum(shot["status"] != "ok" for shot in shots),
+        },
+        "shots": shots,
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("blend_files", nargs="+", help=".blend-файлы для обработки")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"),
+                        help="исполняемый файл Blender (по умолчанию $BLENDER или blender из PATH)")
+    parser.add_argument("--jobs", type=int, default=None, help="процессов Blender одновременно (по умолчанию по числу ядер)")
+    parser.add_argument("--report", default="sound_synth_report.json", help="файл JSON с отчётом")
+    parser.add_argument("--timeout", type=float, default=None, help="ограничение времени на один файл, с")
+    parser.add_argument("--tasks", nargs="+", choices=TASKS, default=list(TASKS), help="выполняемые задачи")
+    parser.add_argument("--output-dir", default=None, help="каталог результатов сведения (по умолчанию рядом с .blend)")
+    parser.add_argument("--format", default="wav16", help="формат сведения")
+    parser.add_argument("--stems", action="store_true", help="сохранить дорожки отдельных объектов")
+    parser.add_argument("--no-doppler", action="store_true", help="сведение без эффекта Доплера")
+    parser.add_argument("--no-save", action="store_true", help="не сохранять .blend после запекания")
+    args = parser.parse_args(argv)
+    if not _PACKAGE.isidentifier():
+        parser.error(f"Каталог аддона '{_PACKAGE}' нельзя импортировать как пакет Python — переименуйте его")
+
+    shot_args = ["--tasks", *args.tasks, "--format", args.format]
+    if args.output_dir:
+        shot_args += ["--output-dir", os.path.abspath(args.output_dir)]
+    if args.stems:
+        shot_args.append("--stems")
+    if args.no_doppler:
+        shot_args.append("--no-doppler")
+    if args.no_save:
+        shot_args.append("--no-save")
+
+    report = run_batch(args.blend_files, args.blender, shot_args, args.report, args.jobs, args.timeout)
+    print(f"\nОтчёт сохранён: {args.report} (ошибок: {report['meta']['failed']} из {len(report['shots'])})")
+    return 1 if report["meta"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
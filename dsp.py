@@ -1,118 +1,1999 @@
-from pydub import AudioSegment
+import hashlib
+import importlib
+import json
+import math
+import multiprocessing
+import os
+import subprocess
+import sys
 import tempfile
+import threading
+import wave
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+
+import numpy as np
+from pydub import AudioSegment
+from pydub.utils import mediainfo
+
+
+# ------------------------------
+# Внутреннее представление: float32-буфер (frames, channels)
+# ------------------------------
+# Форматы вывода: имя -> (расширение файла, подпись в интерфейсе).
+# WAV/FLAC/npy — для промежуточных результатов, MP3/OGG — только для финальной выдачи.
+OUTPUT_FORMATS = {
+    "wav16": ("wav", "WAV 16 бит"),
+    "wav24": ("wav", "WAV 24 бит"),
+    "flac": ("flac", "FLAC"),
+    "npy": ("npy", "float32 .npy (промежуточный)"),
+    "mp3": ("mp3", "MP3 (финальная выдача)"),
+    "ogg": ("ogg", "OGG Vorbis (финальная выдача)"),
+}
+FORMAT_ALIASES = {"wav": "wav16"}
+
+
+def output_extension(output_format):
+    """Расширение файла для формата вывода (неизвестные форматы передаются ffmpeg как есть)."""
+    output_format = FORMAT_ALIASES.get(output_format, output_format)
+    return OUTPUT_FORMATS.get(output_format, (output_format, ""))[0]
+
+
+def decode_audio(filepath):
+    """
+    Декодирует аудиофайл один раз и возвращает пару (samples, frame_rate):
+    - samples: массив float32 формы (frames, channels) в диапазоне [-1.0, 1.0)
+    - frame_rate: частота дискретизации в Гц
+
+    .npy открывается через memmap без копирования, PCM WAV читается модулем wave;
+    ffmpeg (через pydub) запускается только для сжатых форматов.
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == ".npy":
+        return load_npy(filepath)
+    if extension == ".wav":
+        try:
+            return read_wav(filepath)
+        except (wave.Error, EOFError):
+            pass  # float или WAVE_FORMAT_EXTENSIBLE — декодирует ffmpeg
+    audio = AudioSegment.from_file(filepath)
+    return segment_to_array(audio), audio.frame_rate
+
+
+def _pcm_to_float(data, sample_width, channels):
+    """Байты PCM (8/16/24/32 бит) -> float32-массив (frames, channels)."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if sample_width == 1:
+        samples = (raw.astype(np.float32) - 128.0) * (1.0 / 128)
+    elif sample_width == 3:
+        padded = np.zeros((len(raw) // 3, 4), dtype=np.uint8)
+        padded[:, 1:] = raw.reshape(-1, 3)
+        samples = padded.view("<i4").astype(np.float32) * (1.0 / (1 << 31))
+    else:
+        ints = raw.view({2: "<i2", 4: "<i4"}[sample_width])
+        samples = ints.astype(np.float32) * (1.0 / (1 << (8 * sample_width - 1)))
+    return samples.reshape(-1, channels)
+
+
+def _float_to_pcm(samples, sample_width):
+    """float32-массив -> байты PCM 16 или 24 бит (с ограничением амплитуды)."""
+    full_scale = float(1 << (8 * sample_width - 1))
+    ints = np.clip(samples * full_scale, -full_scale, full_scale - 1).astype("<i4")
+    if sample_width == 3:
+        return ints.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return ints.astype("<i2").tobytes()
+
+
+def read_wav(filepath):
+    """Читает PCM WAV (8/16/24/32 бит) без запуска ffmpeg."""
+    with wave.open(filepath, "rb") as f:
+        channels, sample_width, frame_rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        data = f.readframes(f.getnframes())
+    return _pcm_to_float(data, sample_width, channels), frame_rate
+
+
+def write_wav(samples, frame_rate, filepath, sample_width=2):
+    """Записывает PCM WAV 16 или 24 бит без запуска ffmpeg."""
+    with wave.open(filepath, "wb") as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(sample_width)
+        f.setframerate(frame_rate)
+        f.writeframes(_float_to_pcm(samples, sample_width))
+    return filepath
+
+
+def sidecar_path(filepath):
+    """Файл с частотой дискретизации и числом каналов для .npy."""
+    return filepath + ".json"
+
+
+def save_npy(samples, frame_rate, filepath):
+    """Сохраняет float32-буфер как .npy (пригоден для memmap) и описание в .json рядом."""
+    with open(filepath, "wb") as f:
+        np.save(f, np.ascontiguousarray(samples, dtype=np.float32))
+    with open(sidecar_path(filepath), "w") as f:
+        json.dump({"frame_rate": frame_rate, "channels": samples.shape[1]}, f)
+    return filepath
+
+
+def load_npy(filepath, mmap_mode="c"):
+    """
+    Открывает .npy через memmap. По умолчанию в режиме copy-on-write: эффекты
+    могут менять буфер на месте, файл при этом не изменяется.
+    """
+    with open(sidecar_path(filepath)) as f:
+        frame_rate = json.load(f)["frame_rate"]
+    return np.load(filepath, mmap_mode=mmap_mode), frame_rate
+
+
+def segment_to_array(audio):
+    """Преобразует AudioSegment в float32-массив формы (frames, channels)."""
+    ints = np.asarray(audio.get_array_of_samples())
+    samples = ints.astype(np.float32).reshape(-1, audio.channels)
+    samples *= 1.0 / (1 << (8 * audio.sample_width - 1))
+    return samples
+
+
+def array_to_segment(samples, frame_rate, sample_width=2):
+    """
+    Преобразует float32-массив (frames, channels) обратно в AudioSegment.
+    Ограничение амплитуды (clip) выполняется один раз — здесь, при экспорте.
+    """
+    full_scale = float(1 << (8 * sample_width - 1))
+    ints = np.clip(samples * full_scale, -full_scale, full_scale - 1)
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[sample_width]
+    return AudioSegment(
+        data=ints.astype(dtype).tobytes(),
+        sample_width=sample_width,
+        frame_rate=frame_rate,
+        channels=samples.shape[1],
+    )
+
+
+def encode_audio(samples, frame_rate, filepath, format="mp3"):
+    """Экспортирует float32-массив в файл заданного формата (см. OUTPUT_FORMATS)."""
+    format = FORMAT_ALIASES.get(format, format)
+    if format == "wav16":
+        return write_wav(samples, frame_rate, filepath, sample_width=2)
+    if format == "wav24":
+        return write_wav(samples, frame_rate, filepath, sample_width=3)
+    if format == "npy":
+        return save_npy(samples, frame_rate, filepath)
+    codec = "libvorbis" if format == "ogg" else None
+    array_to_segment(samples, frame_rate).export(filepath, format=format, codec=codec)
+    return filepath
+
+
+# Раскладки каналов: число каналов -> имя. Порядок каналов — как в WAV/ffmpeg:
+# 5.1 = FL FR FC LFE BL BR, 7.1 = FL FR FC LFE BL BR SL SR.
+CHANNEL_LAYOUTS = {1: "mono", 2: "stereo", 4: "quad", 6: "5.1", 8: "7.1"}
+
+_MINUS_3DB = math.sqrt(0.5)
+
+# Матрицы сведения (in_channels, out_channels) по ITU-R BS.775, LFE отбрасывается
+DOWNMIX_MATRICES = {
+    ("stereo", "mono"): [[0.5], [0.5]],
+    ("quad", "stereo"): [[1, 0], [0, 1], [_MINUS_3DB, 0], [0, _MINUS_3DB]],
+    ("5.1", "stereo"): [[1, 0], [0, 1], [_MINUS_3DB, _MINUS_3DB], [0, 0],
+                        [_MINUS_3DB, 0], [0, _MINUS_3DB]],
+    ("7.1", "stereo"): [[1, 0], [0, 1], [_MINUS_3DB, _MINUS_3DB], [0, 0],
+                        [_MINUS_3DB, 0], [0, _MINUS_3DB], [_MINUS_3DB, 0], [0, _MINUS_3DB]],
+}
+
+
+def channel_layout(channels):
+    """Имя раскладки для числа каналов (нестандартные — "<n>ch")."""
+    return CHANNEL_LAYOUTS.get(channels, f"{channels}ch")
+
+
+class AudioBuffer:
+    """
+    Единое внутреннее представление аудио: float32-массив (frames, channels)
+    в C-порядке, частота дискретизации и раскладка каналов.
+
+    Все эффекты цепочки векторизованы по оси каналов, поэтому моно, стерео
+    и 5.1 обрабатываются одним вызовом без циклов по каналам. Одномерный
+    массив считается моно и приводится к форме (frames, 1).
+    """
+
+    __slots__ = ("samples", "frame_rate", "layout")
+
+    def __init__(self, samples, frame_rate, layout=None):
+        samples = np.asarray(samples)
+        if samples.ndim == 1:
+            samples = samples[:, None]
+        if samples.ndim != 2:
+            raise ValueError(f"Ожидается массив (frames, channels), получено {samples.shape}")
+        if samples.dtype != np.float32 or not samples.flags.c_contiguous:
+            samples = np.ascontiguousarray(samples, dtype=np.float32)
+        layout = layout or channel_layout(samples.shape[1])
+        if layout in CHANNEL_LAYOUTS.values() and CHANNEL_LAYOUTS.get(samples.shape[1]) != layout:
+            raise ValueError(f"Раскладка {layout} не соответствует {samples.shape[1]} каналам")
+        self.samples = samples
+        self.frame_rate = int(frame_rate)
+        self.layout = layout
+
+    def __repr__(self):
+        return f"AudioBuffer({self.frames} frames, {self.frame_rate} Hz, {self.layout})"
 
-def apply_reverb(audio, delay_ms=100, decay_dB=6):
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def frames(self):
+        return self.samples.shape[0]
+
+    @property
+    def duration(self):
+        return self.frames / self.frame_rate
+
+    @property
+    def dtype(self):
+        return self.samples.dtype
+
+    @classmethod
+    def from_interleaved(cls, data, channels, frame_rate, sample_width=2):
+        """Буфер из чередующихся байтов PCM (формат WAV и AudioSegment.raw_data)."""
+        return cls(_pcm_to_float(data, sample_width, channels), frame_rate)
+
+    @classmethod
+    def from_segment(cls, audio):
+        return cls(segment_to_array(audio), audio.frame_rate)
+
+    @classmethod
+    def load(cls, filepath, copy=True):
+        """
+        Загружает файл через кэш декодированного PCM (load_audio). Буфер кэша
+        общий и только для чтения, поэтому по умолчанию возвращается копия,
+        которую эффекты могут менять на месте.
+        """
+        samples, frame_rate = load_audio(filepath)
+        return cls(np.array(samples, dtype=np.float32) if copy else samples, frame_rate)
+
+    def copy(self):
+        return AudioBuffer(self.samples.copy(), self.frame_rate, self.layout)
+
+    def to_segment(self, sample_width=2):
+        return array_to_segment(self.samples, self.frame_rate, sample_width)
+
+    def process(self, effects_list, progress=None, cancel_event=None):
+        """Применяет цепочку эффектов (см. process_audio) и возвращает новый буфер."""
+        return AudioBuffer(_run_chain(self.samples, self.frame_rate, effects_list, progress, cancel_event),
+                           self.frame_rate, self.layout)
+
+    def resample(self, target_rate):
+        if not target_rate or int(target_rate) == self.frame_rate:
+            return self
+        return AudioBuffer(resample(self.samples, self.frame_rate, target_rate), target_rate, self.layout)
+
+    def remix(self, layout):
+        """
+        Приводит буфер к раскладке layout: сведение по DOWNMIX_MATRICES,
+        моно размножается на все каналы.
+        """
+        if layout == self.layout:
+            return self
+        channels = next((n for n, name in CHANNEL_LAYOUTS.items() if name == layout), None)
+        if channels is None:
+            raise ValueError(f"Неизвестная раскладка каналов: {layout}")
+        if self.channels == 1:
+            return AudioBuffer(np.repeat(self.samples, channels, axis=1), self.frame_rate, layout)
+        matrix = DOWNMIX_MATRICES.get((self.layout, layout))
+        if matrix is None and layout == "mono" and (self.layout, "stereo") in DOWNMIX_MATRICES:
+            matrix = np.dot(DOWNMIX_MATRICES[(self.layout, "stereo")], DOWNMIX_MATRICES[("stereo", "mono")])
+        if matrix is None:
+            raise ValueError(f"Нет матрицы сведения {self.layout} -> {layout}")
+        return AudioBuffer(self.samples @ np.asarray(matrix, dtype=np.float32), self.frame_rate, layout)
+
+    def save(self, filepath, format="mp3"):
+        return encode_audio(self.samples, self.frame_rate, filepath, format=format)
+
+
+# ------------------------------
+# Кэш декодированного PCM
+# ------------------------------
+DECODE_CACHE = None  # Глобальный кэш декодированного аудио, инициализируется в init_decode_cache()
+
+DEFAULT_DECODE_CACHE_MB = 512
+DEFAULT_DECODE_SPILL_MB = 4096
+
+
+class DecodedAudioCache:
+    """
+    Кэш декодированного аудио: (путь, mtime, размер) -> float32-буфер (frames, channels).
+
+    Буферы держатся в памяти до max_bytes; наименее недавно использованные
+    сбрасываются в .npy в каталоге spill_directory и дальше открываются через
+    memmap. Имя .npy выводится из ключа, поэтому сброшенные файлы находятся
+    и в следующих сеансах, пока исходник не изменится. Возвращаемые буферы
+    общие и доступны только для чтения — перед обработкой на месте их нужно
+    копировать. Потокобезопасен (используется фоновыми задачами).
+    """
+
+    def __init__(self, max_bytes, spill_directory, max_spill_bytes):
+        self.max_bytes = max_bytes
+        self.spill_directory = spill_directory
+        self.max_spill_bytes = max_spill_bytes
+        self._entries = OrderedDict()  # ключ -> (samples, frame_rate)
+        self._lock = threading.Lock()
+        self.bytes_held = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(spill_directory, exist_ok=True)
+        self.bytes_spilled = sum(size for _, size, _ in self._spill_entries())
+        print(f"[DEBUG] Кэш декодированного аудио: {max_bytes // (1024 * 1024)} МБ в памяти, каталог {spill_directory}")
+
+    @staticmethod
+    def key(filepath):
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def _spill_path(self, key):
+        name = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_directory, name + ".npy")
+
+    def get(self, filepath):
+        """Возвращает (samples, frame_rate), декодируя файл только при промахе."""
+        key = self.key(filepath)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        spill_path = self._spill_path(key)
+        if os.path.exists(spill_path) and os.path.exists(sidecar_path(spill_path)):
+            os.utime(spill_path)
+            with self._lock:
+                self.disk_hits += 1
+            return load_npy(spill_path, mmap_mode="r")
+
+        samples, frame_rate = decode_audio(filepath)
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        samples.flags.writeable = False
+        with self._lock:
+            self.misses += 1
+            if key not in self._entries:
+                self._entries[key] = (samples, frame_rate)
+                self.bytes_held += samples.nbytes
+            spilled = self._evict()
+        for old_key, (old_samples, old_rate) in spilled:
+            self._spill(old_key, old_samples, old_rate)
+        return samples, frame_rate
+
+    def _evict(self):
+        """Вынимает из памяти старые записи сверх лимита (под блокировкой)."""
+        spilled = []
+        while self.bytes_held > self.max_bytes and len(self._entries) > 1:
+            old_key, entry = self._entries.popitem(last=False)
+            self.bytes_held -= entry[0].nbytes
+            spilled.append((old_key, entry))
+        return spilled
+
+    def persist(self, filepath):
+        """
+        Декодирует файл (если нужно) и сразу сохраняет его PCM в spill_directory:
+        такой файл находят другие процессы и следующие сеансы без декодирования
+        (прогрев кэша перед пакетной обработкой). Возвращает путь к .npy.
+        """
+        key = self.key(filepath)
+        spill_path = self._spill_path(key)
+        if not (os.path.exists(spill_path) and os.path.exists(sidecar_path(spill_path))):
+            samples, frame_rate = self.get(filepath)
+            self._spill(key, samples, frame_rate)
+        return spill_path
+
+    def _spill(self, key, samples, frame_rate):
+        spill_path = self._spill_path(key)
+        if not os.path.exists(spill_path):
+            # Каталог может быть общим для нескольких процессов: файл появляется под
+            # своим именем только целиком, описание .json — после него
+            tmp_path = f"{spill_path}.{os.getpid()}.tmp"
+            try:
+                save_npy(samples, frame_rate, tmp_path)
+                os.replace(tmp_path, spill_path)
+                os.replace(sidecar_path(tmp_path), sidecar_path(spill_path))
+                print(f"[DEBUG] Кэш PCM: {os.path.basename(key[0])} сброшен на диск")
+            except OSError as e:
+                print("Ошибка сброса кэша PCM на диск:", e)
+                return
+        self._trim_spill()
+
+    def _spill_entries(self):
+        result = []
+        for name in os.listdir(self.spill_directory):
+            if name.endswith(".npy"):
+                path = os.path.join(self.spill_directory, name)
+                stat = os.stat(path)
+                result.append((stat.st_mtime, stat.st_size, path))
+        return result
+
+    def _trim_spill(self):
+        entries = sorted(self._spill_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_spill_bytes:
+                break
+            for p in (path, sidecar_path(path)):
+                if os.path.exists(p):
+                    os.remove(p)
+            total -= size
+        self.bytes_spilled = total
+
+    def stats(self):
+        """Статистика для панели: попадания, промахи и занятый объём."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes_held": self.bytes_held,
+                "bytes_spilled": self.bytes_spilled,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_held = 0
+            self.hits = self.disk_hits = self.misses = 0
+        for _, _, path in self._spill_entries():
+            for p in (path, sidecar_path(path)):
+                if os.path.exists(p):
+                    os.remove(p)
+        self.bytes_spilled = 0
+
+
+def init_decode_cache(max_size_mb=DEFAULT_DECODE_CACHE_MB, directory=None, max_spill_mb=DEFAULT_DECODE_SPILL_MB):
+    global DECODE_CACHE
+    directory = directory or os.path.join(tempfile.gettempdir(), "sound_synth_pcm")
+    DECODE_CACHE = DecodedAudioCache(max_size_mb * 1024 * 1024, directory, max_spill_mb * 1024 * 1024)
+    return DECODE_CACHE
+
+
+def get_decode_cache():
+    """Возвращает кэш PCM, инициализируя его с настройками по умолчанию при первом обращении."""
+    return DECODE_CACHE or init_decode_cache()
+
+
+def load_audio(filepath):
+    """
+    То же, что decode_audio, но через общий кэш: файл декодируется один раз за
+    сеанс. Буфер доступен только для чтения. .npy уже открываются через memmap
+    и в кэш не попадают.
+    """
+    if os.path.splitext(filepath)[1].lower() == ".npy":
+        return load_npy(filepath, mmap_mode="r")
+    return get_decode_cache().get(filepath)
+
+
+def _db_to_gain(decay_dB):
+    """Переводит ослабление в децибелах в линейный множитель."""
+    return 10.0 ** (-decay_dB / 20.0)
+
+
+def _ms_to_frames(ms, frame_rate):
+    return int(round(ms * frame_rate / 1000.0))
+
+
+# ------------------------------
+# Эффекты: каждый принимает (samples, frame_rate) и возвращает samples
+# ------------------------------
+def apply_gain(samples, frame_rate, gain_db=0.0):
+    """Изменяет громкость на gain_db децибел (на месте)."""
+    if gain_db:
+        samples *= 10.0 ** (gain_db / 20.0)
+    return samples
+
+
+def apply_reverb(samples, frame_rate, delay_ms=100, decay_dB=6):
     """
     Применяет эффект реверберации:
-    - Создаёт эхо: создаёт тихий сигнал заданной длительности,
-      затем накладывает на оригинал ослабленный звук.
+    - Создаёт эхо: к оригиналу со сдвигом delay_ms добавляется ослабленная копия.
+    Работает на месте; длина сигнала сохраняется.
     """
-    # Создаем копию аудио с ослаблением для эха
-    echo = AudioSegment.silent(duration=delay_ms) + audio.apply_gain(-decay_dB)
-    # Накладываем эхо на оригинал
-    processed = audio.overlay(echo)
-    return processed
+    delay = _ms_to_frames(delay_ms, frame_rate)
+    if 0 < delay < len(samples):
+        samples[delay:] += _db_to_gain(decay_dB) * samples[:-delay]
+    return samples
 
 
-def apply_delay(audio, delay_ms=300, decay_dB=3, repetitions=2):
+class MultiTapDelay:
+    """
+    Многоотводная задержка (гребенчатый фильтр) с отводами через каждые delay отсчётов
+    и усилением gain^i на i-м отводе.
+
+    Вместо наложения каждого повтора отдельно используется рекурсия по блокам длины delay:
+        y[n] = x[n] + gain * y[n - delay] - gain^(R+1) * x[n - (R+1) * delay],
+    где R — число повторов. Вычитание обрывает «хвост» после R-го отвода, поэтому
+    результат совпадает с суммой R отводов. Вход с задержкой (R+1) * delay хранится
+    в кольцевом буфере и вычитается из всего блока одной операцией, так что работа
+    на блок не зависит от R. При feedback=True вычитания нет — это классический
+    IIR-гребенчатый фильтр с обратной связью; он устойчив только при gain < 1.
+    Хвосты входа и выхода сохраняются между блоками, так что сигнал можно подавать частями.
+    """
+
+    latency = 0  # Для потоковой обработки (см. compile_stream)
+
+    def __init__(self, delay, gain, repetitions, feedback=False):
+        if feedback and gain >= 1.0:
+            raise ValueError("Задержка с обратной связью требует затухания больше 0 dB")
+        self.delay = delay
+        self.gain = gain
+        self.cutoff_gain = 0.0 if feedback else gain ** (repetitions + 1)
+        self._x_span = 0 if feedback else (repetitions + 1) * delay
+        self._x_ring = None
+        self._x_pos = 0  # Позиция самого старого отсчёта в кольцевом буфере
+        self._y_hist = None
+
+    def _ring_slices(self, count):
+        """Срезы кольцевого буфера для count отсчётов, начиная с самого старого."""
+        first = min(count, self._x_span - self._x_pos)
+        return [(slice(0, first), slice(self._x_pos, self._x_pos + first)),
+                (slice(first, count), slice(0, count - first))]
+
+    def _cut_tail(self, block):
+        """Вход блока минус cutoff_gain * x[n - (R+1) * delay]; обновляет кольцевой буфер."""
+        span, frames = self._x_span, len(block)
+        x = block.copy()
+        slices = self._ring_slices(min(frames, span))
+        for block_part, ring_part in slices:
+            x[block_part] -= self.cutoff_gain * self._x_ring[ring_part]
+        if frames > span:
+            x[span:] -= self.cutoff_gain * block[:frames - span]
+            self._x_ring[:] = block[frames - span:]
+            self._x_pos = 0
+        else:
+            # Самые старые frames отсчётов заменяются входом блока
+            for block_part, ring_part in slices:
+                self._x_ring[ring_part] = block[block_part]
+            self._x_pos = (self._x_pos + frames) % span
+        return x
+
+    def process_block(self, block):
+        """Обрабатывает блок (frames, channels) на месте."""
+        d = self.delay
+        if self._y_hist is None:
+            self._y_hist = np.zeros((d, block.shape[1]), dtype=np.float32)
+            self._x_ring = np.zeros((self._x_span, block.shape[1]), dtype=np.float32)
+        x = self._cut_tail(block) if self.cutoff_gain else block
+        y = np.concatenate([self._y_hist, x])
+        end = len(y)
+        for start in range(d, end, d):
+            stop = min(start + d, end)
+            y[start:stop] += self.gain * y[start - d:stop - d]
+        block[:] = y[d:]
+        self._y_hist = y[-d:].copy()
+        return block
+
+    def process(self, samples, chunk=65536):
+        """Обрабатывает весь сигнал на месте фрагментами ограниченного размера."""
+        chunk = max(chunk, self.delay)
+        for start in range(0, len(samples), chunk):
+            self.process_block(samples[start:start + chunk])
+        return samples
+
+
+def apply_delay(samples, frame_rate, delay_ms=300, decay_dB=3, repetitions=2, feedback=False):
     """
     Применяет эффект задержки (delay) с заданным числом повторов.
-    Каждый повтор начинается с увеличенной задержкой, а громкость повторов уменьшается.
+    Повтор i начинается через i * delay_ms и ослаблен на i * decay_dB.
+    При feedback=True повторы не ограничены числом repetitions и затухают
+    сами по себе (IIR-гребенчатый фильтр); decay_dB должно быть больше 0,
+    иначе выбрасывается ValueError.
+    """
+    delay = _ms_to_frames(delay_ms, frame_rate)
+    if delay <= 0 or (repetitions <= 0 and not feedback):
+        return samples
+    line = MultiTapDelay(delay, _db_to_gain(decay_dB), repetitions, feedback=feedback)
+    return line.process(samples)
+
+
+# ------------------------------
+# Биквадратные фильтры (каскад секций второго порядка)
+# ------------------------------
+def design_biquad(kind, frequency, frame_rate, gain_db=0.0, q=0.7071):
+    """
+    Рассчитывает биквадратную секцию по формулам RBJ Audio EQ Cookbook.
+
+    kind: "lowshelf", "highshelf", "peak", "lowpass", "highpass" или "notch".
+    Возвращает нормированную секцию [b0, b1, b2, 1, a1, a2].
+    """
+    w0 = 2 * math.pi * min(frequency, 0.499 * frame_rate) / frame_rate
+    cos_w0 = math.cos(w0)
+    alpha = math.sin(w0) / (2 * q)
+    A = 10.0 ** (gain_db / 40.0)
+
+    if kind == "lowshelf":
+        k = 2 * math.sqrt(A) * alpha
+        b = (A * ((A + 1) - (A - 1) * cos_w0 + k), 2 * A * ((A - 1) - (A + 1) * cos_w0),
+             A * ((A + 1) - (A - 1) * cos_w0 - k))
+        a = ((A + 1) + (A - 1) * cos_w0 + k, -2 * ((A - 1) + (A + 1) * cos_w0),
+             (A + 1) + (A - 1) * cos_w0 - k)
+    elif kind == "highshelf":
+        k = 2 * math.sqrt(A) * alpha
+        b = (A * ((A + 1) + (A - 1) * cos_w0 + k), -2 * A * ((A - 1) + (A + 1) * cos_w0),
+             A * ((A + 1) + (A - 1) * cos_w0 - k))
+        a = ((A + 1) - (A - 1) * cos_w0 + k, 2 * ((A - 1) - (A + 1) * cos_w0),
+             (A + 1) - (A - 1) * cos_w0 - k)
+    elif kind == "peak":
+        b = (1 + alpha * A, -2 * cos_w0, 1 - alpha * A)
+        a = (1 + alpha / A, -2 * cos_w0, 1 - alpha / A)
+    elif kind == "lowpass":
+        b = ((1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2)
+        a = (1 + alpha, -2 * cos_w0, 1 - alpha)
+    elif kind == "highpass":
+        b = ((1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2)
+        a = (1 + alpha, -2 * cos_w0, 1 - alpha)
+    elif kind == "notch":
+        b = (1, -2 * cos_w0, 1)
+        a = (1 + alpha, -2 * cos_w0, 1 - alpha)
+    else:
+        raise ValueError(f"Неизвестный тип биквадратного фильтра: {kind}")
+
+    return np.array([b[0], b[1], b[2], a[0], a[1], a[2]], dtype=np.float64) / a[0]
+
+
+def sos_frequency_response(sos, n_fft):
+    """Комплексная АЧХ/ФЧХ каскада секций на сетке rfft размера n_fft (все секции сразу)."""
+    z = np.exp(-2j * np.pi * np.arange(n_fft // 2 + 1) / n_fft)[None, :]
+    num = sos[:, 0, None] + sos[:, 1, None] * z + sos[:, 2, None] * z * z
+    den = sos[:, 3, None] + sos[:, 4, None] * z + sos[:, 5, None] * z * z
+    return np.prod(num / den, axis=0)
+
+
+def sos_impulse_response(sos, max_length=1 << 18):
+    """
+    Импульсная характеристика каскада, усечённая на уровне -120 dB.
+
+    Длина оценивается по радиусу самого «медленного» полюса, затем ИХ
+    получается одним irfft от частотной характеристики на сетке вдвое длиннее,
+    так что наложение хвоста пренебрежимо мало.
+    """
+    radius = max(float(np.max(np.abs(np.roots(section[3:])))) for section in sos)
+    if radius >= 1.0:
+        raise ValueError("Неустойчивый каскад: полюс вне единичной окружности")
+    length = int(math.ceil(math.log(1e-6) / math.log(radius))) if radius > 0 else 3
+    length = min(max(length, 3), max_length)
+    n_fft = 1 << (2 * length - 1).bit_length()
+    ir = np.fft.irfft(sos_frequency_response(sos, n_fft), n=n_fft)[:length]
+    return ir.astype(np.float32)
+
+
+def apply_sos(samples, frame_rate, sos):
+    """
+    Применяет каскад биквадратных секций ко всем каналам за один проход.
+
+    Все полосы перемножаются в одну частотную характеристику, и каскад
+    выполняется как одна FFT-свёртка (convolve) с его усечённой импульсной
+    характеристикой, независимо от числа полос. Усечённая IR короткая
+    (сотни-тысячи отсчётов), поэтому это один проход overlap-save: около
+    0.5 с на 3 минуты стерео 48 kHz. Векторизованная рекурсия (секции,
+    разложенные на простые дроби первого порядка, блочный cumsum) точнее,
+    но в numpy примерно вчетверо медленнее, поэтому не используется.
+    """
+    if len(sos) == 0:
+        return samples
+    ir = sos_impulse_response(np.asarray(sos, dtype=np.float64))
+    return convolve(samples, ir[:, None])
+
+
+def eq_sections(frame_rate, low_gain=0.0, high_gain=0.0, bands=()):
+    """
+    Собирает секции параметрического эквалайзера:
+    - полка на 200 Hz с усилением low_gain
+    - полка на 2000 Hz с усилением high_gain
+    - дополнительные полосы bands: кортежи (kind, frequency, gain_db, q)
+    Полосы с нулевым усилением (кроме срезов) пропускаются.
+    """
+    sections = []
+    if low_gain:
+        sections.append(design_biquad("lowshelf", 200, frame_rate, low_gain))
+    if high_gain:
+        sections.append(design_biquad("highshelf", 2000, frame_rate, high_gain))
+    for kind, frequency, gain_db, q in bands:
+        if kind in ("lowshelf", "highshelf", "peak") and not gain_db:
+            continue
+        sections.append(design_biquad(kind, frequency, frame_rate, gain_db, q))
+    return sections
+
+
+def apply_eq(samples, frame_rate, low_gain=0.0, high_gain=0.0, bands=()):
+    """
+    Применяет параметрический эквалайзер:
+    - Низкие частоты корректируются полкой на 200 Hz (low_gain, dB)
+    - Высокие частоты корректируются полкой на 2000 Hz (high_gain, dB)
+    - bands — дополнительные пики/полки/срезы, см. eq_sections
+    При нулевых усилениях сигнал не изменяется.
+    """
+    return apply_sos(samples, frame_rate, eq_sections(frame_rate, low_gain, high_gain, bands))
+
+
+# ------------------------------
+# Полифазная передискретизация
+# ------------------------------
+RESAMPLE_ZERO_CROSSINGS = 16  # Полуширина прототипа в нулях sinc
+RESAMPLE_KAISER_BETA = 8.0  # Около -80 dB в полосе заграждения
+RESAMPLE_ROLLOFF = 0.92  # Срез чуть ниже новой частоты Найквиста: переходная полоса не пропускает наложение
+RESAMPLE_MAX_DENOMINATOR = 512  # Ошибка тона при сдвиге на полутоны — сотые доли цента
+
+# Кэш полифазных банков: (up, down) -> (bank, delay)
+_RESAMPLE_BANKS = {}
+
+
+def resampling_bank(up, down):
+    """
+    Полифазный банк фильтров для передискретизации в up / down раз.
+
+    Прототип — взвешенный окном Кайзера sinc с частотой среза
+    RESAMPLE_ROLLOFF / max(up, down) от частоты Найквиста повышенной частоты,
+    разложенный на up фаз. Возвращает
+    (bank, delay): bank формы (up, taps), коэффициенты каждой фазы развёрнуты для
+    скалярного произведения с окном входа; delay — задержка прототипа в отсчётах
+    повышенной частоты. Банки кэшируются по (up, down).
+    """
+    key = (up, down)
+    cached = _RESAMPLE_BANKS.get(key)
+    if cached is None:
+        factor = max(up, down)
+        half = RESAMPLE_ZERO_CROSSINGS * factor
+        n = np.arange(-half, half + 1)
+        cutoff = RESAMPLE_ROLLOFF / factor
+        prototype = up * cutoff * np.sinc(cutoff * n) * np.kaiser(2 * half + 1, RESAMPLE_KAISER_BETA)
+        taps = -(-len(prototype) // up)
+        padded = np.zeros(taps * up)
+        padded[:len(prototype)] = prototype
+        # bank[p, t] = h[p + (taps - 1 - t) * up]
+        bank = padded.reshape(taps, up).T[:, ::-1].astype(np.float32)
+        bank.flags.writeable = False
+        cached = (bank, half)
+        _RESAMPLE_BANKS[key] = cached
+    return cached
+
+
+def resample_poly(samples, up, down):
+    """
+    Передискретизация (frames, channels) в up / down раз полифазным КИХ-фильтром.
+
+    Выходные отсчёты с одной фазой образуют арифметическую прогрессию, а их окна
+    входа — strided-представление с шагом down; поэтому каждая фаза считается
+    одним матричным умножением по всем отсчётам и каналам. Внутри сигнал хранится
+    по каналам (channels, frames), чтобы отводы окна лежали в памяти подряд.
+    Задержка фильтра компенсирована; длина выхода ceil(frames * up / down).
+    """
+    divisor = math.gcd(up, down)
+    up, down = up // divisor, down // divisor
+    if up == down:
+        return samples
+    bank, delay = resampling_bank(up, down)
+    taps = bank.shape[1]
+    length = -(-len(samples) * up // down)
+    planar = np.zeros((samples.shape[1], len(samples) + 2 * taps), dtype=np.float32)
+    planar[:, taps - 1:taps - 1 + len(samples)] = samples.T
+    windows = np.lib.stride_tricks.sliding_window_view(planar, taps, axis=1)  # (channels, frames, taps)
+    out = np.empty((samples.shape[1], length), dtype=np.float32)
+    for first in range(min(up, length)):
+        position = first * down + delay
+        count = len(range(first, length, up))
+        base = position // up
+        out[:, first::up] = windows[:, base:base + (count - 1) * down + 1:down] @ bank[position % up]
+    return out.T
+
+
+def resample(samples, frame_rate, target_rate):
+    """Приводит сигнал к частоте target_rate (например, превью Freesound к частоте проекта)."""
+    if frame_rate == target_rate:
+        return samples
+    return resample_poly(samples, int(target_rate), int(frame_rate))
+
+
+def resample_ratio(samples, ratio, length=None):
+    """
+    Передискретизация в ratio раз (длина умножается на ratio) для произвольного
+    ratio, приближённого дробью со знаменателем не больше RESAMPLE_MAX_DENOMINATOR.
+    Если задана length, выход обрезается или дополняется нулями до неё.
+    """
+    fraction = Fraction(ratio).limit_denominator(RESAMPLE_MAX_DENOMINATOR)
+    out = resample_poly(samples, fraction.numerator, fraction.denominator)
+    if length is None or len(out) == length:
+        return out
+    if len(out) > length:
+        return out[:length]
+    return np.pad(out, ((0, length - len(out)), (0, 0)))
+
+
+TIME_WARP_PHASES = 512  # Фаз банка: позиция чтения округляется до 1/512 отсчёта (около -58 dB на 10 kHz)
+TIME_WARP_BLOCK = 16384  # Выходных отсчётов на блок: ограничивает выборку окон (block, taps, channels)
+
+
+def time_warp(samples, rates, step, length=None):
+    """
+    Передискретизация с переменной скоростью (эффект Доплера): rates —
+    скорость чтения входа (входных отсчётов на выходной), заданная через
+    каждые step выходных отсчётов (например, на каждый кадр сцены) и
+    линейно интерполированная между ними. Позиция чтения — накопленная
+    сумма скоростей, начиная с нуля.
+
+    Каждый выходной отсчёт — скалярное произведение окна входа с ближайшей
+    фазой полифазного банка resampling_bank; срез банка рассчитан на
+    наибольшую скорость, поэтому ускорение не даёт наложения. Длина выхода —
+    length или столько, сколько нужно, чтобы прочитать весь вход.
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if length is None:
+        # Средняя скорость оценивает длину; остаток после конца входа — тишина
+        length = int(np.ceil(len(samples) / max(rates.mean(), 1e-6)))
+    up = TIME_WARP_PHASES
+    bank, delay = resampling_bank(up, max(up, int(np.ceil(up * rates.max()))))
+    taps = bank.shape[1]
+    planar = np.zeros((samples.shape[1], len(samples) + 2 * taps), dtype=np.float32)
+    planar[:, taps - 1:taps - 1 + len(samples)] = samples.T
+    windows = np.lib.stride_tricks.sliding_window_view(planar, taps, axis=1)  # (channels, frames, taps)
+    limit = windows.shape[1] - 1  # Окна за концом входа состоят из нулей
+
+    out = np.empty((length, samples.shape[1]), dtype=np.float32)
+    rate_index = np.arange(len(rates))
+    position = 0.0
+    for first in range(0, length, TIME_WARP_BLOCK):
+        block_rates = np.interp(np.arange(first, min(first + TIME_WARP_BLOCK, length)) / step, rate_index, rates)
+        reads = position + np.cumsum(block_rates) - block_rates
+        position = reads[-1] + block_rates[-1]
+        upsampled = np.rint(reads * up).astype(np.int64) + delay
+        bases = np.minimum(upsampled // up, limit)
+        out[first:first + len(reads)] = np.einsum("cbt,bt->bc", windows[:, bases], bank[upsampled % up])
+    return out
+
+
+# ------------------------------
+# STFT: общий спектральный движок
+# ------------------------------
+STFT_SIZE = 2048
+STFT_HOP = 512
+STFT_BATCH = 1024  # Кадров на один вызов rfft/irfft: ограничивает временные буферы
+
+# Кэш окон Ханна: n_fft -> окно (только чтение)
+_WINDOWS = {}
+
+
+def stft_window(n_fft):
+    """Периодическое окно Ханна длины n_fft из кэша."""
+    window = _WINDOWS.get(n_fft)
+    if window is None:
+        window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        window.flags.writeable = False
+        _WINDOWS[n_fft] = window
+    return window
+
+
+def stft_frequencies(n_fft, frame_rate):
+    """Частоты полос STFT в Гц."""
+    return np.fft.rfftfreq(n_fft, 1.0 / frame_rate)
+
+
+def stft(samples, n_fft=STFT_SIZE, hop=STFT_HOP):
+    """
+    STFT всех каналов сразу: кадры берутся strided-представлением без копирования
+    (sliding_window_view), rfft выполняется пакетами по STFT_BATCH кадров сразу
+    для всех каналов. Сигнал центрируется (дополняется n_fft // 2 нулями).
+    Возвращает спектр complex64 формы (frames, channels, n_fft // 2 + 1).
+    """
+    pad = n_fft // 2
+    padded = np.pad(samples, ((pad, pad + hop), (0, 0)))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft, axis=0)[::hop]
+    window = stft_window(n_fft)
+    spectrum = np.empty(frames.shape[:2] + (n_fft // 2 + 1,), dtype=np.complex64)
+    for start in range(0, len(frames), STFT_BATCH):
+        spectrum[start:start + STFT_BATCH] = np.fft.rfft(frames[start:start + STFT_BATCH] * window, axis=-1)
+    return spectrum
+
+
+def _overlap_add(out, spectrum, start, n_fft, hop):
+    """
+    Добавляет кадры spectrum (начиная с кадра start) в буфер overlap-add out
+    формы (frames + n_fft // hop - 1, channels, hop): кадр режется на n_fft // hop
+    сегментов длины hop, и каждый сегмент складывается одним векторным сложением.
+    """
+    overlap = n_fft // hop
+    frames = np.fft.irfft(spectrum, n=n_fft, axis=-1).astype(np.float32) * stft_window(n_fft)
+    segments = frames.reshape(len(spectrum), spectrum.shape[1], overlap, hop)
+    for i in range(overlap):
+        out[start + i:start + i + len(spectrum)] += segments[:, :, i]
+
+
+def _finish_overlap_add(out, count, n_fft, hop, length):
+    """Нормирует буфер overlap-add из count кадров и возвращает сигнал (length, channels)."""
+    window = stft_window(n_fft)
+    overlap = n_fft // hop
+    norm = np.zeros((count + overlap - 1, 1, hop), dtype=np.float32)
+    window_sq = (window * window).reshape(overlap, hop)
+    for i in range(overlap):
+        norm[i:i + count] += window_sq[i]
+    out /= np.maximum(norm, 1e-6)
+    out = out.transpose(0, 2, 1).reshape(-1, out.shape[1])
+    pad = n_fft // 2
+    if length is None:
+        length = (count - 1) * hop
+    return out[pad:pad + length]
+
+
+def istft(spectrum, n_fft=STFT_SIZE, hop=STFT_HOP, length=None):
+    """
+    Обратное STFT с overlap-add пакетами по STFT_BATCH кадров (см. _overlap_add).
+    Нормировка — по сумме квадратов окна, так что stft -> istft восстанавливает
+    сигнал. length — длина выхода (по умолчанию по числу кадров).
+    """
+    count, channels = spectrum.shape[:2]
+    out = np.zeros((count + n_fft // hop - 1, channels, hop), dtype=np.float32)
+    for start in range(0, count, STFT_BATCH):
+        _overlap_add(out, spectrum[start:start + STFT_BATCH], start, n_fft, hop)
+    return _finish_overlap_add(out, count, n_fft, hop, length)
+
+
+def apply_spectral(samples, frame_rate, process, n_fft=STFT_SIZE, hop=STFT_HOP):
+    """
+    Общий путь спектральных эффектов: stft -> process(spectrum, frequencies) -> istft.
+    process изменяет спектр (frames, channels, bins) на месте или возвращает новый.
+    Результат записывается в samples на месте, длина сохраняется.
+    """
+    if len(samples) == 0:
+        return samples
+    spectrum = stft(samples, n_fft, hop)
+    result = process(spectrum, stft_frequencies(n_fft, frame_rate))
+    samples[:] = istft(spectrum if result is None else result, n_fft, hop, len(samples))
+    return samples
+
+
+def _smooth_mask(mask):
+    """Сглаживание маски усреднением 3x3 по времени и частоте (против «музыкального шума»)."""
+    padded = np.pad(mask, ((1, 1), (0, 0), (1, 1)), mode="edge")
+    along_time = (padded[:-2] + padded[1:-1] + padded[2:]) / 3.0
+    return (along_time[..., :-2] + along_time[..., 1:-1] + along_time[..., 2:]) / 3.0
+
+
+# Ширина скользящей медианы профиля шума по частоте, полос
+NOISE_PROFILE_BINS = 31
+
+
+def _noise_profile(magnitude, noise_percentile):
+    """
+    Профиль шума (1, channels, bins): noise_percentile-й перцентиль модуля по кадрам,
+    сглаженный скользящей медианой по частоте. Медиана не даёт стационарным тонам
+    (у которых перцентиль по времени высок) попасть в профиль шума.
+    """
+    profile = np.percentile(magnitude, noise_percentile, axis=0)
+    half = NOISE_PROFILE_BINS // 2
+    padded = np.pad(profile, ((0, 0), (half, half)), mode="edge")
+    windows = np.lib.stride_tricks.sliding_window_view(padded, NOISE_PROFILE_BINS, axis=1)
+    return np.median(windows, axis=-1)[None].astype(np.float32)
+
+
+def apply_spectral_gate(samples, frame_rate, threshold_db=15.0, reduction_db=24.0, noise_percentile=10.0):
+    """
+    Спектральный гейт (шумоподавление).
+
+    Профиль шума оценивается по самому сигналу (см. _noise_profile) для каждой
+    полосы и канала. Ячейки, уровень которых не превышает профиль более чем на
+    threshold_db, ослабляются на reduction_db; маска сглаживается, чтобы
+    переходы не давали артефактов.
     """
-    output = audio
-    for i in range(1, repetitions + 1):
-        # Задержка увеличивается на i * delay_ms, а ослабление – на i * decay_dB
-        delayed = AudioSegment.silent(duration=delay_ms * i) + audio.apply_gain(-decay_dB * i)
-        output = output.overlay(delayed)
-    return output
+    if reduction_db <= 0:
+        return samples
+
+    def process(spectrum, frequencies):
+        magnitude = np.abs(spectrum)
+        noise = _noise_profile(magnitude, noise_percentile)
+        floor = 10.0 ** (-reduction_db / 20.0)
+        mask = np.where(magnitude > noise * 10.0 ** (threshold_db / 20.0), 1.0, floor).astype(np.float32)
+        spectrum *= _smooth_mask(mask)
+
+    return apply_spectral(samples, frame_rate, process)
+
+
+def _tilt_gains(frequencies, tilt_db_per_octave, pivot_hz):
+    octaves = np.log2(np.maximum(frequencies, 20.0) / pivot_hz)
+    return (10.0 ** (tilt_db_per_octave * octaves / 20.0)).astype(np.float32)
 
 
-def apply_eq(audio, low_gain=0.0, high_gain=0.0):
+def apply_spectral_tilt(samples, frame_rate, tilt_db_per_octave=0.0, pivot_hz=1000.0):
     """
-    Применяет простой эквалайзер:
-    - Для низких частот используется low_pass_filter (до 200 Hz)
-    - Для высоких частот используется high_pass_filter (от 2000 Hz)
-    Затем корректируются уровни громкости полученных фрагментов и накладываются на оригинал.
+    Наклон спектра: усиление меняется на tilt_db_per_octave за октаву относительно
+    pivot_hz (положительный наклон — ярче, отрицательный — глуше).
     """
-    # Извлекаем "низкие" компоненты и усиливаем/ослабляем их
-    lows = audio.low_pass_filter(200).apply_gain(low_gain)
-    # Извлекаем "высокие" компоненты и корректируем их
-    highs = audio.high_pass_filter(2000).apply_gain(high_gain)
-    # Объединяем оригинал с обработанными частями
-    processed = audio.overlay(lows).overlay(highs)
-    return processed
+    if tilt_db_per_octave == 0:
+        return samples
+
+    def process(spectrum, frequencies):
+        spectrum *= _tilt_gains(frequencies, tilt_db_per_octave, pivot_hz)
+
+    return apply_spectral(samples, frame_rate, process)
+
+
+# Наклон (dB/октаву) на единицу отклонения spectral_mod от 1.0
+SPECTRAL_MOD_DB_PER_OCTAVE = 6.0
+
+
+def apply_spectral_mod(samples, frame_rate, amount=1.0, pivot_hz=1000.0):
+    """
+    Спектральная модификация тембра: amount = 1.0 — без изменений, меньше — глуше,
+    больше — ярче (наклон (amount - 1) * SPECTRAL_MOD_DB_PER_OCTAVE dB/октаву).
+    В отличие от простого множителя громкости энергия сигнала сохраняется.
+    """
+    if amount == 1.0:
+        return samples
+    energy = float(np.sum(samples.astype(np.float64) ** 2))
+
+    def process(spectrum, frequencies):
+        spectrum *= _tilt_gains(frequencies, (amount - 1.0) * SPECTRAL_MOD_DB_PER_OCTAVE, pivot_hz)
+
+    apply_spectral(samples, frame_rate, process)
+    modified = float(np.sum(samples.astype(np.float64) ** 2))
+    if modified > 0:
+        samples *= np.float32(math.sqrt(energy / modified))
+    return samples
+
+
+# ------------------------------
+# Фазовый вокодер: растяжение времени и сдвиг тональности
+# ------------------------------
+def apply_time_stretch(samples, frame_rate, factor=1.0, n_fft=STFT_SIZE, hop=STFT_HOP):
+    """
+    Растягивает сигнал во времени в factor раз без изменения тональности (фазовый вокодер).
+
+    Шаг синтеза фиксирован (hop), анализ «читается» с дробным шагом 1 / factor:
+    амплитуды интерполируются между соседними кадрами, а приращения фазы
+    (за вычетом ожидаемого omega * hop) накапливаются cumsum по кадрам.
+    Выходные кадры обрабатываются пакетами по STFT_BATCH: для пакета считается
+    только нужный участок анализа, фаза переносится между пакетами, результат
+    сразу складывается overlap-add. Вычисления — в float32/complex64, так что
+    память, кроме выхода, не зависит от длины сигнала.
+    """
+    if factor == 1.0 or len(samples) == 0:
+        return samples
+    pad = n_fft // 2
+    padded = np.pad(samples, ((pad, pad + hop), (0, 0)))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft, axis=0)[::hop]
+    window = stft_window(n_fft)
+    count, channels = frames.shape[:2]
+    steps = np.arange(0, count, 1.0 / factor)
+    two_pi = np.float32(2 * np.pi)
+    expected = (2 * np.pi * hop * np.arange(n_fft // 2 + 1) / n_fft).astype(np.float32)
+
+    out = np.zeros((len(steps) + n_fft // hop - 1, channels, hop), dtype=np.float32)
+    phase = None
+    for start in range(0, len(steps), STFT_BATCH):
+        batch = steps[start:start + STFT_BATCH]
+        index = batch.astype(np.int64)
+        alpha = (batch - index).astype(np.float32)[:, None, None]
+        first, last = index[0], min(index[-1] + 2, count)
+        spectrum = np.fft.rfft(frames[first:last] * window, axis=-1).astype(np.complex64)
+        # После последнего кадра анализа — тишина
+        spectrum = np.concatenate([spectrum, np.zeros_like(spectrum[:1])])
+        left = spectrum[index - first]
+        right = spectrum[index + 1 - first]
+        del spectrum
+
+        magnitude = (1.0 - alpha) * np.abs(left) + alpha * np.abs(right)
+        if phase is None:
+            phase = np.angle(left[0])
+        advance = np.angle(right) - np.angle(left) - expected
+        del left, right
+        # Приращение приводится к (-pi, pi], к нему добавляется ожидаемое и всё берётся
+        # по модулю 2pi: накопленная фаза остаётся малой и точной в float32
+        advance -= two_pi * np.round(advance / two_pi)
+        advance += expected
+        np.remainder(advance, two_pi, out=advance)
+        block_phase = np.empty_like(advance)
+        block_phase[0] = phase
+        np.cumsum(advance[:-1], axis=0, out=block_phase[1:])
+        block_phase[1:] += phase
+        phase = np.remainder(block_phase[-1] + advance[-1], two_pi)
+        del advance
+
+        stretched = np.empty(magnitude.shape, dtype=np.complex64)
+        stretched.real = magnitude * np.cos(block_phase)
+        stretched.imag = magnitude * np.sin(block_phase)
+        del magnitude, block_phase
+        _overlap_add(out, stretched, start, n_fft, hop)
+    return _finish_overlap_add(out, len(steps), n_fft, hop, int(round(len(samples) * factor)))
 
 
-def apply_pitch_shift(audio, semitones=0):
+def apply_pitch_shift(samples, frame_rate, semitones=0, time_stretch=1.0):
     """
-    Применяет сдвиг тональности (pitch shift) путём изменения frame_rate.
-    При этом длительность аудио сохраняется за счет последующей корректировки.
+    Применяет сдвиг тональности (pitch shift) с сохранением длительности.
+
+    Сигнал растягивается фазовым вокодером в ratio * time_stretch раз
+    (ratio = 2^(semitones/12)), затем полифазно передискретизируется в 1 / ratio раз:
+    тональность меняется на semitones, а итоговая длительность умножается
+    только на time_stretch. Обе величины настраиваются независимо.
     """
+    if semitones == 0 and time_stretch == 1.0:
+        return samples
+    ratio = 2 ** (semitones / 12.0)
+    length = int(round(len(samples) * time_stretch))
+    stretched = apply_time_stretch(samples, frame_rate, ratio * time_stretch)
     if semitones == 0:
-        return audio
-    new_rate = int(audio.frame_rate * (2 ** (semitones / 12.0)))
-    shifted = audio._spawn(audio.raw_data, overrides={"frame_rate": new_rate})
-    # Возвращаем аудио с исходным frame_rate, чтобы сохранить длительность
-    return shifted.set_frame_rate(audio.frame_rate)
+        return stretched[:length]
+    return resample_ratio(stretched, 1.0 / ratio, length)
+
+
+def design_lowpass_kernel(cutoff_frequency, frame_rate, transition_hz=None):
+    """
+    Рассчитывает ФНЧ-ядро методом взвешенного sinc (окно Блэкмана).
+
+    Ширина переходной полосы по умолчанию — 10% от частоты среза (не уже 20 Hz);
+    для окна Блэкмана она связана с длиной ядра как transition ≈ 5.5 * fs / taps.
+    Ядро симметрично (линейная фаза), задержка равна (taps - 1) / 2 отсчётов,
+    коэффициент передачи на нулевой частоте равен 1.
+    """
+    nyquist = frame_rate / 2.0
+    cutoff = min(float(cutoff_frequency), nyquist)
+    if transition_hz is None:
+        transition_hz = max(0.1 * cutoff, 20.0)
+    taps = int(math.ceil(5.5 * frame_rate / transition_hz)) | 1
+    n = np.arange(taps) - (taps - 1) / 2.0
+    kernel = np.sinc(2.0 * cutoff / frame_rate * n) * np.blackman(taps)
+    kernel /= kernel.sum()
+    return kernel.astype(np.float32)
+
+
+def apply_lowpass_filter(samples, frame_rate, cutoff_frequency=3000):
+    """
+    Применяет низкочастотную фильтрацию блочной быстрой свёрткой.
+
+    Ядро — взвешенный sinc (design_lowpass_kernel), свёртка выполняется
+    convolve по всем каналам сразу: короткое ядро — одним проходом
+    overlap-save пачками блоков. Задержка линейно-фазового ядра
+    компенсируется, так что отфильтрованный сигнал не смещается во времени.
+    """
+    if cutoff_frequency >= frame_rate / 2.0:
+        return samples
+    kernel = design_lowpass_kernel(cutoff_frequency, frame_rate)
+    return convolve(samples, kernel[:, None], latency=(len(kernel) - 1) // 2)
+
+
+# ------------------------------
+# Секционированная FFT-свёртка
+# ------------------------------
+class PartitionedConvolver:
+    """
+    Равномерно секционированная свёртка методом overlap-add в частотной области.
+
+    Импульсная характеристика (IR) длины M режется на P = ceil(M / B) секций по B
+    отсчётов, спектры секций (rfft размера 2B) считаются один раз. Каждый входной
+    блок из B отсчётов преобразуется одним rfft и попадает в частотную линию
+    задержки (FDL); спектр выхода — сумма произведений FDL на спектры секций,
+    после чего выполняется один irfft и перекрытие с хвостом предыдущего блока.
+    Состояние (FDL и хвост) сохраняется между вызовами process_block.
+    """
+
+    def __init__(self, spectra, block_size):
+        self.block_size = block_size
+        self.spectra = spectra  # (P, B + 1, channels), complex
+        self.reset()
+
+    @classmethod
+    def from_impulse_response(cls, ir, block_size):
+        """Строит свёртку по IR формы (frames, channels)."""
+        partitions = max(1, -(-len(ir) // block_size))
+        padded = np.zeros((partitions * block_size, ir.shape[1]), dtype=np.float32)
+        padded[:len(ir)] = ir
+        sections = padded.reshape(partitions, block_size, ir.shape[1])
+        spectra = np.fft.rfft(sections, n=2 * block_size, axis=1).astype(np.complex64)
+        return cls(spectra, block_size)
+
+    def reset(self):
+        """Сбрасывает состояние линии задержки."""
+        self._fdl = None
+        self._overlap = None
+        self._pos = 0
+
+    def _allocate(self, channels):
+        partitions, bins, ir_channels = self.spectra.shape
+        if ir_channels != channels:
+            # Моно-IR раздаётся на все каналы, многоканальная — сводится в моно
+            mono = self.spectra if ir_channels == 1 else self.spectra.mean(axis=2, keepdims=True)
+            self.spectra = np.repeat(mono, channels, axis=2)
+        self._fdl = np.zeros((partitions, bins, channels), dtype=np.complex64)
+        self._overlap = np.zeros((self.block_size, channels), dtype=np.float32)
+
+    def process_block(self, block):
+        """Обрабатывает блок (n <= block_size, channels) и возвращает выход той же формы."""
+        B = self.block_size
+        if self._fdl is None:
+            self._allocate(block.shape[1])
+        partitions = len(self.spectra)
+        self._pos = (self._pos + 1) % partitions
+        pos = self._pos
+        self._fdl[pos] = np.fft.rfft(block, n=2 * B, axis=0)
+
+        # Свежий спектр умножается на секцию 0, предыдущий — на секцию 1 и т.д.
+        spectrum = (self._fdl[pos::-1] * self.spectra[:pos + 1]).sum(axis=0)
+        if pos + 1 < partitions:
+            spectrum += (self._fdl[:pos:-1] * self.spectra[pos + 1:]).sum(axis=0)
+
+        y = np.fft.irfft(spectrum, n=2 * B, axis=0)
+        out = y[:B] + self._overlap
+        self._overlap[:] = y[B:]
+        return out[:len(block)]
+
+    def process(self, samples, wet=1.0, dry=0.0, latency=0):
+        """
+        Свёртка всего сигнала блоками; результат dry * x + wet * (x * h)
+        записывается на месте, длина сигнала сохраняется. latency — задержка
+        ядра в отсчётах, которая вычитается из выхода (для линейно-фазовых фильтров).
+        """
+        B = self.block_size
+        length = len(samples)
+        for start in range(0, length + latency, B):
+            block = samples[start:start + B]
+            if len(block) < B:
+                # Последний неполный блок и «прогон» задержки дополняются нулями
+                padded = np.zeros((B, samples.shape[1]), dtype=np.float32)
+                padded[:len(block)] = block
+                block = padded
+            convolved = self.process_block(block)
+
+            out_start = start - latency
+            lo = max(out_start, 0)
+            hi = min(out_start + B, length)
+            if hi > lo:
+                target = samples[lo:hi]
+                target *= dry
+                target += wet * convolved[lo - out_start:hi - out_start]
+        return samples
 
 
-def apply_lowpass_filter(audio, cutoff_frequency=3000):
+FFT_CONVOLVE_MAX_IR = 16384  # Длиннее — секционированная свёртка: размер FFT растёт с IR
+FFT_CONVOLVE_MIN_SIZE = 16384  # Меньшие FFT упираются в накладные расходы вызовов numpy
+FFT_CONVOLVE_BATCH = 4  # Блоков на один вызов rfft/irfft: ограничивает временные буферы
+
+
+def fft_convolve(samples, ir, latency=0):
+    """
+    Свёртка с короткой IR (frames, channels) одним проходом overlap-save.
+
+    Размер FFT — не меньше 8 длин IR, поэтому за блок выдаётся почти весь
+    размер FFT, а блоки не зависят друг от друга: входные окна берутся
+    strided-представлением и преобразуются пачками по FFT_CONVOLVE_BATCH без
+    цикла по отдельным блокам. Внутри сигнал хранится по каналам (channels,
+    frames), чтобы отсчёты окна лежали в памяти подряд. Результат
+    записывается на месте, длина сигнала сохраняется; latency — задержка
+    ядра, вычитаемая из выхода.
     """
-    Применяет низкочастотную фильтрацию методом дискретного преобразования Фурье (ДПФ).
+    M = len(ir)
+    channels = samples.shape[1]
+    if ir.shape[1] not in (1, channels):
+        ir = ir.mean(axis=1, keepdims=True)
+    n_fft = max(FFT_CONVOLVE_MIN_SIZE, 1 << (8 * M - 1).bit_length())
+    hop = n_fft - M + 1
+    count = -(-len(samples) // hop)
+    # x[n - M + 1] лежит в planar[:, n]; окно блока, начинающегося с выхода s, — planar[:, s:s + n_fft]
+    planar = np.zeros((channels, latency + count * hop + n_fft), dtype=np.float32)
+    planar[:, M - 1:M - 1 + len(samples)] = samples.T
+    windows = np.lib.stride_tricks.sliding_window_view(planar, n_fft, axis=1)[:, latency::hop][:, :count]
+    spectrum = np.fft.rfft(ir, n=n_fft, axis=0).T[:, None, :]  # (channels, 1, bins)
+    for first in range(0, count, FFT_CONVOLVE_BATCH):
+        batch = np.fft.irfft(np.fft.rfft(windows[:, first:first + FFT_CONVOLVE_BATCH], axis=-1) * spectrum,
+                             n=n_fft, axis=-1)[..., M - 1:]
+        start = first * hop
+        out = batch.reshape(channels, -1)[:, :len(samples) - start]
+        samples[start:start + out.shape[1]] = out.T
+    return samples
 
-    Данный метод позволяет удалить высокочастотные компоненты сигнала, сохранены
-    только низкочастотные составляющие. Пусть x[n] - входной сигнал, представленный в виде ряда длины N.
-    Дискретное преобразование Фурье задаётся выражением:
 
-        X[k] = sum(x[n] * exp(-j*2*pi*k*n/N)), k=0,..., N-1.
+def convolve(samples, ir, latency=0):
+    """Свёртка на месте: короткие IR — fft_convolve, длинные — PartitionedConvolver."""
+    if len(ir) <= FFT_CONVOLVE_MAX_IR:
+        return fft_convolve(samples, ir, latency)
+    convolver = PartitionedConvolver.from_impulse_response(ir, max(4096, _auto_block_size(len(ir))))
+    return convolver.process(samples, latency=latency)
 
-    Формируется булева маска, оставляющая компоненты спектра, удовлетворяющие условию |f| < cutoff_frequency.
-    После умножения спектра на маску выполняется обратное преобразование Фурье для получения отфильтрованного временного сигнала.
+
+def _auto_block_size(ir_length):
+    """
+    Размер блока для офлайн-обработки: около M/4, но в пределах 1024..32768.
+    Число секций тогда ограничено, и стоимость на отсчёт растёт как log(B),
+    а не как длина IR.
     """
-    import numpy as np
+    target = max(1024, min(32768, ir_length // 4))
+    return 1 << (target - 1).bit_length()
 
-    # Преобразуем аудиофайл в массив сэмплов
-    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
-    N = len(samples)
 
-    # Вычисляем ДПФ сигнала
-    spectrum = np.fft.fft(samples)
-    # Определяем соответствующие частоты для каждого сэмпла
-    freqs = np.fft.fftfreq(N, d=1 / audio.frame_rate)
-    # Создаем маску, оставляя только компоненты с абсолютной частотой ниже cutoff_frequency
-    mask = np.abs(freqs) < cutoff_frequency
-    filtered_spectrum = spectrum * mask
+def load_impulse_response(filepath, frame_rate):
+    """
+    Загружает IR с диска, приводит её к frame_rate и нормирует по энергии,
+    чтобы громкость сигнала после свёртки оставалась сопоставимой.
+    """
+    ir, ir_rate = decode_audio(filepath)
+    ir = np.array(resample(ir, ir_rate, frame_rate), dtype=np.float32)
+    energy = float(np.sqrt(np.sum(ir.astype(np.float64) ** 2) / ir.shape[1]))
+    if energy > 0:
+        ir /= energy
+    return ir
+
+
+# Кэш загруженных IR: (путь, mtime, размер, частота) -> ir
+_IR_SAMPLES = {}
+# Кэш спектров секций IR: (путь, mtime, размер, частота, блок) -> PartitionedConvolver
+_IR_CACHE = {}
 
-    # Обратное преобразование для получения временного сигнала
-    filtered_samples = np.fft.ifft(filtered_spectrum).real
-    filtered_samples = np.int16(filtered_samples)
 
-    # Создаем новый AudioSegment с отфильтрованными данными
-    filtered_audio = audio._spawn(filtered_samples.tobytes())
-    return filtered_audio
+def get_impulse_response(ir_filepath, frame_rate):
+    """Возвращает нормированную IR из кэша, загружая файл только при изменении."""
+    path = os.path.abspath(ir_filepath)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, frame_rate)
+    ir = _IR_SAMPLES.get(key)
+    if ir is None:
+        ir = load_impulse_response(path, frame_rate)
+        _IR_SAMPLES[key] = ir
+    return ir
 
 
-def process_audio(input_filepath, output_filepath, effects_list):
+def get_convolver(ir_filepath, frame_rate, block_size=None):
     """
-    Загружает аудиофайл по пути input_filepath, последовательно применяет эффекты из списка effects_list,
-    где каждый элемент является функцией, принимающей и возвращающей объект AudioSegment.
-    Результат экспортируется в формате mp3 по пути output_filepath.
+    Возвращает свёртку для IR-файла. Спектры секций берутся из кэша, поэтому
+    повторное применение того же IR не читает файл и не считает rfft заново.
+    """
+    path = os.path.abspath(ir_filepath)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, frame_rate, block_size)
+    cached = _IR_CACHE.get(key)
+    if cached is None:
+        ir = get_impulse_response(path, frame_rate)
+        block = block_size or _auto_block_size(len(ir))
+        cached = PartitionedConvolver.from_impulse_response(ir, block)
+        _IR_CACHE[key] = cached
+    return PartitionedConvolver(cached.spectra, cached.block_size)
+
+
+def apply_convolution_reverb(samples, frame_rate, ir_filepath, wet=0.35, dry=1.0, block_size=None):
     """
+    Применяет свёрточную реверберацию с импульсной характеристикой из файла.
+    Работает на месте; длина сигнала сохраняется (хвост реверберации обрезается).
+    """
+    convolver = get_convolver(ir_filepath, frame_rate, block_size)
+    return convolver.process(samples, wet=wet, dry=dry)
+
+
+# ------------------------------
+# Компилятор цепочки эффектов
+# ------------------------------
+# Эффект в цепочке задаётся парой (name, params): params передаются в функцию
+# как именованные аргументы после (samples, frame_rate). Такие описания можно
+# сравнивать, хэшировать и передавать в другие процессы, в отличие от lambda.
+EFFECTS = {
+    "gain": apply_gain,
+    "reverb": apply_reverb,
+    "convolution_reverb": apply_convolution_reverb,
+    "delay": apply_delay,
+    "eq": apply_eq,
+    "lowpass": apply_lowpass_filter,
+    "pitch_shift": apply_pitch_shift,
+    "spectral_gate": apply_spectral_gate,
+    "spectral_tilt": apply_spectral_tilt,
+    "spectral_mod": apply_spectral_mod,
+}
+
+
+# Максимальная длина объединённой КИХ: более длинные хвосты (например, delay с
+# обратной связью и малым затуханием) дешевле считать исходным алгоритмом.
+MAX_FIR_SECONDS = 5.0
+
+
+def _impulse(value=1.0):
+    return np.full((1, 1), value, dtype=np.float32)
+
+
+def _taps_ir(delay, gains):
+    """ИХ из отводов с шагом delay и заданными усилениями (нулевой отвод — первый)."""
+    ir = np.zeros((delay * (len(gains) - 1) + 1, 1), dtype=np.float32)
+    ir[::delay, 0] = gains
+    return ir
+
+
+def _gain_ir(frame_rate, gain_db=0.0):
+    return _impulse(10.0 ** (gain_db / 20.0)), 0
+
+
+def _reverb_ir(frame_rate, delay_ms=100, decay_dB=6):
+    delay = _ms_to_frames(delay_ms, frame_rate)
+    if delay <= 0:
+        return _impulse(), 0
+    return _taps_ir(delay, [1.0, _db_to_gain(decay_dB)]), 0
+
+
+def _delay_ir(frame_rate, delay_ms=300, decay_dB=3, repetitions=2, feedback=False):
+    delay = _ms_to_frames(delay_ms, frame_rate)
+    gain = _db_to_gain(decay_dB)
+    if delay <= 0 or (repetitions <= 0 and not feedback):
+        return _impulse(), 0
+    if feedback:
+        if gain >= 1.0:
+            return None
+        # Хвост IIR-гребёнки обрезается на уровне -120 dB
+        repetitions = int(math.ceil(math.log(1e-6) / math.log(gain)))
+    return _taps_ir(delay, gain ** np.arange(repetitions + 1)), 0
+
+
+def _eq_ir(frame_rate, low_gain=0.0, high_gain=0.0, bands=()):
+    sections = eq_sections(frame_rate, low_gain, high_gain, bands)
+    if not sections:
+        return _impulse(), 0
+    return sos_impulse_response(np.asarray(sections, dtype=np.float64))[:, None], 0
+
+
+def _lowpass_ir(frame_rate, cutoff_frequency=3000):
+    if cutoff_frequency >= frame_rate / 2.0:
+        return _impulse(), 0
+    kernel = design_lowpass_kernel(cutoff_frequency, frame_rate)
+    return kernel[:, None], (len(kernel) - 1) // 2
+
+
+def _convolution_reverb_ir(frame_rate, ir_filepath, wet=0.35, dry=1.0, block_size=None):
+    ir = wet * get_impulse_response(ir_filepath, frame_rate)
+    ir[0] += dry
+    return ir, 0
+
+
+def _pitch_shift_ir(frame_rate, semitones=0, time_stretch=1.0):
+    # Нейтральные параметры не меняют сигнал; иначе эффект нелинеен по времени
+    if semitones == 0 and time_stretch == 1.0:
+        return _impulse(), 0
+    return None
+
+
+def _spectral_gate_ir(frame_rate, threshold_db=15.0, reduction_db=24.0, noise_percentile=10.0):
+    return (_impulse(), 0) if reduction_db <= 0 else None
+
+
+def _spectral_tilt_ir(frame_rate, tilt_db_per_octave=0.0, pivot_hz=1000.0):
+    return (_impulse(), 0) if tilt_db_per_octave == 0 else None
+
+
+def _spectral_mod_ir(frame_rate, amount=1.0, pivot_hz=1000.0):
+    return (_impulse(), 0) if amount == 1.0 else None
+
+
+# Линейные стационарные эффекты: name -> функция, возвращающая (ir, latency)
+# или None, если при данных параметрах эффект нельзя заменить конечной ИХ.
+IMPULSE_RESPONSES = {
+    "gain": _gain_ir,
+    "reverb": _reverb_ir,
+    "convolution_reverb": _convolution_reverb_ir,
+    "delay": _delay_ir,
+    "eq": _eq_ir,
+    "lowpass": _lowpass_ir,
+    "pitch_shift": _pitch_shift_ir,
+    "spectral_gate": _spectral_gate_ir,
+    "spectral_tilt": _spectral_tilt_ir,
+    "spectral_mod": _spectral_mod_ir,
+}
+
+
+def _combine_irs(irs, max_length):
+    """Свёртка нескольких ИХ в одну через произведение спектров (с обрезкой до max_length)."""
+    full = sum(len(ir) for ir in irs) - len(irs) + 1
+    n_fft = 1 << (full - 1).bit_length()
+    spectrum = np.fft.rfft(irs[0], n=n_fft, axis=0)
+    for ir in irs[1:]:
+        spectrum = spectrum * np.fft.rfft(ir, n=n_fft, axis=0)
+    return np.fft.irfft(spectrum, n=n_fft, axis=0)[:min(full, max_length)].astype(np.float32)
+
+
+def _fir_stage(ir, latency):
+    def stage(samples, frame_rate):
+        return convolve(samples, ir, latency=latency)
+    return stage
+
+
+def _effect_stage(name, params):
+    effect = EFFECTS[name]
+    return lambda samples, frame_rate: effect(samples, frame_rate, **params)
+
+
+def compile_chain(effects_list, frame_rate, length):
+    """
+    Планирует цепочку эффектов для сигнала длины length.
+
+    Подряд идущие линейные стационарные эффекты (gain, reverb, delay, eq, lowpass,
+    convolution_reverb) заменяются одной КИХ — свёрткой их импульсных характеристик,
+    которая применяется одной секционированной FFT-свёрткой. ИХ обрезается до
+    length + задержка: более поздние отсчёты всё равно не попадают в выход той же
+    длины. Группа не растёт дальше MAX_FIR_SECONDS. Из-за некаузального ядра lowpass
+    результат может отличаться от последовательного применения только у краёв сигнала.
+    Нелинейные и нестационарные узлы (pitch_shift с ненулевым сдвигом, произвольные
+    функции effect(samples, frame_rate)) остаются отдельными шагами.
+
+    Возвращает список (label, stage), где stage(samples, frame_rate) -> samples.
+    """
+    plan = []
+    group = []  # [(name, ir, latency, params)]
+    max_fir = int(MAX_FIR_SECONDS * frame_rate)
+
+    def flush():
+        if len(group) == 1:
+            name = group[0][0]
+            plan.append((name, _effect_stage(name, group[0][3])))
+        elif group:
+            latency = sum(item[2] for item in group)
+            ir = _combine_irs([item[1] for item in group], length + latency)
+            label = "fir(" + "+".join(item[0] for item in group) + ")"
+            plan.append((label, _fir_stage(ir, latency)))
+        group.clear()
+
+    for effect in effects_list:
+        if callable(effect):
+            flush()
+            plan.append((getattr(effect, "__name__", "effect"), effect))
+            continue
+        name, params = effect
+        builder = IMPULSE_RESPONSES.get(name)
+        response = builder(frame_rate, **params) if builder else None
+        if response is None or len(response[0]) > max_fir:
+            flush()
+            plan.append((name, _effect_stage(name, params)))
+            continue
+        if sum(len(item[1]) for item in group) + len(response[0]) > max_fir:
+            flush()
+        group.append((name, response[0], response[1], params))
+    flush()
+    return plan
+
+
+class ProcessingCancelled(Exception):
+    """Обработка прервана пользователем (см. cancel_event в process_audio)."""
+
+
+# Доли общего прогресса: декодирование, цепочка эффектов, кодирование
+_PROGRESS_DECODED = 0.1
+_PROGRESS_PROCESSED = 0.9
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise ProcessingCancelled()
+
+
+def _report(progress, value):
+    if progress is not None:
+        progress(value)
+
+
+def _run_chain(samples, frame_rate, effects_list, progress=None, cancel_event=None):
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    plan = compile_chain(effects_list, frame_rate, len(samples))
+    print("[DEBUG] План обработки:", " -> ".join(label for label, _ in plan) or "без эффектов")
+    span = _PROGRESS_PROCESSED - _PROGRESS_DECODED
+    for i, (label, stage) in enumerate(plan):
+        _check_cancelled(cancel_event)
+        samples = stage(samples, frame_rate)
+        _report(progress, _PROGRESS_DECODED + span * (i + 1) / len(plan))
+    _check_cancelled(cancel_event)
+    return samples
+
+
+def process_audio(input_filepath, output_filepath, effects_list, output_format="mp3",
+                  progress=None, cancel_event=None, intermediate_filepath=None, streaming=False,
+                  output_rate=None):
+    """
+    Загружает аудиофайл по пути input_filepath в AudioBuffer (frames, channels),
+    применяет цепочку эффектов effects_list и экспортирует результат в формате
+    output_format по пути output_filepath. Элемент цепочки — описание (name, params)
+    из EFFECTS либо функция effect(samples, frame_rate); линейные эффекты объединяются
+    compile_chain в один проход.
+
+    progress(value) получает долю выполненной работы 0..1 после каждого шага.
+    Если установлен cancel_event (threading.Event), обработка прерывается между
+    шагами исключением ProcessingCancelled, и файл не записывается.
+
+    Если задан intermediate_filepath, результат дополнительно сохраняется как
+    float32 .npy: повторная обработка из него не требует декодирования.
+
+    streaming=True включает потоковый режим (см. process_stream): пиковая память
+    не зависит от длины файла. Цепочки, которые нельзя обработать блоками,
+    обрабатываются целиком в памяти.
+
+    output_rate — частота дискретизации результата (полифазная передискретизация
+    после цепочки); None — частота исходника.
+    """
+    if streaming:
+        stages = None
+        try:
+            reader = AudioStreamReader(input_filepath)
+        except Exception as e:
+            print("Ошибка загрузки аудио:", e)
+            return None
+        try:
+            if output_rate in (None, reader.frame_rate):
+                stages = compile_stream(effects_list, reader.frame_rate)
+            if stages is not None:
+                return process_stream(reader, output_filepath, stages, output_format,
+                                      progress, cancel_event, intermediate_filepath)
+        finally:
+            reader.close()
+        print("[DEBUG] Цепочка не поддерживает потоковую обработку, файл обрабатывается целиком")
     try:
-        audio = AudioSegment.from_file(input_filepath)
+        buffer = AudioBuffer.load(input_filepath)
     except Exception as e:
         print("Ошибка загрузки аудио:", e)
         return None
+    print(f"[DEBUG] Загружено: {buffer}")
+    _report(progress, _PROGRESS_DECODED)
+
+    buffer = buffer.process(effects_list, progress, cancel_event).resample(output_rate)
+
+    try:
+        if intermediate_filepath:
+            buffer.save(intermediate_filepath, format="npy")
+        buffer.save(output_filepath, format=output_format)
+    except Exception as e:
+        print("Ошибка экспорта аудио:", e)
+        return None
+    _report(progress, 1.0)
+
+    print(f"[DEBUG] Аудио сохранено по пути: {output_filepath}")
+    return output_filepath
+
+
+# ------------------------------
+# Потоковая обработка блоками
+# ------------------------------
+STREAM_BLOCK_FRAMES = 16384
+
+
+class AudioStreamReader:
+    """
+    Последовательное чтение аудиофайла блоками float32 (frames, channels).
+
+    .npy читается срезами memmap, PCM WAV — модулем wave, остальные форматы
+    декодируются ffmpeg в поток f32le через канал, так что в памяти находится
+    только текущий блок. frames — длина в отсчётах или None, если неизвестна.
+    """
+
+    def __init__(self, filepath, block_frames=STREAM_BLOCK_FRAMES):
+        self.block_frames = block_frames
+        self._samples = self._wave = self._process = None
+        extension = os.path.splitext(filepath)[1].lower()
+        if extension == ".npy":
+            self._samples, self.frame_rate = load_npy(filepath, mmap_mode="r")
+            self.channels, self.frames = self._samples.shape[1], len(self._samples)
+            return
+        if extension == ".wav":
+            try:
+                self._wave = wave.open(filepath, "rb")
+                self.frame_rate, self.channels = self._wave.getframerate(), self._wave.getnchannels()
+                self.frames = self._wave.getnframes()
+                return
+            except (wave.Error, EOFError):
+                self._wave = None
+        info = mediainfo(filepath)
+        self.frame_rate, self.channels = int(info["sample_rate"]), int(info["channels"])
+        duration = float(info.get("duration") or 0)
+        self.frames = int(duration * self.frame_rate) if duration else None
+        self._process = subprocess.Popen(
+            [AudioSegment.converter, "-v", "error", "-i", filepath, "-f", "f32le", "-acodec", "pcm_f32le", "-"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+
+    def __iter__(self):
+        n = self.block_frames
+        if self._samples is not None:
+            for start in range(0, len(self._samples), n):
+                yield np.array(self._samples[start:start + n], dtype=np.float32)
+        elif self._wave is not None:
+            sample_width = self._wave.getsampwidth()
+            while True:
+                data = self._wave.readframes(n)
+                if not data:
+                    break
+                yield _pcm_to_float(data, sample_width, self.channels)
+        else:
+            frame_bytes = 4 * self.channels
+            while True:
+                data = self._process.stdout.read(n * frame_bytes)
+                usable = len(data) - len(data) % frame_bytes
+                if usable == 0:
+                    break
+                yield np.frombuffer(data[:usable], dtype="<f4").reshape(-1, self.channels).copy()
+            if self._process.wait() != 0:
+                raise RuntimeError(self._process.stderr.read().decode("utf-8", "replace").strip())
+
+    def close(self):
+        if self._wave is not None:
+            self._wave.close()
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+
+class AudioStreamWriter:
+    """
+    Последовательная запись блоков float32 (frames, channels) в файл.
+
+    WAV пишется модулем wave, .npy — сырыми данными с заголовком, который
+    переписывается при закрытии, остальные форматы кодируются ffmpeg из канала.
+    """
+
+    def __init__(self, filepath, frame_rate, channels, format="mp3"):
+        self.filepath = filepath
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.format = FORMAT_ALIASES.get(format, format)
+        self.frames = 0
+        self._wave = self._file = self._process = None
+        if self.format in ("wav16", "wav24"):
+            self._sample_width = 2 if self.format == "wav16" else 3
+            self._wave = wave.open(filepath, "wb")
+            self._wave.setnchannels(channels)
+            self._wave.setsampwidth(self._sample_width)
+            self._wave.setframerate(frame_rate)
+        elif self.format == "npy":
+            self._file = open(filepath, "wb")
+            self._write_npy_header()
+        else:
+            codec = {"ogg": ["-acodec", "libvorbis"]}.get(self.format, [])
+            self._process = subprocess.Popen(
+                [AudioSegment.converter, "-y", "-v", "error", "-f", "f32le", "-ar", str(frame_rate),
+                 "-ac", str(channels), "-i", "-"] + codec + ["-f", self.format, filepath],
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            )
+
+    def _write_npy_header(self):
+        # Заголовок .npy дополняется пробелами с запасом под рост длины оси,
+        # поэтому его можно переписать на месте, когда длина станет известна
+        header = {"descr": "<f4", "fortran_order": False, "shape": (self.frames, self.channels)}
+        np.lib.format.write_array_header_1_0(self._file, header)
+
+    def write(self, block):
+        if self._wave is not None:
+            self._wave.writeframes(_float_to_pcm(block, self._sample_width))
+        elif self._file is not None:
+            self._file.write(np.ascontiguousarray(block, dtype="<f4").tobytes())
+        else:
+            self._process.stdin.write(np.ascontiguousarray(block, dtype="<f4").tobytes())
+        self.frames += len(block)
+
+    def close(self):
+        if self._wave is not None:
+            self._wave.close()
+        elif self._file is not None:
+            data_offset = self._file.tell() - 4 * self.frames * self.channels
+            self._file.seek(0)
+            self._write_npy_header()
+            if self._file.tell() != data_offset:
+                raise RuntimeError("Заголовок .npy изменил длину")
+            self._file.close()
+            with open(sidecar_path(self.filepath), "w") as f:
+                json.dump({"frame_rate": self.frame_rate, "channels": self.channels}, f)
+        elif self._process is not None:
+            self._process.stdin.close()
+            if self._process.wait() != 0:
+                raise RuntimeError(self._process.stderr.read().decode("utf-8", "replace").strip())
+
+    def abort(self):
+        """Прерывает запись (файл остаётся неполным и должен быть удалён вызывающим)."""
+        if self._wave is not None:
+            self._wave.close()
+        elif self._file is not None:
+            self._file.close()
+        elif self._process is not None:
+            self._process.kill()
+            self._process.wait()
+
+
+class _FIRStream:
+    """Потоковая КИХ: секционированная свёртка с размером секции, равным блоку потока."""
+
+    def __init__(self, ir, latency, block_frames):
+        self.convolver = PartitionedConvolver.from_impulse_response(ir, block_frames)
+        self.latency = latency
+
+    def process_block(self, block):
+        return self.convolver.process_block(block)
+
+
+class _ConvolutionReverbStream:
+    """Потоковая свёрточная реверберация: dry * x + wet * (x * h)."""
+
+    latency = 0
+
+    def __init__(self, frame_rate, block_frames, ir_filepath, wet=0.35, dry=1.0, block_size=None):
+        self.convolver = get_convolver(ir_filepath, frame_rate, block_frames)
+        self.wet = wet
+        self.dry = dry
+
+    def process_block(self, block):
+        convolved = self.convolver.process_block(block)
+        block *= self.dry
+        block += self.wet * convolved
+        return block
+
+
+def _delay_stream(frame_rate, block_frames, delay_ms=300, decay_dB=3, repetitions=2, feedback=False):
+    delay = _ms_to_frames(delay_ms, frame_rate)
+    return MultiTapDelay(max(delay, 1), _db_to_gain(decay_dB), repetitions, feedback=feedback)
+
+
+def _reverb_stream(frame_rate, block_frames, delay_ms=100, decay_dB=6):
+    # Одиночное эхо — многоотводная задержка с одним повтором
+    return MultiTapDelay(max(_ms_to_frames(delay_ms, frame_rate), 1), _db_to_gain(decay_dB), 1)
+
+
+# Эффекты с собственным состоянием для потоковой обработки, которые нельзя
+# (или невыгодно) заменить КИХ: name -> фабрика(frame_rate, block_frames, **params)
+STREAM_PROCESSORS = {
+    "delay": _delay_stream,
+    "reverb": _reverb_stream,
+    "convolution_reverb": _ConvolutionReverbStream,
+}
+
+
+def compile_stream(effects_list, frame_rate, block_frames=STREAM_BLOCK_FRAMES):
+    """
+    Планирует цепочку для потоковой обработки. Как и в compile_chain, подряд идущие
+    линейные эффекты объединяются в одну КИХ (без обрезки: длина сигнала заранее
+    неизвестна); длинные хвосты обрабатываются STREAM_PROCESSORS. Каждый шаг хранит
+    состояние (линии задержки, FDL свёртки) между блоками.
+
+    Возвращает список шагов с process_block(block) и latency или None, если
+    цепочку нельзя обработать блоками (pitch_shift, произвольные функции).
+    """
+    stages = []
+    group = []  # [(ir, latency)]
+    max_fir = int(MAX_FIR_SECONDS * frame_rate)
+
+    def flush():
+        if group:
+            irs = [ir for ir, _ in group]
+            ir = _combine_irs(irs, sum(len(ir) for ir in irs))
+            stages.append(_FIRStream(ir, sum(latency for _, latency in group), block_frames))
+        group.clear()
 
-    # Применяем эффекты последовательно
     for effect in effects_list:
-        audio = effect(audio)
+        if callable(effect):
+            return None
+        name, params = effect
+        builder = IMPULSE_RESPONSES.get(name)
+        response = builder(frame_rate, **params) if builder else None
+        if response is not None and len(response[0]) <= max_fir:
+            if sum(len(ir) for ir, _ in group) + len(response[0]) > max_fir:
+                flush()
+            group.append(response)
+            continue
+        factory = STREAM_PROCESSORS.get(name)
+        if factory is None:
+            return None
+        flush()
+        stages.append(factory(frame_rate, block_frames, **params))
+    flush()
+    return stages
+
 
+def process_stream(reader, output_filepath, stages, output_format="mp3",
+                   progress=None, cancel_event=None, intermediate_filepath=None):
+    """
+    Потоковая обработка: блоки из reader (AudioStreamReader) проходят шаги
+    compile_stream и сразу кодируются в output_filepath. В памяти одновременно
+    находятся только текущий блок и состояние шагов, поэтому пиковая память не
+    зависит от длины файла. Задержка линейно-фазовых шагов компенсируется:
+    первые latency отсчётов выхода отбрасываются, а в конце подаются нули,
+    так что длина выхода равна длине входа. В отличие от обработки в памяти,
+    хвосты шагов не обрезаются между шагами, поэтому последние latency отсчётов
+    могут немного отличаться.
+    """
+    B = reader.block_frames
+    channels = reader.channels
+    latency = sum(stage.latency for stage in stages)
     try:
-        audio.export(output_filepath, format="mp3")
+        writers = [AudioStreamWriter(output_filepath, reader.frame_rate, channels, output_format)]
+        if intermediate_filepath:
+            writers.append(AudioStreamWriter(intermediate_filepath, reader.frame_rate, channels, "npy"))
     except Exception as e:
         print("Ошибка экспорта аудио:", e)
         return None
+    print("[DEBUG] Потоковая обработка:", " -> ".join(type(stage).__name__ for stage in stages) or "без эффектов")
+
+    def blocks():
+        for block in reader:
+            yield block, len(block)
+        # «Прогон» задержки: нули выталкивают хвост линейно-фазовых фильтров
+        for _ in range(-(-latency // B)):
+            yield np.zeros((B, channels), dtype=np.float32), 0
+
+    consumed = 0  # Прочитано отсчётов входа
+    skip = latency
+    try:
+        for block, real in blocks():
+            _check_cancelled(cancel_event)
+            consumed += real
+            if len(block) < B:
+                # Секционированная свёртка требует полных блоков
+                padded = np.zeros((B, channels), dtype=np.float32)
+                padded[:len(block)] = block
+                block = padded
+            for stage in stages:
+                block = stage.process_block(block)
+
+            out = block[skip:]
+            skip = max(skip - len(block), 0)
+            out = out[:max(consumed - writers[0].frames, 0)]
+            if len(out):
+                for writer in writers:
+                    writer.write(out)
+            if reader.frames:
+                _report(progress, min(consumed / reader.frames, 1.0))
+        for writer in writers:
+            writer.close()
+    except ProcessingCancelled:
+        for writer in writers:
+            writer.abort()
+        raise
+    except Exception as e:
+        for writer in writers:
+            writer.abort()
+        print("Ошибка потоковой обработки:", e)
+        return None
 
+    _report(progress, 1.0)
     print(f"[DEBUG] Аудио сохранено по пути: {output_filepath}")
     return output_filepath
+
+
+# ------------------------------
+# Пакетная обработка в пуле процессов
+# ------------------------------
+_ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def render_file(input_filepath, output_filepath, effects_list, output_format="mp3", output_rate=None,
+                streaming=False):
+    """
+    Рабочая функция для пула процессов: то же, что process_audio, но ошибки
+    не подавляются, а пробрасываются вызывающему (через Future), чтобы можно
+    было сообщить о каждом неудачном файле. Не использует bpy.
+
+    streaming=True — потоковый режим, как в process_audio: цепочки, которые
+    нельзя обработать блоками, обрабатываются целиком в памяти.
+    """
+    if streaming:
+        reader = AudioStreamReader(input_filepath)
+        try:
+            stages = compile_stream(effects_list, reader.frame_rate) if output_rate in (None, reader.frame_rate) else None
+            if stages is not None:
+                if process_stream(reader, output_filepath, stages, output_format) is None:
+                    raise RuntimeError(f"Ошибка потоковой обработки: {input_filepath}")
+                return output_filepath
+        finally:
+            reader.close()
+    buffer = AudioBuffer(*decode_audio(input_filepath))
+    buffer.process(effects_list).resample(output_rate).save(output_filepath, format=output_format)
+    return output_filepath
+
+
+def worker_pool(max_workers=None, module_name="dsp"):
+    """
+    Создаёт ProcessPoolExecutor для DSP-задач и возвращает (executor, module).
+
+    Дочерние процессы запускаются методом spawn и не могут импортировать пакет
+    аддона: его __init__ требует bpy. Поэтому каталог аддона добавляется в конец
+    sys.path (дочерние процессы его наследуют), а задачи нужно отправлять через
+    возвращаемый module — модуль аддона module_name (по умолчанию этот файл),
+    импортированный как верхнеуровневый. Такой модуль не должен импортировать bpy.
+    """
+    if _ADDON_DIR not in sys.path:
+        sys.path.append(_ADDON_DIR)
+    module = importlib.import_module(module_name)
+    if os.path.dirname(os.path.abspath(module.__file__)) != _ADDON_DIR:
+        raise ImportError(f"Модуль '{module_name}' перекрыт другим пакетом: {module.__file__}")
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=context)
+    return executor, module
@@ -1,4 +1,5 @@
 import bpy
+from . import spatial
 from . import utils
 
 
@@ -47,41 +48,82 @@ def sound_playback(scene):
         return
 
     current_frame = scene.frame_current
+    index = spatial.get_emitter_index(scene)
 
-    for obj in scene.objects:
-        if not obj.sound_synth_attached_sounds:
-            continue
-
-        entry = obj.sound_synth_attached_sounds[0]
+    # Дорожки добавляются только источникам, у которых на этом кадре запуск
+    added = False
+    for record in index.triggers.get(current_frame, ()):
+        obj, entry, sound = record.obj, record.entry, record.sound
         added_frames = utils.frames_to_list(entry.added_frames)
-        sound = bpy.data.sounds.get(entry.sound_name)
-        if not sound:
-            continue
-
-        # Расчёт громкости на основе расстояния
-        distance = (obj.location - cam.location).length
-        volume = max(0.1, 1 - distance / scene.sound_synth_attenuation_factor)
 
         # Основной интервал
         if current_frame == entry.frame_start and current_frame not in added_frames:
             add_sound_to_timeline(scene, obj, entry, sound, entry.frame_start, entry.frame_end)
+            added = True
             added_frames.append(current_frame)
             entry.added_frames = utils.list_to_frames(added_frames)
 
         # Повторы
-        repeat_list = utils.parse_repeat_frames(entry.repeat_frames)
-        if current_frame in repeat_list and current_frame not in added_frames:
+        if current_frame in record.repeat_frames and current_frame not in added_frames:
             duration = entry.frame_end - entry.frame_start
             add_sound_to_timeline(scene, obj, entry, sound, current_frame, current_frame + duration)
+            added = True
             added_frames.append(current_frame)
             entry.added_frames = utils.list_to_frames(added_frames)
 
-        # Обновить громкость всех дорожек этого звука
-        for seq in scene.sequence_editor.sequences_all:
-            if seq.sound == sound:
-                seq.volume = volume
-    # Принудительное обновление аудио
-    bpy.ops.sequencer.refresh_all()
+    # Громкость и панорама всех дорожек (кроме запечённых в ключи) — одним пакетным расчётом;
+    # аудио обновляется, только если что-то записано, и не чаще раза в REFRESH_DELAY
+    if spatial.update_emitter_strips(scene, index) or added:
+        request_sequencer_refresh(scene)
+
+
+REFRESH_DELAY = 0.1  # Интервал объединения обновлений аудио при перемотке, с
+
+_REFRESH_SCENES = set()  # Имена сцен, ожидающих обновления аудио
+
+
+def request_sequencer_refresh(scene):
+    """
+    Откладывает bpy.ops.sequencer.refresh_all() для scene на REFRESH_DELAY:
+    запросы, пришедшие за это время (быстрая перемотка), выполняются одним обновлением.
+    """
+    _REFRESH_SCENES.add(scene.name)
+    if not bpy.app.timers.is_registered(_refresh_sequencer):
+        bpy.app.timers.register(_refresh_sequencer, first_interval=REFRESH_DELAY)
+
+
+def _sequencer_override(scene):
+    """
+    Контекст для bpy.ops.sequencer.* из таймера, где нет окна и области:
+    окно со сценой scene (или первое) и, если открыт, редактор секвенсора в нём.
+    """
+    windows = list(bpy.context.window_manager.windows)
+    windows.sort(key=lambda window: window.scene != scene)
+    for window in windows:
+        for area in window.screen.areas:
+            if area.type == 'SEQUENCE_EDITOR':
+                return dict(window=window, area=area, scene=scene)
+    return dict(window=windows[0], scene=scene) if windows else None
+
+
+def _refresh_sequencer():
+    names = list(_REFRESH_SCENES)
+    _REFRESH_SCENES.clear()
+    for name in names:
+        scene = bpy.data.scenes.get(name)
+        if scene is None:
+            continue
+        override = _sequencer_override(scene)
+        if override is not None:
+            try:
+                with bpy.context.temp_override(**override):
+                    bpy.ops.sequencer.refresh_all()
+                continue
+            except RuntimeError as e:
+                print(f"[DEBUG] refresh_all недоступен ({e}), сцена '{name}' помечена для обновления")
+        # Без окна (фоновый режим) или при отказе оператора аудио пересобирает depsgraph
+        scene.update_tag()
+    return None
 
 # def update_sound_volume(scene, obj, sound, volume):
 #     """Обновляет громкость всех дорожек звука в VSE."""
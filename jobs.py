@@ -0,0 +1,164 @@
+import itertools
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import bpy
+
+from . import dsp
+
+JOB_QUEUE = None  # Глобальная очередь фоновых задач, инициализируется в init_queue()
+
+POLL_INTERVAL = 0.2  # Период опроса задач таймером, с
+
+
+class DSPJob:
+    """
+    Фоновая DSP-задача.
+
+    Функция задачи выполняется в рабочем потоке и получает именованные аргументы
+    progress (вызов progress(0..1)) и cancel_event (threading.Event). Обработчик
+    on_done(job) вызывается таймером в основном потоке Blender, поэтому только в
+    нём можно обращаться к bpy.data.
+    """
+
+    def __init__(self, job_id, label, func, args, on_done):
+        self.id = job_id
+        self.label = label
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+        self.status = 'QUEUED'  # QUEUED, RUNNING, DONE, FAILED, CANCELLED
+        self.progress = 0.0
+        self.result = None
+        self.error = ""
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.handled = False
+
+    @property
+    def finished(self):
+        return self.status in {'DONE', 'FAILED', 'CANCELLED'}
+
+    def set_progress(self, value):
+        self.progress = min(max(float(value), 0.0), 1.0)
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self.status = 'CANCELLED'
+            return
+        self.status = 'RUNNING'
+        try:
+            self.result = self.func(*self.args, progress=self.set_progress, cancel_event=self.cancel_event)
+            self.progress = 1.0
+            self.status = 'DONE'
+        except dsp.ProcessingCancelled:
+            self.status = 'CANCELLED'
+        except Exception as e:
+            traceback.print_exc()
+            self.error = str(e)
+            self.status = 'FAILED'
+
+
+class JobQueue:
+    """Очередь фоновых задач: рабочие потоки + опрос через bpy.app.timers."""
+
+    def __init__(self, max_workers):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sound_synth_dsp")
+        self.jobs = []
+        self._ids = itertools.count(1)
+        # bpy.app.timers находит таймер по самому объекту функции, а self.poll
+        # при каждом обращении создаёт новый связанный метод — храним один
+        self._poll = self.poll
+        print(f"[DEBUG] Очередь DSP-задач: {max_workers} поток(а)")
+
+    def submit(self, label, func, *args, on_done=None):
+        """Ставит задачу в очередь и запускает таймер опроса."""
+        job = DSPJob(next(self._ids), label, func, args, on_done)
+        job.future = self.executor.submit(job.run)
+        self.jobs.append(job)
+        if not bpy.app.timers.is_registered(self._poll):
+            bpy.app.timers.register(self._poll, first_interval=POLL_INTERVAL)
+        return job
+
+    def get(self, job_id):
+        return next((job for job in self.jobs if job.id == job_id), None)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job and not job.finished:
+            job.cancel_event.set()
+            if job.future.cancel():
+                job.status = 'CANCELLED'
+        return job
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if not (job.finished and job.handled)]
+
+    @property
+    def active(self):
+        return [job for job in self.jobs if not job.finished]
+
+    def poll(self):
+        """Таймер основного потока: завершает задачи и перерисовывает панели."""
+        for job in self.jobs:
+            if job.finished and not job.handled:
+                job.handled = True
+                if job.status == 'DONE' and job.on_done:
+                    try:
+                        job.on_done(job)
+                    except Exception as e:
+                        job.status = 'FAILED'
+                        job.error = str(e)
+                        print(f"[Sound Synth] Ошибка завершения задачи '{job.label}': {e}")
+                elif job.status == 'FAILED':
+                    print(f"[Sound Synth] ❌ Задача '{job.label}' завершилась с ошибкой: {job.error}")
+
+        _redraw_sound_synth_panels()
+        if self.active or any(not job.handled for job in self.jobs):
+            return POLL_INTERVAL
+        return None
+
+    def shutdown(self, wait=False):
+        """
+        Отменяет активные задачи и снимает таймер опроса. При wait=True ждёт,
+        пока рабочие потоки завершатся (задачи проверяют cancel_event).
+        """
+        for job in self.active:
+            job.cancel_event.set()
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+        # Задачи, снятые из очереди исполнителя, не запускались и сами статус не сменят
+        for job in self.jobs:
+            if job.future is not None and job.future.cancelled():
+                job.status = 'CANCELLED'
+        if bpy.app.timers.is_registered(self._poll):
+            bpy.app.timers.unregister(self._poll)
+
+
+def _redraw_sound_synth_panels():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+
+def init_queue(max_workers=None):
+    global JOB_QUEUE
+    if JOB_QUEUE is not None:
+        JOB_QUEUE.shutdown()
+    JOB_QUEUE = JobQueue(max_workers or max(1, min(4, (os.cpu_count() or 2) // 2)))
+    return JOB_QUEUE
+
+
+def get_queue():
+    """Возвращает очередь, создавая её с настройками по умолчанию при первом обращении."""
+    return JOB_QUEUE or init_queue()
+
+
+def close_queue(wait=False):
+    """Останавливает очередь (при отключении аддона — с wait=True, см. JobQueue.shutdown)."""
+    global JOB_QUEUE
+    if JOB_QUEUE is not None:
+        JOB_QUEUE.shutdown(wait=wait)
+        JOB_QUEUE = None
@@ -0,0 +1,158 @@
+"""
+Офлайн-сведение звуков сцены в один стерео-файл без секвенсора (VSE).
+
+Сцена описывается заранее (spatial.describe_emitters): для каждого источника
+известны файл звука, кадры запуска и покадровые громкость, панорама и
+доплеровская скорость воспроизведения. Дальше работа идёт без bpy и без
+обработчиков кадра: каждый источник декодируется один раз, запуски
+укладываются срезами (при движении — через dsp.time_warp), огибающие
+громкости и панорамы применяются сразу ко всем сэмплам. Источники рендерятся в отдельных
+процессах (dsp.worker_pool), дорожки складываются в фиксированном порядке —
+результат детерминирован и не зависит от числа процессов.
+"""
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import as_completed
+
+import numpy as np
+
+try:
+    from . import dsp
+except ImportError:  # Дочерний процесс пула: модуль импортирован как верхнеуровневый (см. dsp.worker_pool)
+    import dsp
+
+MIX_LAYOUT = "stereo"
+ENVELOPE_BLOCK = 1 << 18  # Сэмплов на блок огибающей: ограничивает временные буферы float64
+
+_PROGRESS_STEMS = 0.8
+
+
+def pan_gains(pan):
+    """
+    Усиления левого и правого каналов для панорамы [-1, 1] по закону
+    постоянной мощности; в центре оба канала остаются без изменений.
+    """
+    theta = (np.clip(pan, -1.0, 1.0) + 1.0) * (np.pi / 4)
+    return np.sqrt(2.0) * np.cos(theta), np.sqrt(2.0) * np.sin(theta)
+
+
+def mix_length(frame_rate, fps, frame_start, frame_end):
+    """Длина сведения в сэмплах для кадров frame_start..frame_end включительно."""
+    return int(round((frame_end - frame_start + 1) / fps * frame_rate))
+
+
+def _frame_to_sample(frame, frame_rate, fps):
+    return int(round(frame / fps * frame_rate))
+
+
+def _doppler_voice(source, rates, frame_offset, window, fps):
+    """
+    Один запуск звука с эффектом Доплера: источник читается со скоростью
+    rates (покадровой, см. spatial.doppler_rate), начиная с кадра запуска
+    frame_offset относительно начала сведения. Длина — window сэмплов.
+    """
+    frames = frame_offset + np.arange(int(np.ceil(window * fps / source.frame_rate)) + 2)
+    trigger_rates = np.interp(frames, np.arange(len(rates)), rates)
+    return dsp.time_warp(source.samples, trigger_rates, source.frame_rate / fps, length=window)
+
+
+def render_stem(spec, frame_rate, fps, frame_start, length, output_filepath):
+    """
+    Рендерит дорожку одного источника (см. spatial.describe_emitters):
+    стерео float32 длиной length сэмплов, начало — кадр frame_start.
+    Каждый запуск звука читается с доплеровской скоростью spec["rate"].
+    Результат сохраняется в .npy (dsp.save_npy), возвращается путь к нему.
+    """
+    # Через кэш PCM: файлы, прогретые заранее (dsp.DecodedAudioCache.persist), не декодируются
+    source = dsp.AudioBuffer(*dsp.load_audio(spec["source"])).resample(frame_rate).remix(MIX_LAYOUT)
+    # Звук обрезается по длине интервала записи, как дорожка VSE
+    window = _frame_to_sample(spec["duration"], frame_rate, fps)
+    doppler = bool(np.any(spec["rate"] != 1.0))
+    stem = np.zeros((length, 2), dtype=np.float32)
+    for start in spec["starts"]:
+        offset = _frame_to_sample(start - frame_start, frame_rate, fps)
+        voice = _doppler_voice(source, spec["rate"], start - frame_start, window, fps) if doppler \
+            else source.samples[:window]
+        first, last = max(0, -offset), min(len(voice), length - offset)
+        if last > first:
+            stem[offset + first:offset + last] += voice[first:last]
+
+    # Покадровые значения интерполируются до сэмплов блоками
+    frame_times = np.arange(len(spec["gain"])) / fps
+    for block in range(0, length, ENVELOPE_BLOCK):
+        end = min(block + ENVELOPE_BLOCK, length)
+        times = np.arange(block, end) / frame_rate
+        gain = np.interp(times, frame_times, spec["gain"])
+        left, right = pan_gains(np.interp(times, frame_times, spec["pan"]))
+        stem[block:end, 0] *= gain * left
+        stem[block:end, 1] *= gain * right
+    return dsp.save_npy(stem, frame_rate, output_filepath)
+
+
+def stem_filename(name, output_format):
+    """Имя файла дорожки объекта: недопустимые в путях символы заменяются."""
+    safe_name = re.sub(r"[^\w\-. ]", "_", name)
+    return f"{safe_name}.{dsp.output_extension(output_format)}"
+
+
+def _render_stems(specs, workdir, frame_rate, fps, frame_start, length, max_workers, progress, cancel_event):
+    """Дорожки всех источников в .npy (в порядке specs); в пуле процессов, если источников больше одного."""
+    paths = [os.path.join(workdir, f"stem_{i:05d}.npy") for i in range(len(specs))]
+    args = [(spec, frame_rate, fps, frame_start, length, path) for spec, path in zip(specs, paths)]
+
+    if max_workers == 1 or len(specs) == 1:
+        for done, stem_args in enumerate(args, 1):
+            dsp._check_cancelled(cancel_event)
+            render_stem(*stem_args)
+            dsp._report(progress, _PROGRESS_STEMS * done / len(specs))
+        return paths
+
+    executor, worker = dsp.worker_pool(min(max_workers or os.cpu_count(), len(specs)), "mixdown")
+    try:
+        futures = [executor.submit(worker.render_stem, *stem_args) for stem_args in args]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            dsp._check_cancelled(cancel_event)
+            dsp._report(progress, _PROGRESS_STEMS * done / len(specs))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return paths
+
+
+def render_mixdown(specs, output_filepath, frame_rate, fps, frame_start, frame_end, output_format="wav16",
+                   stems_directory=None, max_workers=None, progress=None, cancel_event=None):
+    """
+    Сводит источники specs (см. spatial.describe_emitters) в стерео-файл
+    output_filepath на кадрах frame_start..frame_end. Если задан
+    stems_directory, туда же пишутся дорожки отдельных объектов.
+    Совместима с очередью jobs: принимает progress и cancel_event.
+    Возвращает путь к результату.
+    """
+    if not specs:
+        raise ValueError("Нет источников звука для сведения")
+    length = mix_length(frame_rate, fps, frame_start, frame_end)
+    workdir = tempfile.mkdtemp(prefix="sound_synth_mixdown_")
+    try:
+        paths = _render_stems(specs, workdir, frame_rate, fps, frame_start, length,
+                              max_workers, progress, cancel_event)
+        if stems_directory:
+            os.makedirs(stems_directory, exist_ok=True)
+
+        mix = np.zeros((length, 2), dtype=np.float32)
+        for done, (spec, path) in enumerate(zip(specs, paths), 1):
+            dsp._check_cancelled(cancel_event)
+            stem, _ = dsp.load_npy(path, mmap_mode="r")
+            mix += stem
+            if stems_directory:
+                dsp.encode_audio(stem, frame_rate, os.path.join(stems_directory, stem_filename(spec["name"], output_format)),
+                                 output_format)
+            del stem  # memmap держит файл открытым (Windows не даст удалить каталог)
+            dsp._report(progress, _PROGRESS_STEMS + (1 - _PROGRESS_STEMS) * done / len(specs))
+
+        dsp.encode_audio(mix, frame_rate, output_filepath, output_format)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(f"[Sound Synth] Сведение сохранено: {output_filepath} (источников: {len(specs)})")
+    return output_filepath
@@ -3,9 +3,16 @@ import os
 import tempfile
 import webbrowser
 import requests
+from functools import partial
+from concurrent.futures import as_completed
+from . import cache
 from . import database
 from . import dsp
-from .utils import add_sound_to_timeline, get_available_channel, should_trigger_sound, frames_to_list, list_to_frames
+from . import jobs
+from . import mixdown
+from . import spatial
+from .utils import add_sound_to_timeline, get_available_channel, should_trigger_sound, frames_to_list, list_to_frames, \
+    parse_repeat_frames
 
 
 
@@ -297,19 +304,88 @@ class SOUND_SYNTH_OT_FAdd(bpy.types.Operator):
             return {'CANCELLED'}
 
 
-class SOUND_SYNTH_OT_ApplyDSPChain(bpy.types.Operator):
-    bl_idname = "sound_synth.apply_dsp_chain"
-    bl_label = "Применить DSP эффекты"
-    bl_options = {'REGISTER', 'UNDO'}
+# Минимальное затухание задержки с обратной связью: при 0 dB гребёнка неустойчива
+FEEDBACK_MIN_DECAY_DB = 1
+
+
+def _update_delay_feedback(self, context):
+    if self.delay_feedback and self.delay_decay < FEEDBACK_MIN_DECAY_DB:
+        self.delay_decay = FEEDBACK_MIN_DECAY_DB
+
+
+class DSPChainSettings:
+    """Общие настройки цепочки DSP для операторов одиночной и пакетной обработки."""
 
     reverb_delay: bpy.props.IntProperty(name="Reverb задержка (мс)", default=300, min=10, max=1000)  # Было 100
     reverb_decay: bpy.props.IntProperty(name="Reverb затухание (dB)", default=12, min=0, max=20)  # Было 6
+    reverb_ir: bpy.props.StringProperty(name="Reverb IR файл", subtype='FILE_PATH', default="",
+                                        description="Импульсная характеристика для свёрточной реверберации")
+    reverb_wet: bpy.props.FloatProperty(name="Reverb уровень IR", default=0.35, min=0.0, max=1.0)
     delay_delay: bpy.props.IntProperty(name="Delay задержка (мс)", default=500, min=10, max=2000)  # Было 300
-    delay_decay: bpy.props.IntProperty(name="Delay затухание (dB)", default=6, min=0, max=20)  # Было 3
+    delay_decay: bpy.props.IntProperty(name="Delay затухание (dB)", default=6, min=0, max=20,  # Было 3
+                                       update=_update_delay_feedback)
     delay_reps: bpy.props.IntProperty(name="Повторы", default=2, min=0, max=10)
+    delay_feedback: bpy.props.BoolProperty(name="Delay с обратной связью", default=False,
+                                           description="IIR-гребенчатый фильтр вместо фиксированного числа повторов; "
+                                                       f"затухание не меньше {FEEDBACK_MIN_DECAY_DB} dB",
+                                           update=_update_delay_feedback)
     low_gain: bpy.props.FloatProperty(name="Low Gain (dB)", default=0.0, min=-10.0, max=10.0)
     high_gain: bpy.props.FloatProperty(name="High Gain (dB)", default=0.0, min=-10.0, max=10.0)
+    mid_gain: bpy.props.FloatProperty(name="Mid Gain (dB)", default=0.0, min=-10.0, max=10.0)
+    mid_freq: bpy.props.FloatProperty(name="Mid частота (Hz)", default=1000.0, min=100.0, max=10000.0)
+    mid_q: bpy.props.FloatProperty(name="Mid добротность", default=1.0, min=0.1, max=10.0)
+    low_cut: bpy.props.FloatProperty(name="Срез НЧ (Hz, 0 = выкл.)", default=0.0, min=0.0, max=1000.0)
+    high_cut: bpy.props.FloatProperty(name="Срез ВЧ (Hz, 0 = выкл.)", default=0.0, min=0.0, max=20000.0)
     pitch_shift: bpy.props.IntProperty(name="Pitch Shift (полутона)", default=0, min=-12, max=12)
+    time_stretch: bpy.props.FloatProperty(name="Растяжение времени", default=1.0, min=0.25, max=4.0)
+    denoise_db: bpy.props.FloatProperty(name="Шумоподавление (dB, 0 = выкл.)", default=0.0, min=0.0, max=40.0)
+    spectral_tilt: bpy.props.FloatProperty(name="Наклон спектра (dB/окт.)", default=0.0, min=-6.0, max=6.0)
+    spectral_mod: bpy.props.FloatProperty(name="Spectral Mod", default=1.0, min=0.0, max=2.0,
+                                          description="Тембр: меньше 1 — глуше, больше 1 — ярче; громкость сохраняется")
+    output_format: bpy.props.EnumProperty(
+        name="Формат",
+        items=[(name, label, "") for name, (_, label) in dsp.OUTPUT_FORMATS.items() if name != "npy"],
+        default="wav16",
+        description="MP3/OGG — только для финальной выдачи: каждое перекодирование теряет качество",
+    )
+    match_scene_rate: bpy.props.BoolProperty(name="Частота проекта", default=False,
+                                             description="Привести результат к частоте дискретизации сцены")
+    streaming: bpy.props.BoolProperty(name="Потоковая обработка", default=False,
+                                      description="Обрабатывать файл блоками: память не зависит от длины (для длинных записей)")
+
+    def effect_chain(self):
+        """Цепочка эффектов в виде описаний (name, params) для dsp.compile_chain."""
+        return [
+            self._reverb_spec(),
+            ("delay", dict(delay_ms=self.delay_delay, decay_dB=self.delay_decay, repetitions=self.delay_reps,
+                           feedback=self.delay_feedback)),
+            ("eq", dict(low_gain=self.low_gain, high_gain=self.high_gain, bands=self._eq_bands())),
+            ("pitch_shift", dict(semitones=self.pitch_shift, time_stretch=self.time_stretch)),
+            ("spectral_gate", dict(reduction_db=self.denoise_db)),
+            ("spectral_tilt", dict(tilt_db_per_octave=self.spectral_tilt)),
+            ("spectral_mod", dict(amount=self.spectral_mod)),
+        ]
+
+    def _reverb_spec(self):
+        """Свёрточная реверберация, если выбран IR-файл, иначе простое эхо."""
+        if self.reverb_ir:
+            return ("convolution_reverb", dict(ir_filepath=bpy.path.abspath(self.reverb_ir), wet=self.reverb_wet))
+        return ("reverb", dict(delay_ms=self.reverb_delay, decay_dB=self.reverb_decay))
+
+    def _eq_bands(self):
+        """Дополнительные полосы параметрического эквалайзера: (kind, frequency, gain_db, q)."""
+        bands = [("peak", self.mid_freq, self.mid_gain, self.mid_q)]
+        if self.low_cut > 0:
+            bands.append(("highpass", self.low_cut, 0.0, 0.7071))
+        if self.high_cut > 0:
+            bands.append(("lowpass", self.high_cut, 0.0, 0.7071))
+        return bands
+
+
+class SOUND_SYNTH_OT_ApplyDSPChain(DSPChainSettings, bpy.types.Operator):
+    bl_idname = "sound_synth.apply_dsp_chain"
+    bl_label = "Применить DSP эффекты"
+    bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
         scene = context.scene
@@ -328,43 +404,185 @@ class SOUND_SYNTH_OT_ApplyDSPChain(bpy.types.Operator):
             self.report({'ERROR'}, f"Файл звука '{input_filepath}' не найден!")
             return {'CANCELLED'}
 
-        tmp_dir = tempfile.gettempdir()
-        output_filepath = os.path.join(tmp_dir, f"dsp_processed_{os.path.basename(input_filepath)}")
-        self.report({'INFO'}, f"Обработка звука начинается. Исходник: {input_filepath}")
+        effects = self.effect_chain()
+        scene_name = scene.name
+
+        # Оператор завершится сразу; загрузка результата выполняется таймером очереди
+        # в основном потоке, поэтому ссылаться на self/context в ней нельзя
+        def on_done(job):
+            processed_path = job.result
+            if not processed_path:
+                print(f"[Sound Synth] ❌ Ошибка обработки аудио: {input_filepath}")
+                return
+
+            try:
+                processed_sound = bpy.data.sounds.load(processed_path, check_existing=True)
+            except Exception as e:
+                print(f"[Sound Synth] ❌ Ошибка загрузки обработанного звука: {e}")
+                return
+
+            target_scene = bpy.data.scenes.get(scene_name)
+            if target_scene:
+                target_scene.sound_synth_selected = processed_sound.name
+            print(f"[Sound Synth] Обработка завершена. Новый звук: {processed_sound.name}")
+
+        # Результат берётся из кэша, если этот файл уже обрабатывался с теми же параметрами
+        output_rate = scene.render.ffmpeg.audio_mixrate if self.match_scene_rate else None
+        render = partial(cache.get_cache().render, streaming=self.streaming, output_rate=output_rate)
+        jobs.get_queue().submit(f"DSP: {sound.name}", render,
+                                input_filepath, effects, self.output_format, on_done=on_done)
+        self.report({'INFO'}, f"Обработка звука поставлена в очередь. Исходник: {input_filepath}")
+        return {'FINISHED'}
 
-        effects = [
-            lambda audio: dsp.apply_reverb(audio, delay_ms=self.reverb_delay, decay_dB=self.reverb_decay),
-            lambda audio: dsp.apply_delay(audio, delay_ms=self.delay_delay, decay_dB=self.delay_decay,
-                                          repetitions=self.delay_reps),
-            lambda audio: dsp.apply_eq(audio, low_gain=self.low_gain, high_gain=self.high_gain),
-            lambda audio: dsp.apply_pitch_shift(audio, semitones=self.pitch_shift)
-        ]
+    def invoke(self, context, event):
+        wm = context.window_manager
+        return wm.invoke_props_dialog(self)
 
-        processed_path = dsp.process_audio(input_filepath, output_filepath, effects)
-        if not processed_path:
-            self.report({'ERROR'}, "Ошибка обработки аудио!")
-            return {'CANCELLED'}
 
-        try:
-            processed_sound = bpy.data.sounds.load(processed_path, check_existing=True)
-        except Exception as e:
-            self.report({'ERROR'}, f"Ошибка загрузки обработанного звука: {e}")
-            return {'CANCELLED'}
+class SOUND_SYNTH_OT_BatchApplyDSPChain(DSPChainSettings, bpy.types.Operator):
+    """Применяет одну цепочку DSP ко всем звукам библиотеки в пуле процессов"""
+    bl_idname = "sound_synth.batch_apply_dsp_chain"
+    bl_label = "Пакетно применить DSP эффекты"
+    bl_options = {'REGISTER', 'UNDO'}
 
-            # Обновляем привязанный звук у объекта
-            obj = context.object
-            if obj and obj.sound_synth_attached_sounds:
-                entry = obj.sound_synth_attached_sounds[0]
-                entry.sound_name = processed_sound.name  # <-- Ключевое изменение
-                scene.sequence_editor.sequences_all.update()
+    max_workers: bpy.props.IntProperty(name="Процессов (0 = все ядра)", default=0, min=0, max=64)
 
-        scene.sound_synth_selected = processed_sound.name
-        self.report({'INFO'}, f"Обработка завершена. Новый звук: {processed_sound.name}")
+    def execute(self, context):
+        scene = context.scene
+        effects = self.effect_chain()
+        scene_name = scene.name
+
+        sources = {}   # имя звука -> путь к исходному файлу
+        failures = {}  # имя звука -> текст ошибки
+        for item in scene.sound_synth_sounds:
+            sound = bpy.data.sounds.get(item.name)
+            if not sound:
+                failures[item.name] = "звук не найден в bpy.data.sounds"
+                continue
+            input_filepath = bpy.path.abspath(sound.filepath)
+            if not os.path.exists(input_filepath):
+                failures[item.name] = f"файл '{input_filepath}' не найден"
+                continue
+            sources[item.name] = input_filepath
+
+        # Загрузка результатов в Blender выполняется только в основном потоке
+        def on_done(job):
+            results, render_failures = job.result
+            failures.update(render_failures)
+            target_scene = bpy.data.scenes.get(scene_name)
+            loaded = 0
+            for name, path in results.items():
+                try:
+                    processed_sound = bpy.data.sounds.load(path, check_existing=True)
+                except Exception as e:
+                    failures[name] = f"ошибка загрузки: {e}"
+                    continue
+                if target_scene and not any(s.name == processed_sound.name for s in target_scene.sound_synth_sounds):
+                    target_scene.sound_synth_sounds.add().name = processed_sound.name
+                loaded += 1
+
+            for name, error in failures.items():
+                print(f"[Sound Synth] ❌ Пакетная обработка '{name}': {error}")
+            print(f"[Sound Synth] Обработано звуков: {loaded}, ошибок: {len(failures)}")
+
+        output_rate = scene.render.ffmpeg.audio_mixrate if self.match_scene_rate else None
+        render = partial(_render_batch, streaming=self.streaming)
+        jobs.get_queue().submit(f"Пакет DSP: {len(sources)} звук(ов)", render,
+                                sources, effects, self.output_format, output_rate, self.max_workers or None,
+                                on_done=on_done)
+        self.report({'INFO'}, f"Пакетная обработка поставлена в очередь: {len(sources)} звук(ов)")
         return {'FINISHED'}
 
     def invoke(self, context, event):
-        wm = context.window_manager
-        return wm.invoke_props_dialog(self)
+        return context.window_manager.invoke_props_dialog(self)
+
+
+def _render_batch(sources, effects, output_format, output_rate, max_workers, progress=None, cancel_event=None,
+                  streaming=False):
+    """
+    Фоновая задача пакетной обработки: рендерит sources (имя -> путь) в пуле
+    процессов, используя кэш; streaming передаётся в dsp.render_file. Возвращает (results, failures) — словари
+    имя -> путь к файлу и имя -> текст ошибки. Не обращается к bpy.data.
+    """
+    render_cache = cache.get_cache()
+    results = {}
+    failures = {}
+    pending = {}  # Future -> (имя звука, ключ кэша, временный файл)
+
+    executor, worker = dsp.worker_pool(max_workers)
+    with executor:
+        for name, input_filepath in sources.items():
+            key = render_cache.key(input_filepath, effects, output_format, output_rate)
+            cached = render_cache.lookup(key, output_format)
+            if cached:
+                results[name] = cached
+                continue
+
+            fd, tmp_path = tempfile.mkstemp(suffix=f".{dsp.output_extension(output_format)}", dir=render_cache.incoming)
+            os.close(fd)
+            future = executor.submit(worker.render_file, render_cache.intermediate_for(input_filepath), tmp_path,
+                                     effects, output_format, output_rate, streaming)
+            pending[future] = (name, key, tmp_path)
+
+        # Ошибка одного файла не прерывает пакет
+        done = len(results)
+        for future in as_completed(pending):
+            if cancel_event is not None and cancel_event.is_set():
+                executor.shutdown(wait=True, cancel_futures=True)
+                for _, _, tmp_path in pending.values():
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                raise dsp.ProcessingCancelled()
+
+            name, key, tmp_path = pending[future]
+            try:
+                results[name] = render_cache.store(key, output_format, future.result())
+            except Exception as e:
+                failures[name] = str(e)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            done += 1
+            if progress is not None:
+                progress(done / max(len(sources), 1))
+
+    return results, failures
+
+
+class SOUND_SYNTH_OT_CancelJob(bpy.types.Operator):
+    """Отменяет фоновую DSP-задачу"""
+    bl_idname = "sound_synth.cancel_job"
+    bl_label = "Отменить задачу"
+
+    job_id: bpy.props.IntProperty()
+
+    def execute(self, context):
+        job = jobs.get_queue().cancel(self.job_id)
+        if not job:
+            self.report({'WARNING'}, "Задача не найдена")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Задача '{job.label}' отменяется")
+        return {'FINISHED'}
+
+
+class SOUND_SYNTH_OT_ClearJobs(bpy.types.Operator):
+    """Убирает завершённые задачи из списка"""
+    bl_idname = "sound_synth.clear_jobs"
+    bl_label = "Очистить завершённые задачи"
+
+    def execute(self, context):
+        jobs.get_queue().clear_finished()
+        return {'FINISHED'}
+
+
+class SOUND_SYNTH_OT_ClearDecodeCache(bpy.types.Operator):
+    """Очищает кэш декодированного аудио (в памяти и на диске)"""
+    bl_idname = "sound_synth.clear_decode_cache"
+    bl_label = "Очистить кэш PCM"
+
+    def execute(self, context):
+        dsp.get_decode_cache().clear()
+        self.report({'INFO'}, "Кэш декодированного аудио очищен")
+        return {'FINISHED'}
 
 
 # Обработчик изменения кадра, который обновляет громкость звука в зависимости от расстояния
@@ -382,56 +600,9 @@ def dynamic_volume_handler(scene):
             print("[Sound Synth] Не удалось создать Sequence Editor!")
             return
 
-    # Текущий кадр анимации
-    current_frame = scene.frame_current
-    # Получаем настройки затухания из пользовательских свойств
-    auto_attenuation = scene.sound_synth_attenuation_enable
-    attenuation_factor = scene.sound_synth_attenuation_factor
-
-    for obj in scene.objects:
-        # Если у объекта нет звуков или список пуст – пропускаем его
-        if not hasattr(obj, "sound_synth_attached_sounds") or not obj.sound_synth_attached_sounds:
-            continue
-
-        entry = obj.sound_synth_attached_sounds[0]
-        sound = bpy.data.sounds.get(entry.sound_name)
-        if not sound:
-            print(f"[Sound Synth] ❌ Звук '{entry.sound_name}' не найден")
-            continue
-
-        if not os.path.exists(sound.filepath):
-            print(f"[Sound Synth] ❌ Файл звука '{sound.filepath}' не найден!")
-            continue
-
-        # Вычисляем расстояние от объекта до камеры
-        distance = (obj.location - cam.location).length
-
-        # Если включено автоматическое затухание – рассчитываем громкость по формуле
-        # volume = max(0.0, min(1.0, 1 - distance / attenuation_factor))
-        # Если функция выключена – громкость всегда равна 1.0
-        if auto_attenuation:
-            volume = max(0.0, min(1.0, 1 - distance / attenuation_factor))
-        else:
-            volume = 1.0
-            # Всегда применяем spectral_mod, даже если затухание выключено
-            volume *= entry.spectral_mod  # <-- Убрана проверка hasattr()
-
-        # Если у звука есть дополнительный модификатор, например, spectral_mod, применим его
-        if hasattr(entry, "spectral_mod"):
-            volume *= entry.spectral_mod
-
-        # Ищем звуковую дорожку, соответствующую звуку, в Sequence Editor
-        seq = None
-        for s in scene.sequence_editor.sequences_all:
-            if s.type == 'SOUND' and s.sound == sound:
-                seq = s
-                break
-
-        if seq:
-            seq.volume = volume
-            print(f"[Sound Synth] Обновлена громкость '{sound.name}': distance = {distance:.2f}, volume = {volume:.2f}")
-        else:
-            print(f"[Sound Synth] Звуковая дорожка для '{sound.name}' не найдена.")
+    # Громкость по расстоянию (если включено автоматическое затухание) с учётом spectral_mod
+    # и панорама считаются сразу для всех источников индекса (см. spatial.EmitterIndex)
+    spatial.update_emitter_strips(scene, spatial.get_emitter_index(scene))
 
 
 # Оператор для включения динамического изменения громкости (добавляет обработчик)
@@ -467,6 +638,120 @@ class SOUND_SYNTH_OT_DisableDynamicVolume(bpy.types.Operator):
         return {'FINISHED'}
 
 
+def add_emitter_strips(scene):
+    """
+    Создаёт дорожки VSE всех источников сцены: основной интервал, повторы через
+    repeat_interval и кадры repeat_frames. Дорожки повторов обычно создаёт
+    обработчик во время воспроизведения — перед запеканием они нужны заранее.
+    """
+    for obj, entry, sound in spatial.find_emitters(scene):
+        add_sound_with_repeats(scene, obj, sound, entry)
+        duration = entry.frame_end - entry.frame_start
+        for frame in parse_repeat_frames(entry.repeat_frames):
+            add_sound_to_timeline(scene, obj, entry, sound, frame, frame + duration)
+
+
+class SOUND_SYNTH_OT_BakeAttenuation(bpy.types.Operator):
+    """Запекает громкость и панораму источников звука в ключи дорожек VSE (без обработчика кадра)"""
+    bl_idname = "sound_synth.bake_attenuation"
+    bl_label = "Запечь затухание"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    bake_pan: bpy.props.BoolProperty(name="Панорама", default=True)
+    simplify: bpy.props.BoolProperty(name="Упростить кривые", default=True)
+    tolerance: bpy.props.FloatProperty(name="Допуск", default=spatial.BAKE_TOLERANCE, min=0.0, max=0.1,
+                                       precision=4, description="Допустимое отклонение при упрощении кривых")
+
+    def execute(self, context):
+        scene = context.scene
+        if not scene.camera:
+            self.report({'ERROR'}, "Нет камеры на сцене.")
+            return {'CANCELLED'}
+
+        add_emitter_strips(scene)
+        strips, keys = spatial.bake_emitters(scene, simplify=self.simplify,
+                                             tolerance=self.tolerance, bake_pan=self.bake_pan)
+        if not strips:
+            self.report({'WARNING'}, "Нет дорожек источников звука для запекания.")
+            return {'CANCELLED'}
+
+        # Громкость теперь анимирована ключами — обработчик кадра больше не нужен
+        if dynamic_volume_handler in bpy.app.handlers.frame_change_post:
+            bpy.app.handlers.frame_change_post.remove(dynamic_volume_handler)
+        self.report({'INFO'}, f"Запечено дорожек: {strips}, ключей: {keys}")
+        return {'FINISHED'}
+
+
+class SOUND_SYNTH_OT_ClearBake(bpy.types.Operator):
+    """Удаляет запечённые ключи громкости и панорамы"""
+    bl_idname = "sound_synth.clear_bake"
+    bl_label = "Удалить запечённое затухание"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        cleared = spatial.clear_bake(context.scene)
+        self.report({'INFO'}, f"Очищено дорожек: {cleared}")
+        return {'FINISHED'}
+
+
+class SOUND_SYNTH_OT_RenderMixdown(bpy.types.Operator):
+    """Сводит звуки всех источников сцены в стерео-файл без секвенсора и обработчиков кадра"""
+    bl_idname = "sound_synth.render_mixdown"
+    bl_label = "Свести звук сцены"
+
+    filepath: bpy.props.StringProperty(subtype='FILE_PATH')
+    output_format: bpy.props.EnumProperty(
+        name="Формат",
+        items=[(name, label, "") for name, (_, label) in dsp.OUTPUT_FORMATS.items() if name != "npy"],
+        default="wav16",
+    )
+    stems: bpy.props.BoolProperty(name="Дорожки объектов", default=False,
+                                  description="Дополнительно сохранить звук каждого объекта в отдельный файл")
+    doppler: bpy.props.BoolProperty(name="Эффект Доплера", default=True,
+                                    description="Менять высоту звука по радиальной скорости источника относительно камеры")
+    max_workers: bpy.props.IntProperty(name="Процессов", default=0, min=0, max=64,
+                                       description="Число процессов рендера (0 — по числу ядер)")
+
+    def execute(self, context):
+        scene = context.scene
+        if not scene.camera:
+            self.report({'ERROR'}, "Нет камеры на сцене.")
+            return {'CANCELLED'}
+
+        # Всё, что требует bpy, собирается здесь; рендер идёт в фоне без доступа к сцене
+        specs = spatial.describe_emitters(scene, doppler=self.doppler)
+        if not specs:
+            self.report({'WARNING'}, "Нет источников звука для сведения.")
+            return {'CANCELLED'}
+        missing = [spec["source"] for spec in specs if not os.path.exists(spec["source"])]
+        if missing:
+            self.report({'ERROR'}, f"Файл звука '{missing[0]}' не найден!")
+            return {'CANCELLED'}
+
+        extension = dsp.output_extension(self.output_format)
+        output_filepath = bpy.path.abspath(self.filepath) if self.filepath else \
+            os.path.join(bpy.path.abspath("//") or tempfile.gettempdir(), f"{bpy.path.clean_name(scene.name)}_mixdown")
+        output_filepath = bpy.path.ensure_ext(output_filepath, f".{extension}")
+        stems_directory = os.path.splitext(output_filepath)[0] + "_stems" if self.stems else None
+
+        def on_done(job):
+            if job.result:
+                print(f"[Sound Synth] Сведение сцены завершено: {job.result}")
+
+        render = partial(mixdown.render_mixdown, output_format=self.output_format,
+                         stems_directory=stems_directory, max_workers=self.max_workers or None)
+        fps = scene.render.fps / scene.render.fps_base
+        jobs.get_queue().submit(f"Сведение: {scene.name}", render, specs, output_filepath,
+                                scene.render.ffmpeg.audio_mixrate, fps, scene.frame_start, scene.frame_end,
+                                on_done=on_done)
+        self.report({'INFO'}, f"Сведение поставлено в очередь: {output_filepath}")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
 import numpy as np
 from pydub import AudioSegment
 import tempfile
@@ -478,6 +763,10 @@ class SOUND_SYNTH_OT_ProcessSound(bpy.types.Operator):
     bl_label = "Обработать звук с затуханием"
     bl_options = {'REGISTER', 'UNDO'}
 
+    profile_step: bpy.props.IntProperty(
+        name="Шаг выборки (кадры)", default=1, min=1, max=24,
+        description="Позиции считаются раз в N кадров, между ними — линейная интерполяция")
+
     def execute(self, context):
         obj = context.object
         scene = context.scene
@@ -491,48 +780,87 @@ class SOUND_SYNTH_OT_ProcessSound(bpy.types.Operator):
         if not sound or not os.path.exists(sound.filepath):
             self.report({'ERROR'}, "Звуковой файл не найден!")
             return {'CANCELLED'}
-
-        # Загрузка исходного аудио
-        audio = AudioSegment.from_file(sound.filepath)
+        if not scene.camera:
+            self.report({'ERROR'}, "Нет камеры на сцене!")
+            return {'CANCELLED'}
+        if entry.frame_end <= entry.frame_start:
+            self.report({'ERROR'}, "Конечный кадр должен быть больше начального!")
+            return {'CANCELLED'}
 
         # Расчёт параметров
-        fps = scene.render.fps
-        duration_frames = entry.frame_end - entry.frame_start
-        duration_seconds = duration_frames / fps
-
-        # Создаём массив громкости для каждого кадра
-        volume_profile = self._calculate_volume_profile(obj, scene, duration_frames)
-
-        # Применяем затухание
-        processed_audio = self._apply_volume(audio, volume_profile, fps)
-
-        # Сохраняем временный файл
-        tmp_dir = tempfile.gettempdir()
-        output_path = os.path.join(tmp_dir, f"processed_{os.path.basename(sound.filepath)}")
-        processed_audio.export(output_path, format="wav")
-
-        # Загружаем обработанный звук в Blender
-        processed_sound = bpy.data.sounds.load(output_path)
-        entry.sound_name = processed_sound.name
-
-        self.report({'INFO'}, "Звук обработан!")
+        fps = scene.render.fps / scene.render.fps_base
+
+        # Создаём массив громкости для каждого кадра звучания
+        frames = np.arange(entry.frame_start, entry.frame_end)
+        volume_profile = self._calculate_volume_profile(obj, entry, scene, frames)
+
+        # Тот же исходник с тем же профилем громкости уже мог быть обработан
+        render_cache = cache.get_cache()
+        chain = [("volume_profile", dict(profile=[round(float(v), 4) for v in volume_profile], fps=fps))]
+        key = render_cache.key(sound.filepath, chain, "wav")
+        source_filepath = sound.filepath
+        apply_volume = self._apply_volume
+
+        # Профиль считается в основном потоке (нужен доступ к bpy), обработка — в фоне
+        def render(progress=None, cancel_event=None):
+            output_path = render_cache.lookup(key, "wav")
+            if output_path:
+                return output_path
+            # Загрузка исходного аудио (декодированный PCM берётся из общего кэша)
+            buffer = dsp.AudioBuffer.load(source_filepath)
+            progress(0.3)
+            if cancel_event.is_set():
+                raise dsp.ProcessingCancelled()
+
+            # Применяем затухание
+            apply_volume(buffer.samples, buffer.frame_rate, volume_profile, fps)
+            progress(0.7)
+            if cancel_event.is_set():
+                raise dsp.ProcessingCancelled()
+
+            # Сохраняем временный файл и переносим его в кэш
+            fd, tmp_path = tempfile.mkstemp(suffix=".wav", dir=render_cache.incoming)
+            os.close(fd)
+            buffer.save(tmp_path, format="wav16")
+            return render_cache.store(key, "wav", tmp_path)
+
+        obj_name = obj.name
+
+        def on_done(job):
+            # Загружаем обработанный звук в Blender
+            processed_sound = bpy.data.sounds.load(job.result, check_existing=True)
+            target = bpy.data.objects.get(obj_name)
+            if target and target.sound_synth_attached_sounds:
+                target.sound_synth_attached_sounds[0].sound_name = processed_sound.name
+            print(f"[Sound Synth] Звук обработан: {processed_sound.name}")
+
+        jobs.get_queue().submit(f"Затухание: {sound.name}", render, on_done=on_done)
+        self.report({'INFO'}, "Обработка звука поставлена в очередь")
         return {'FINISHED'}
 
-    def _calculate_volume_profile(self, obj, scene, duration_frames):
-        """Возвращает массив громкости для каждого кадра [0..1]."""
-        cam = scene.camera
-        volume_profile = np.ones(duration_frames)
-
-        for frame in range(duration_frames):
-            # Рассчитываем позицию объекта на текущем кадре
-            scene.frame_set(frame + scene.frame_start)
-            distance = (obj.location - cam.location).length
-            volume = max(0.1, 1 - distance / scene.sound_synth_attenuation_factor)
-            volume_profile[frame] = volume
-
-        return volume_profile
-
-    def _apply_volume(self, audio, volume_profile, fps):
-        """Применяет плавное изменение громкости к аудио."""
-        audio = audio.set_frame_rate(int(fps * 1000))  # Для точности
-        return audio.apply_gain([v * 100 - 100 for v in volume_profile])
\ No newline at end of file
+    def _calculate_volume_profile(self, obj, entry, scene, frames):
+        """
+        Возвращает массив громкости для каждого кадра frames — по той же
+        формуле, что обработчики кадра, запекание и сведение
+        (spatial.attenuation_gain с учётом spectral_mod записи entry).
+
+        Позиции объекта и камеры берутся из их F-кривых без scene.frame_set
+        (см. spatial.sample_positions); кадры переключаются только для объектов
+        с родителями, ограничениями или драйверами — раз в profile_step кадров.
+        """
+        positions = spatial.sample_positions(scene, [obj, scene.camera], frames, self.profile_step)
+        distances = np.linalg.norm(positions[:, 0] - positions[:, 1], axis=1)
+        return spatial.attenuation_gain(distances, scene.sound_synth_attenuation_factor,
+                                        scene.sound_synth_attenuation_enable, entry.spectral_mod)
+
+    @staticmethod
+    def _apply_volume(samples, frame_rate, volume_profile, fps):
+        """
+        Применяет плавное изменение громкости к float32-буферу (frames, channels)
+        на месте: громкость кадра k относится к моменту k / fps, между кадрами
+        огибающая интерполируется линейно для каждого сэмпла.
+        """
+        frame_times = np.arange(len(volume_profile)) / fps
+        envelope = np.interp(np.arange(len(samples)) / frame_rate, frame_times, volume_profile)
+        samples *= envelope.astype(np.float32)[:, None]
+        return samples
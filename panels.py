@@ -1,5 +1,4 @@
 import bpy
-import tempfile
 
 class SOUND_SYNTH_UL_FreesoundResults(bpy.types.UIList):
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
@@ -61,13 +60,32 @@ class SOUND_SYNTH_PT_FreesoundPanel(bpy.types.Panel):
             box2.prop(scene, "sound_synth_attenuation_enable", text="Автоматическое затухание")
             if scene.sound_synth_attenuation_enable:
                 box2.prop(scene, "sound_synth_attenuation_factor", text="Чувствительность затухания")
+                row_bake = box2.row(align=True)
+                row_bake.operator("sound_synth.bake_attenuation", text="Запечь в ключи", icon='KEYINGSET')
+                row_bake.operator("sound_synth.clear_bake", text="", icon='X')
             # if scene.sound_synth_attenuation_enable:
             #     layout.operator("sound_synth.process_sound", text="Препроцессинг звука")
             row2 = box2.row(align=True)
             row2.operator("sound_synth.attach_sound", text="Привязать")
             row2.operator("sound_synth.update_sound", text="Обновить настройки")
+            box2.operator("sound_synth.render_mixdown", text="Свести звук сцены", icon='RENDER_ANIMATION')
             # row2.operator("sound_synth.remove_sound", text="Удалить", icon='TRASH')
 
+        # --- Секция 3: Фоновые DSP-задачи ---
+        queue = jobs.JOB_QUEUE
+        if queue and queue.jobs:
+            box3 = layout.box()
+            box3.label(text="Обработка", icon='SORTTIME')
+            for job in queue.jobs:
+                row3 = box3.row(align=True)
+                if job.finished:
+                    icon = {'DONE': 'CHECKMARK', 'FAILED': 'ERROR', 'CANCELLED': 'CANCEL'}[job.status]
+                    row3.label(text=job.label, icon=icon)
+                else:
+                    row3.progress(factor=job.progress, type='BAR', text=f"{job.label}: {int(job.progress * 100)}%")
+                    row3.operator("sound_synth.cancel_job", text="", icon='X').job_id = job.id
+            box3.operator("sound_synth.clear_jobs", text="Очистить завершённые")
+
 
 # class SOUND_SYNTH_PT_DynamicVolumePanel(bpy.types.Panel):
 #     bl_label = "Динамическое изменение громкости"
@@ -90,7 +108,9 @@ class SOUND_SYNTH_PT_FreesoundPanel(bpy.types.Panel):
 #         row.operator("sound_synth.enable_dynamic_volume", text="Включить динамику")
 #         row.operator("sound_synth.disable_dynamic_volume", text="Отключить динамику")
 
+from . import cache
 from . import dsp
+from . import jobs
 # Оператор для применения эффектов
 class SOUND_SYNTH_OT_ApplyEffects(bpy.types.Operator):
     bl_idname = "sound_synth.apply_effects"
@@ -101,17 +121,36 @@ class SOUND_SYNTH_OT_ApplyEffects(bpy.types.Operator):
     reverb_enable: bpy.props.BoolProperty(name="Реверберация", default=False)
     reverb_delay: bpy.props.IntProperty(name="Задержка реверба (мс)", default=100, min=10, max=1000)
     reverb_decay: bpy.props.IntProperty(name="Затухание реверба (dB)", default=6, min=0, max=20)
+    reverb_ir: bpy.props.StringProperty(name="IR файл", subtype='FILE_PATH', default="",
+                                        description="Импульсная характеристика для свёрточной реверберации")
+    reverb_wet: bpy.props.FloatProperty(name="Уровень IR", default=0.35, min=0.0, max=1.0)
 
     delay_enable: bpy.props.BoolProperty(name="Задержка", default=False)
     delay_time: bpy.props.IntProperty(name="Время задержки (мс)", default=300, min=10, max=2000)
     delay_repeats: bpy.props.IntProperty(name="Количество повторов", default=2, min=1, max=10)
+    delay_feedback: bpy.props.BoolProperty(name="Обратная связь", default=False)
 
     eq_enable: bpy.props.BoolProperty(name="Эквалайзер", default=False)
     low_gain: bpy.props.FloatProperty(name="Низкие частоты (dB)", default=0.0, min=-20.0, max=20.0)
     high_gain: bpy.props.FloatProperty(name="Высокие частоты (dB)", default=0.0, min=-20.0, max=20.0)
+    mid_gain: bpy.props.FloatProperty(name="Средние частоты (dB)", default=0.0, min=-20.0, max=20.0)
+    mid_freq: bpy.props.FloatProperty(name="Частота средних (Hz)", default=1000.0, min=100.0, max=10000.0)
+    mid_q: bpy.props.FloatProperty(name="Добротность средних", default=1.0, min=0.1, max=10.0)
 
     pitch_enable: bpy.props.BoolProperty(name="Сдвиг тона", default=False)
     pitch_shift: bpy.props.IntProperty(name="Сдвиг (полутонов)", default=0, min=-12, max=12)
+    time_stretch: bpy.props.FloatProperty(name="Растяжение времени", default=1.0, min=0.25, max=4.0)
+
+    spectral_enable: bpy.props.BoolProperty(name="Спектральная обработка", default=False)
+    denoise_db: bpy.props.FloatProperty(name="Шумоподавление (dB)", default=12.0, min=0.0, max=40.0)
+    spectral_tilt: bpy.props.FloatProperty(name="Наклон спектра (dB/окт.)", default=0.0, min=-6.0, max=6.0)
+    spectral_mod: bpy.props.FloatProperty(name="Spectral Mod", default=1.0, min=0.0, max=2.0)
+
+    output_format: bpy.props.EnumProperty(
+        name="Формат",
+        items=[(name, label, "") for name, (_, label) in dsp.OUTPUT_FORMATS.items() if name != "npy"],
+        default="wav16",
+    )
 
     def execute(self, context):
         scene = context.scene
@@ -129,56 +168,60 @@ class SOUND_SYNTH_OT_ApplyEffects(bpy.types.Operator):
         # Создаем список эффектов
         effects = []
 
-        if self.reverb_enable:
-            effects.append(
-                lambda audio: dsp.apply_reverb(
-                    audio,
-                    delay_ms=self.reverb_delay,
-                    decay_dB=self.reverb_decay
-                )
-            )
+        if self.reverb_enable and self.reverb_ir:
+            effects.append(("convolution_reverb", dict(
+                ir_filepath=bpy.path.abspath(self.reverb_ir),
+                wet=self.reverb_wet
+            )))
+        elif self.reverb_enable:
+            effects.append(("reverb", dict(
+                delay_ms=self.reverb_delay,
+                decay_dB=self.reverb_decay
+            )))
 
         if self.delay_enable:
-            effects.append(
-                lambda audio: dsp.apply_delay(
-                    audio,
-                    delay_ms=self.delay_time,
-                    repetitions=self.delay_repeats
-                )
-            )
+            effects.append(("delay", dict(
+                delay_ms=self.delay_time,
+                repetitions=self.delay_repeats,
+                feedback=self.delay_feedback
+            )))
 
         if self.eq_enable:
-            effects.append(
-                lambda audio: dsp.apply_eq(
-                    audio,
-                    low_gain=self.low_gain,
-                    high_gain=self.high_gain
-                )
-            )
+            effects.append(("eq", dict(
+                low_gain=self.low_gain,
+                high_gain=self.high_gain,
+                bands=[("peak", self.mid_freq, self.mid_gain, self.mid_q)]
+            )))
 
         if self.pitch_enable:
-            effects.append(
-                lambda audio: dsp.apply_pitch_shift(
-                    audio,
-                    semitones=self.pitch_shift
-                )
-            )
-
-        # Обработка аудио
-        output_path = dsp.process_audio(
-            input_filepath=sound.filepath,
-            output_filepath=tempfile.mktemp(suffix=".mp3"),
-            effects_list=effects
-        )
-
-        if output_path:
-            # Загружаем обработанный звук
-            new_sound = bpy.data.sounds.load(output_path)
-            scene.sound_synth_selected = new_sound.name
-            self.report({'INFO'}, "Эффекты успешно применены!")
-        else:
-            self.report({'ERROR'}, "Ошибка обработки аудио!")
-
+            effects.append(("pitch_shift", dict(
+                semitones=self.pitch_shift,
+                time_stretch=self.time_stretch
+            )))
+
+        if self.spectral_enable:
+            effects.append(("spectral_gate", dict(reduction_db=self.denoise_db)))
+            effects.append(("spectral_tilt", dict(tilt_db_per_octave=self.spectral_tilt)))
+            effects.append(("spectral_mod", dict(amount=self.spectral_mod)))
+
+        scene_name = scene.name
+
+        def on_done(job):
+            output_path = job.result
+            if output_path:
+                # Загружаем обработанный звук
+                new_sound = bpy.data.sounds.load(output_path, check_existing=True)
+                target_scene = bpy.data.scenes.get(scene_name)
+                if target_scene:
+                    target_scene.sound_synth_selected = new_sound.name
+                print("[Sound Synth] Эффекты успешно применены!")
+            else:
+                print("[Sound Synth] ❌ Ошибка обработки аудио!")
+
+        # Обработка аудио в фоне (или готовый результат из кэша)
+        jobs.get_queue().submit(f"Эффекты: {sound.name}", cache.get_cache().render,
+                                sound.filepath, effects, self.output_format, on_done=on_done)
+        self.report({'INFO'}, "Обработка поставлена в очередь")
         return {'FINISHED'}
 
     def invoke(self, context, event):
@@ -203,6 +246,8 @@ class SOUND_SYNTH_PT_EffectsPanel(bpy.types.Panel):
         if operator.reverb_enable:
             box.prop(operator, "reverb_delay")
             box.prop(operator, "reverb_decay")
+            box.prop(operator, "reverb_ir")
+            box.prop(operator, "reverb_wet")
 
         # Задержка
         box = layout.box()
@@ -210,6 +255,7 @@ class SOUND_SYNTH_PT_EffectsPanel(bpy.types.Panel):
         if operator.delay_enable:
             box.prop(operator, "delay_time")
             box.prop(operator, "delay_repeats")
+            box.prop(operator, "delay_feedback")
 
         # Эквалайзер
         box = layout.box()
@@ -217,9 +263,33 @@ class SOUND_SYNTH_PT_EffectsPanel(bpy.types.Panel):
         if operator.eq_enable:
             box.prop(operator, "low_gain")
             box.prop(operator, "high_gain")
+            box.prop(operator, "mid_gain")
+            box.prop(operator, "mid_freq")
+            box.prop(operator, "mid_q")
 
         # Сдвиг тона
         box = layout.box()
         box.prop(operator, "pitch_enable", text="Сдвиг тона")
         if operator.pitch_enable:
-            box.prop(operator, "pitch_shift")
\ No newline at end of file
+            box.prop(operator, "pitch_shift")
+            box.prop(operator, "time_stretch")
+
+        # Спектральная обработка
+        box = layout.box()
+        box.prop(operator, "spectral_enable", text="Спектральная обработка")
+        if operator.spectral_enable:
+            box.prop(operator, "denoise_db")
+            box.prop(operator, "spectral_tilt")
+            box.prop(operator, "spectral_mod")
+
+        layout.prop(operator, "output_format")
+
+        # Статистика кэша декодированного аудио
+        decode_cache = dsp.DECODE_CACHE
+        if decode_cache:
+            stats = decode_cache.stats()
+            box = layout.box()
+            box.label(text="Кэш PCM", icon='DISK_DRIVE')
+            box.label(text=f"Попадания: {stats['hits']} (с диска: {stats['disk_hits']}), промахи: {stats['misses']}")
+            box.label(text=f"В памяти: {stats['bytes_held'] / 2**20:.1f} МБ, на диске: {stats['bytes_spilled'] / 2**20:.1f} МБ")
+            box.operator("sound_synth.clear_decode_cache", icon='TRASH')
\ No newline at end of file
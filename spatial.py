@@ -0,0 +1,595 @@
+import os
+
+import bpy
+import numpy as np
+
+from . import utils
+
+# Метка дорожки VSE, громкость (и панорама) которой запечена в F-кривые:
+# обработчики кадра такие дорожки не трогают
+BAKED_KEY = "sound_synth_baked"
+
+BAKE_TOLERANCE = 0.005  # Допустимое отклонение громкости/панорамы при упрощении кривой
+FCURVE_GROUP = "Sound Synth"
+
+SPEED_OF_SOUND = 343.0  # м/с; расстояния сцены переводятся в метры через unit_settings.scale_length
+DOPPLER_MAX_VELOCITY = 0.5  # Ограничение радиальной скорости, доля скорости звука
+
+# Индексы значений enum Keyframe.interpolation для foreach_set
+_INTERPOLATION_LINEAR = 1
+
+
+# ------------------------------
+# Расчёт громкости, панорамы и эффекта Доплера
+# ------------------------------
+def attenuation_gain(distances, factor, enabled=True, spectral_mod=1.0):
+    """
+    Громкость по расстоянию до камеры: 1 - distance / factor, ограничение [0, 1].
+    Работает и со скалярами, и с массивами расстояний любой формы.
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    if not enabled:
+        return np.ones_like(distances) * spectral_mod
+    return np.clip(1.0 - distances / factor, 0.0, 1.0) * spectral_mod
+
+
+def camera_space_pan(positions, camera_matrices):
+    """
+    Панорама [-1, 1] по положению источника в системе координат камеры:
+    синус азимута в горизонтальной плоскости камеры (ось X — вправо,
+    камера смотрит вдоль -Z). positions — (..., 3), camera_matrices — (..., 4, 4)
+    с совместимыми ведущими осями.
+    """
+    inverse = np.linalg.inv(camera_matrices)
+    local = np.einsum("...ij,...j->...i", inverse[..., :3, :3], positions) + inverse[..., :3, 3]
+    lateral = np.hypot(local[..., 0], local[..., 2])
+    return np.clip(local[..., 0] / np.maximum(lateral, 1e-9), -1.0, 1.0)
+
+
+def radial_velocity(distances, fps):
+    """
+    Радиальная скорость источников (frames, ...) по покадровым расстояниям
+    до камеры: производная расстояния по времени (центральные разности),
+    больше нуля — источник удаляется.
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    if len(distances) < 2:
+        return np.zeros_like(distances)
+    return np.gradient(distances, axis=0) * fps
+
+
+def doppler_rate(velocity, speed_of_sound=SPEED_OF_SOUND):
+    """
+    Скорость воспроизведения по эффекту Доплера c / (c + v): приближающийся
+    источник звучит выше, удаляющийся — ниже. Скорость ограничена
+    DOPPLER_MAX_VELOCITY от скорости звука.
+    """
+    limit = DOPPLER_MAX_VELOCITY * speed_of_sound
+    return speed_of_sound / (speed_of_sound + np.clip(velocity, -limit, limit))
+
+
+# ------------------------------
+# Источники звука и их дорожки
+# ------------------------------
+def find_emitters(scene):
+    """Список (obj, entry, sound) объектов сцены с привязанным звуком."""
+    emitters = []
+    for obj in scene.objects:
+        if not getattr(obj, "sound_synth_attached_sounds", None):
+            continue
+        entry = obj.sound_synth_attached_sounds[0]
+        sound = bpy.data.sounds.get(entry.sound_name)
+        if sound:
+            emitters.append((obj, entry, sound))
+    return emitters
+
+
+def emitter_strips(scene, obj, sound):
+    """
+    Звуковые дорожки VSE источника obj: воспроизводят sound и названы
+    "<object>_<sound>_<start_frame>" (см. utils.add_sound_to_timeline).
+    """
+    if not scene.sequence_editor:
+        return []
+    prefix = f"{obj.name}_"
+    return [seq for seq in scene.sequence_editor.sequences_all
+            if seq.type == 'SOUND' and seq.sound == sound and seq.name.startswith(prefix)]
+
+
+# ------------------------------
+# Индекс источник -> звук -> дорожки для обработчиков кадра
+# ------------------------------
+EMITTER_INDEX = None  # Глобальный индекс, строится в get_emitter_index()
+
+# Типы ID, изменение которых может поменять состав индекса
+_INDEX_ID_TYPES = ('OBJECT', 'SOUND', 'COLLECTION')
+
+
+class EmitterRecord:
+    """Источник звука: объект, его запись, звук и дорожки VSE с этим звуком."""
+
+    __slots__ = ("obj", "entry", "sound", "strips", "file_exists", "repeat_frames")
+
+    def __init__(self, obj, entry, sound, strips, file_exists):
+        self.obj = obj
+        self.entry = entry
+        self.sound = sound
+        self.strips = strips
+        self.file_exists = file_exists
+        self.repeat_frames = set(utils.parse_repeat_frames(entry.repeat_frames))
+
+
+class EmitterIndex:
+    """
+    Источники звука сцены с их дорожками, собранные за один проход по
+    scene.objects и sequence_editor.sequences_all. Обработчики кадра берут
+    записи отсюда вместо поиска звуков, файлов и дорожек на каждом кадре.
+
+    Для пакетного расчёта (см. update_emitter_strips) индекс хранит массивы:
+    номера источников в scene.objects, их spectral_mod, плоский список
+    дорожек с номером источника для каждой и последние записанные в дорожки
+    громкость и панораму.
+
+    Индекс сбрасывается обработчиком depsgraph_update_post при изменении
+    объектов или звуков, а также после загрузки файла и отмены действия;
+    добавление и удаление дорожек обнаруживается по их числу.
+    """
+
+    def __init__(self, scene):
+        self.scene_name = scene.name
+        strips_by_sound = {}
+        sequences = scene.sequence_editor.sequences_all if scene.sequence_editor else []
+        for seq in sequences:
+            if seq.type == 'SOUND' and seq.sound:
+                strips_by_sound.setdefault(seq.sound.name, []).append(seq)
+        self.strip_count = len(sequences)
+        # Файл каждого звука проверяется один раз, а не для каждого источника
+        file_exists = {}
+        self.records = []
+        for obj, entry, sound in find_emitters(scene):
+            if sound.name not in file_exists:
+                file_exists[sound.name] = os.path.exists(bpy.path.abspath(sound.filepath))
+            self.records.append(EmitterRecord(obj, entry, sound, strips_by_sound.get(sound.name, []),
+                                              file_exists[sound.name]))
+
+        self.object_count = len(scene.objects)
+        object_numbers = {obj.name: i for i, obj in enumerate(scene.objects)}
+        self.object_indices = np.array([object_numbers[r.obj.name] for r in self.records], dtype=np.intp)
+        self.spectral_mod = np.array([r.entry.spectral_mod for r in self.records])
+        # Матрицы всех объектов на текущем и предыдущем вызове (см. moved)
+        self._matrices = np.empty(self.object_count * 16, dtype=np.float32)
+        self._previous = np.full(self.object_count * 16, np.nan, dtype=np.float32)
+        self._previous_camera = None
+        self._previous_settings = None
+
+        # Дорожку с общим звуком получает источник, чьё имя стоит в её названии
+        # "<object>_<sound>_<start_frame>", иначе — первый источник с этим звуком
+        by_name = {}
+        first_by_sound = {}
+        for i, record in enumerate(self.records):
+            if not record.file_exists:
+                print(f"[Sound Synth] ❌ Файл звука '{record.sound.filepath}' не найден!")
+                continue
+            by_name[(record.obj.name, record.sound.name)] = i
+            first_by_sound.setdefault(record.sound.name, i)
+        owners = {}
+        for sound_name, i in first_by_sound.items():
+            for seq in strips_by_sound.get(sound_name, ()):
+                if seq.get(BAKED_KEY):
+                    continue
+                obj_name = seq.name.rpartition(f"_{sound_name}_")[0]
+                owners[seq.name] = (seq, by_name.get((obj_name, sound_name), i))
+        self.strips = [seq for seq, _ in owners.values()]
+        self.strip_emitters = np.array([i for _, i in owners.values()], dtype=np.intp)
+        self.applied_gain = np.full(len(self.strips), np.nan)
+        self.applied_pan = np.full(len(self.strips), np.nan)
+
+        # Кадры запуска (начало интервала и повторы) -> записи
+        self.triggers = {}
+        for record in self.records:
+            for frame in {record.entry.frame_start} | record.repeat_frames:
+                self.triggers.setdefault(frame, []).append(record)
+        print(f"[DEBUG] Индекс источников звука: {len(self.records)} объект(ов), {self.strip_count} дорожек")
+
+    def valid_for(self, scene):
+        strip_count = len(scene.sequence_editor.sequences_all) if scene.sequence_editor else 0
+        return (scene.name == self.scene_name and strip_count == self.strip_count
+                and len(scene.objects) == self.object_count)
+
+    def moved(self, scene, camera, settings):
+        """
+        Читает матрицы всех объектов одним вызовом foreach_get. Возвращает False,
+        если с прошлого вызова не сдвинулись ни объекты, ни камера и не менялись
+        настройки затухания, — тогда пересчитывать нечего.
+        """
+        self._matrices, self._previous = self._previous, self._matrices
+        scene.objects.foreach_get("matrix_world", self._matrices)
+        static = (settings == self._previous_settings
+                  and np.array_equal(camera, self._previous_camera)
+                  and np.array_equal(self._matrices, self._previous))
+        self._previous_camera, self._previous_settings = camera, settings
+        return not static
+
+    def positions(self):
+        """Мировые позиции источников (emitters, 3) из матриц, прочитанных в moved()."""
+        # matrix_world хранится по столбцам: перенос — в четвёртой строке после reshape
+        return self._matrices.reshape(-1, 4, 4)[self.object_indices, 3, :3].astype(np.float64)
+
+
+# Изменения меньше порога не записываются в дорожки: каждая запись заставляет
+# аудиосистему пересчитать звук (громкость линейная, панорама в [-1, 1])
+GAIN_EPSILON = 1e-3
+PAN_EPSILON = 1e-3
+
+
+def update_emitter_strips(scene, index):
+    """
+    Пакетный расчёт для всех источников индекса за один вызов: расстояния до
+    камеры, затухание, spectral_mod и панорама. В дорожки записываются только
+    значения, отличающиеся от последних записанных больше чем на GAIN_EPSILON /
+    PAN_EPSILON. Если ничего не сдвинулось, расчёт пропускается. Возвращает
+    число обновлённых дорожек.
+    """
+    if not index.strips:
+        return 0
+    camera = np.array(scene.camera.matrix_world)
+    settings = (scene.sound_synth_attenuation_factor, scene.sound_synth_attenuation_enable)
+    if not index.moved(scene, camera, settings):
+        return 0
+    positions = index.positions()
+    distances = np.linalg.norm(positions - camera[:3, 3], axis=1)
+    gains = attenuation_gain(distances, *settings, index.spectral_mod)[index.strip_emitters]
+    pans = camera_space_pan(positions, camera)[index.strip_emitters]
+
+    # Сравнение через <=, чтобы ещё не записанные значения (NaN) считались изменившимися
+    changed = np.flatnonzero(~((np.abs(gains - index.applied_gain) <= GAIN_EPSILON)
+                               & (np.abs(pans - index.applied_pan) <= PAN_EPSILON)))
+    for i in changed.tolist():
+        seq = index.strips[i]
+        seq.volume = gains[i]
+        seq.pan = pans[i]
+    index.applied_gain[changed] = gains[changed]
+    index.applied_pan[changed] = pans[changed]
+    return len(changed)
+
+
+def get_emitter_index(scene):
+    """Возвращает индекс источников сцены, перестраивая его при необходимости."""
+    global EMITTER_INDEX
+    _ensure_index_handlers()
+    if EMITTER_INDEX is None or not EMITTER_INDEX.valid_for(scene):
+        EMITTER_INDEX = EmitterIndex(scene)
+    return EMITTER_INDEX
+
+
+def invalidate_emitter_index(*_):
+    global EMITTER_INDEX
+    EMITTER_INDEX = None
+
+
+@bpy.app.handlers.persistent
+def _on_depsgraph_update(scene, depsgraph):
+    # Запись громкости дорожек обновляет только сцену — индекс при этом не сбрасывается
+    if EMITTER_INDEX is not None and any(depsgraph.id_type_updated(t) for t in _INDEX_ID_TYPES):
+        invalidate_emitter_index()
+
+
+@bpy.app.handlers.persistent
+def _on_index_reset(*_):
+    invalidate_emitter_index()
+
+
+def _ensure_index_handlers():
+    handlers = bpy.app.handlers
+    if _on_depsgraph_update not in handlers.depsgraph_update_post:
+        handlers.depsgraph_update_post.append(_on_depsgraph_update)
+        for handler_list in (handlers.load_post, handlers.undo_post, handlers.redo_post):
+            handler_list.append(_on_index_reset)
+
+
+def remove_index_handlers():
+    handlers = bpy.app.handlers
+    for handler_list, handler in ((handlers.depsgraph_update_post, _on_depsgraph_update),
+                                  (handlers.load_post, _on_index_reset),
+                                  (handlers.undo_post, _on_index_reset),
+                                  (handlers.redo_post, _on_index_reset)):
+        if handler in handler_list:
+            handler_list.remove(handler)
+    invalidate_emitter_index()
+
+
+# ------------------------------
+# Выборка траекторий
+# ------------------------------
+def _own_frame_handlers():
+    return [h for h in bpy.app.handlers.frame_change_post
+            if getattr(h, "__module__", "").startswith(__package__ or __name__)]
+
+
+def sample_trajectories(scene, objects, frames):
+    """
+    Один проход по кадрам: мировые позиции objects (frames, objects, 3) и
+    матрицы камеры (frames, 4, 4). Позиции всех объектов читаются одним
+    foreach_get на кадр. Обработчики кадра аддона на время прохода
+    отключаются, текущий кадр сцены восстанавливается.
+    """
+    object_numbers = {obj.name: i for i, obj in enumerate(scene.objects)}
+    indices = np.array([object_numbers[obj.name] for obj in objects], dtype=np.intp)
+    matrices = np.empty(len(object_numbers) * 16, dtype=np.float32)
+    positions = np.empty((len(frames), len(objects), 3))
+    cameras = np.empty((len(frames), 4, 4))
+    own_handlers = _own_frame_handlers()
+    for handler in own_handlers:
+        bpy.app.handlers.frame_change_post.remove(handler)
+    current = scene.frame_current
+    try:
+        for i, frame in enumerate(frames):
+            scene.frame_set(int(frame))
+            cameras[i] = scene.camera.matrix_world
+            scene.objects.foreach_get("matrix_world", matrices)
+            positions[i] = matrices.reshape(-1, 4, 4)[indices, 3, :3]
+    finally:
+        scene.frame_set(current)
+        bpy.app.handlers.frame_change_post.extend(own_handlers)
+    return positions, cameras
+
+
+# ------------------------------
+# Быстрая выборка позиций (без пересчёта всей сцены)
+# ------------------------------
+_POSITION_PATHS = ("location", "delta_location")
+
+
+def _fcurve_driven(obj):
+    """
+    True, если мировая позиция объекта равна location + delta_location и
+    анимирована только F-кривыми действия: нет родителя, ограничений,
+    драйверов и полос NLA.
+    """
+    if obj.parent is not None or len(obj.constraints):
+        return False
+    animation = obj.animation_data
+    if animation is None:
+        return True
+    return not len(animation.drivers) and not any(len(track.strips) for track in animation.nla_tracks)
+
+
+def _fcurve_positions(obj, frames):
+    """Позиции (frames, 3) по F-кривым location / delta_location объекта."""
+    components = {path: np.tile(np.array(getattr(obj, path), dtype=np.float64), (len(frames), 1))
+                  for path in _POSITION_PATHS}
+    action = obj.animation_data.action if obj.animation_data else None
+    if action is not None:
+        for fcurve in action.fcurves:
+            if fcurve.data_path in components and not fcurve.mute:
+                components[fcurve.data_path][:, fcurve.array_index] = [fcurve.evaluate(f) for f in frames]
+    return components["location"] + components["delta_location"]
+
+
+def sample_positions(scene, objects, frames, step=1):
+    """
+    Мировые позиции objects (frames, objects, 3) с минимальной ценой.
+
+    Объекты, позиция которых задаётся только F-кривыми (см. _fcurve_driven),
+    вычисляются прямо по кривым, без scene.frame_set. Для остальных (родители,
+    ограничения, драйверы) кадры переключаются, но только раз в step кадров.
+    При step > 1 позиции между опорными кадрами интерполируются линейно.
+    """
+    frames = np.asarray(frames)
+    coarse = frames[::step]
+    if coarse[-1] != frames[-1]:
+        coarse = np.append(coarse, frames[-1])
+    positions = np.empty((len(coarse), len(objects), 3))
+    fallback = []
+    for j, obj in enumerate(objects):
+        if _fcurve_driven(obj):
+            positions[:, j] = _fcurve_positions(obj, coarse)
+        else:
+            fallback.append(j)
+    if fallback:
+        print(f"[DEBUG] Позиции {len(fallback)} объект(ов) считаются через frame_set "
+              f"({len(coarse)} кадров из {len(frames)})")
+        positions[:, fallback] = sample_trajectories(scene, [objects[j] for j in fallback], coarse)[0]
+    if len(coarse) == len(frames):
+        return positions
+    flat = positions.reshape(len(coarse), -1)
+    dense = np.stack([np.interp(frames, coarse, column) for column in flat.T], axis=1)
+    return dense.reshape(len(frames), len(objects), 3)
+
+
+# ------------------------------
+# Запись F-кривых
+# ------------------------------
+def simplify_keyframes(values, tolerance=BAKE_TOLERANCE):
+    """
+    Индексы ключей, которые нужно сохранить, чтобы линейная интерполяция
+    между ними отклонялась от values не более чем на tolerance
+    (Рамер — Дуглас — Пекер по вертикальному отклонению).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 3:
+        return np.arange(len(values))
+    keep = np.zeros(len(values), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(values) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        t = np.arange(1, last - first) / (last - first)
+        line = values[first] + t * (values[last] - values[first])
+        error = np.abs(values[first + 1:last] - line)
+        worst = int(np.argmax(error))
+        if error[worst] > tolerance:
+            split = first + 1 + worst
+            keep[split] = True
+            stack.extend(((first, split), (split, last)))
+    return np.flatnonzero(keep)
+
+
+def write_fcurve(action, data_path, frames, values, group=FCURVE_GROUP):
+    """
+    Заменяет F-кривую data_path ключами (frames, values) с линейной
+    интерполяцией. Ключи записываются одним вызовом foreach_set.
+    """
+    fcurve = action.fcurves.find(data_path)
+    if fcurve is not None:
+        action.fcurves.remove(fcurve)
+    fcurve = action.fcurves.new(data_path, action_group=group)
+    points = fcurve.keyframe_points
+    points.add(len(frames))
+    co = np.empty((len(frames), 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+    points.foreach_set("co", co.ravel())
+    points.foreach_set("interpolation", np.full(len(frames), _INTERPOLATION_LINEAR, dtype=np.int32))
+    fcurve.update()
+    return fcurve
+
+
+def _scene_action(scene):
+    animation = scene.animation_data or scene.animation_data_create()
+    if animation.action is None:
+        animation.action = bpy.data.actions.new(f"{scene.name}Action")
+    return animation.action
+
+
+# ------------------------------
+# Запекание затухания и панорамы
+# ------------------------------
+def emitter_envelopes(scene, emitters, frames):
+    """
+    Громкость, панорама и доплеровская скорость воспроизведения источников
+    emitters (см. find_emitters) на кадрах frames: три массива (frames,
+    emitters). Позиции источников и камеры берутся за один проход по
+    кадрам, остальное считается для всех кадров сразу.
+    """
+    objects = [obj for obj, _, _ in emitters]
+    positions, cameras = sample_trajectories(scene, objects, frames)
+    distances = np.linalg.norm(positions - cameras[:, None, :3, 3], axis=2)
+    spectral_mod = np.array([entry.spectral_mod for _, entry, _ in emitters])
+    gains = attenuation_gain(distances, scene.sound_synth_attenuation_factor,
+                             scene.sound_synth_attenuation_enable, spectral_mod)
+    pans = camera_space_pan(positions, cameras[:, None])
+    fps = scene.render.fps / scene.render.fps_base
+    velocity = radial_velocity(distances * scene.unit_settings.scale_length, fps)
+    return gains, pans, doppler_rate(velocity)
+
+
+def bake_emitters(scene, frame_start=None, frame_end=None, simplify=True,
+                  tolerance=BAKE_TOLERANCE, bake_pan=True):
+    """
+    Запекает громкость (и панораму) всех дорожек источников звука в F-кривые
+    сцены. Позиции источников и камеры берутся за один проход по кадрам;
+    громкость и панорама считаются для всех кадров сразу. После запекания
+    воспроизведение не требует Python на каждом кадре.
+
+    Возвращает (число дорожек, число записанных ключей).
+    """
+    if not scene.camera:
+        raise ValueError("Нет камеры на сцене")
+    emitters = find_emitters(scene)
+    if not emitters:
+        return 0, 0
+
+    frame_start = scene.frame_start if frame_start is None else frame_start
+    frame_end = scene.frame_end if frame_end is None else frame_end
+    frames = np.arange(frame_start, frame_end + 1)
+    gains, pans, _ = emitter_envelopes(scene, emitters, frames)
+
+    action = _scene_action(scene)
+    strips = keys = 0
+    for j, (obj, entry, sound) in enumerate(emitters):
+        for seq in emitter_strips(scene, obj, sound):
+            # Ключи только на интервале дорожки (с запасом в кадр на краях)
+            inside = (frames >= seq.frame_final_start - 1) & (frames <= seq.frame_final_end + 1)
+            if not inside.any():
+                continue
+            curves = [("volume", gains[inside, j])]
+            if bake_pan:
+                curves.append(("pan", pans[inside, j]))
+            for prop, values in curves:
+                index = simplify_keyframes(values, tolerance) if simplify else np.arange(len(values))
+                write_fcurve(action, seq.path_from_id(prop), frames[inside][index], values[index])
+                keys += len(index)
+            seq[BAKED_KEY] = True
+            strips += 1
+    invalidate_emitter_index()  # Запечённые дорожки исключаются из пакетного обновления
+    print(f"[Sound Synth] Запечено дорожек: {strips}, ключей: {keys} "
+          f"(кадры {frame_start}-{frame_end}, источников: {len(emitters)})")
+    return strips, keys
+
+
+def clear_bake(scene):
+    """Удаляет запечённые F-кривые громкости и панорамы и метки дорожек."""
+    if not scene.sequence_editor:
+        return 0
+    action = scene.animation_data.action if scene.animation_data else None
+    cleared = 0
+    for seq in scene.sequence_editor.sequences_all:
+        if not seq.get(BAKED_KEY):
+            continue
+        if action is not None:
+            for prop in ("volume", "pan"):
+                fcurve = action.fcurves.find(seq.path_from_id(prop))
+                if fcurve is not None:
+                    action.fcurves.remove(fcurve)
+        del seq[BAKED_KEY]
+        cleared += 1
+    invalidate_emitter_index()
+    return cleared
+
+
+# ------------------------------
+# Описание сцены для офлайн-сведения (mixdown.py)
+# ------------------------------
+def emitter_start_frames(entry, scene_frame_end):
+    """
+    Кадры запуска звука записи entry — те же, что получают дорожки VSE:
+    начало интервала, кадры repeat_frames и повторы через repeat_interval
+    до конца сцены (см. add_sound_with_repeats и handlers.sound_playback).
+    """
+    starts = {entry.frame_start}
+    starts.update(utils.parse_repeat_frames(entry.repeat_frames))
+    if entry.repeat_interval > 0:
+        frame = entry.frame_end + entry.repeat_interval
+        while frame < scene_frame_end:
+            starts.add(frame)
+            frame += entry.repeat_interval
+    return sorted(starts)
+
+
+def describe_emitters(scene, frame_start=None, frame_end=None, doppler=True):
+    """
+    Описания источников звука сцены для mixdown.render_mixdown — словари
+    без ссылок на bpy, которые можно передать в дочерние процессы:
+    name, source (абсолютный путь к файлу), starts (кадры запуска),
+    duration (длина звучания в кадрах) и покадровые громкость gain,
+    панорама pan и доплеровская скорость воспроизведения rate (единицы
+    без doppler) на кадрах frame_start..frame_end. Порядок — по имени
+    объекта, чтобы результат сведения не зависел от порядка scene.objects.
+    """
+    if not scene.camera:
+        raise ValueError("Нет камеры на сцене")
+    emitters = sorted(find_emitters(scene), key=lambda emitter: emitter[0].name)
+    if not emitters:
+        return []
+
+    frame_start = scene.frame_start if frame_start is None else frame_start
+    frame_end = scene.frame_end if frame_end is None else frame_end
+    frames = np.arange(frame_start, frame_end + 1)
+    gains, pans, rates = emitter_envelopes(scene, emitters, frames)
+    if not doppler:
+        rates = np.ones_like(rates)
+    return [
+        {
+            "name": obj.name,
+            "source": bpy.path.abspath(sound.filepath),
+            "starts": emitter_start_frames(entry, scene.frame_end),
+            "duration": entry.frame_end - entry.frame_start,
+            "gain": gains[:, j].astype(np.float32),
+            "pan": pans[:, j].astype(np.float32),
+            "rate": rates[:, j].astype(np.float32),
+        }
+        for j, (obj, entry, sound) in enumerate(emitters)
+    ]
@@ -0,0 +1,41 @@
+"""
+Тесты модулей аддона, которые не зависят от bpy (dsp, cache, mixdown).
+
+Каталог аддона добавляется в sys.path, и модули импортируются как
+верхнеуровневые — так же, как в benchmarks/bench_dsp.py.
+Запуск: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dsp  # noqa: E402
+
+FRAME_RATE = 48000
+
+
+def make_signal(seconds=1.0, frame_rate=FRAME_RATE, channels=2, seed=0):
+    """Смесь синусов с разной фазой по каналам и белого шума, float32 (frames, channels)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * frame_rate)) / frame_rate
+    signal = np.empty((len(t), channels), dtype=np.float32)
+    for channel in range(channels):
+        tones = sum(np.sin(2 * np.pi * f * t + channel) for f in (110.0, 440.0, 1760.0)) / 3
+        signal[:, channel] = 0.4 * tones + 0.05 * rng.standard_normal(len(t))
+    return signal
+
+
+@pytest.fixture
+def signal():
+    return make_signal()
+
+
+@pytest.fixture(autouse=True)
+def decode_cache(tmp_path):
+    """Свой кэш PCM на каждый тест: общий каталог во временной папке системы не трогается."""
+    cache = dsp.init_decode_cache(directory=str(tmp_path / "pcm"))
+    yield cache
+    dsp.DECODE_CACHE = None
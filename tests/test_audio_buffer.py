@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import dsp
+from conftest import FRAME_RATE, make_signal
+
+
+def test_mono_and_dtype_are_normalized():
+    buffer = dsp.AudioBuffer(np.arange(8, dtype=np.float64), FRAME_RATE)
+    assert buffer.samples.shape == (8, 1) and buffer.dtype == np.float32
+    assert buffer.layout == "mono" and buffer.samples.flags.c_contiguous
+
+
+def test_layout_must_match_channels():
+    with pytest.raises(ValueError):
+        dsp.AudioBuffer(np.zeros((4, 2), dtype=np.float32), FRAME_RATE, "5.1")
+
+
+def test_mono_is_duplicated_to_stereo():
+    mono = dsp.AudioBuffer(make_signal(0.1, channels=1), FRAME_RATE)
+    stereo = mono.remix("stereo")
+    assert stereo.layout == "stereo"
+    np.testing.assert_array_equal(stereo.samples[:, 0], mono.samples[:, 0])
+    np.testing.assert_array_equal(stereo.samples[:, 1], mono.samples[:, 0])
+
+
+def test_surround_downmix_drops_lfe():
+    samples = np.zeros((4, 6), dtype=np.float32)
+    samples[:, 2] = 1.0  # Центр: по -3 dB в оба канала
+    samples[:, 3] = 1.0  # LFE отбрасывается
+    stereo = dsp.AudioBuffer(samples, FRAME_RATE).remix("stereo")
+    np.testing.assert_allclose(stereo.samples, np.sqrt(0.5), rtol=1e-6)
+    mono = dsp.AudioBuffer(samples, FRAME_RATE).remix("mono")
+    np.testing.assert_allclose(mono.samples, np.sqrt(0.5), rtol=1e-6)
+
+
+def test_unknown_layout_is_rejected():
+    with pytest.raises(ValueError):
+        dsp.AudioBuffer(make_signal(0.01), FRAME_RATE).remix("9.2")
+
+
+def test_load_returns_a_writable_copy_of_the_cached_pcm(tmp_path):
+    path = dsp.write_wav(make_signal(0.1), FRAME_RATE, str(tmp_path / "source.wav"))
+    buffer = dsp.AudioBuffer.load(path)
+    buffer.samples *= 0.0
+    cached, _ = dsp.load_audio(path)
+    assert not cached.flags.writeable and np.any(cached != 0)
+
+
+def test_resample_keeps_layout_and_changes_rate():
+    buffer = dsp.AudioBuffer(make_signal(0.1, frame_rate=44100), 44100).resample(FRAME_RATE)
+    assert buffer.frame_rate == FRAME_RATE and buffer.layout == "stereo"
+    assert buffer.frames == 4800
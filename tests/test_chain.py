@@ -0,0 +1,53 @@
+import numpy as np
+
+import dsp
+from conftest import FRAME_RATE
+
+LINEAR_CHAIN = [
+    ("gain", {"gain_db": -3.0}),
+    ("reverb", {"delay_ms": 50, "decay_dB": 6}),
+    ("delay", {"delay_ms": 120, "decay_dB": 3, "repetitions": 3}),
+    ("eq", {"low_gain": 3.0, "high_gain": -2.0}),
+]
+
+
+def run_plan(plan, samples):
+    for _, stage in plan:
+        samples = stage(samples, FRAME_RATE)
+    return samples
+
+
+def run_one_by_one(effects, samples):
+    for name, params in effects:
+        samples = dsp.EFFECTS[name](samples, FRAME_RATE, **params)
+    return samples
+
+
+def test_linear_effects_fuse_into_one_fir(signal):
+    plan = dsp.compile_chain(LINEAR_CHAIN, FRAME_RATE, len(signal))
+    assert [label for label, _ in plan] == ["fir(gain+reverb+delay+eq)"]
+
+
+def test_fused_chain_matches_effects_one_by_one(signal):
+    plan = dsp.compile_chain(LINEAR_CHAIN, FRAME_RATE, len(signal))
+    fused = run_plan(plan, signal.copy())
+    expected = run_one_by_one(LINEAR_CHAIN, signal.copy())
+    np.testing.assert_allclose(fused, expected, atol=1e-4)
+
+
+def test_lowpass_in_chain_matches_away_from_edges(signal):
+    """Некаузальное ядро lowpass при объединении может отличаться только у краёв."""
+    effects = LINEAR_CHAIN + [("lowpass", {"cutoff_frequency": 3000})]
+    plan = dsp.compile_chain(effects, FRAME_RATE, len(signal))
+    fused = run_plan(plan, signal.copy())
+    expected = run_one_by_one(effects, signal.copy())
+    edge = len(dsp.design_lowpass_kernel(3000, FRAME_RATE))
+    np.testing.assert_allclose(fused[edge:-edge], expected[edge:-edge], atol=1e-4)
+
+
+def test_nonlinear_stage_splits_groups(signal):
+    effects = [LINEAR_CHAIN[0], ("pitch_shift", {"semitones": 3}), LINEAR_CHAIN[3], LINEAR_CHAIN[2]]
+    plan = dsp.compile_chain(effects, FRAME_RATE, len(signal))
+    assert [label for label, _ in plan] == ["gain", "pitch_shift", "fir(eq+delay)"]
+    fused = run_plan(plan, signal.copy())
+    np.testing.assert_allclose(fused, run_one_by_one(effects, signal.copy()), atol=1e-4)
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+
+import dsp
+from conftest import FRAME_RATE, make_signal
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = []
+    for seed in range(3):
+        path = str(tmp_path / f"source_{seed}.wav")
+        dsp.write_wav(make_signal(0.5, seed=seed), FRAME_RATE, path)
+        paths.append(path)
+    return paths
+
+
+def small_cache(tmp_path, max_bytes=300 * 1024):
+    """Кэш, в памяти которого помещается один буфер 0.5 с стерео float32 (~188 КБ)."""
+    return dsp.DecodedAudioCache(max_bytes, str(tmp_path / "spill"), 64 * 1024 * 1024)
+
+
+def test_hits_return_the_same_read_only_buffer(tmp_path, sources):
+    decode_cache = small_cache(tmp_path)
+    samples, frame_rate = decode_cache.get(sources[0])
+    again, _ = decode_cache.get(sources[0])
+    assert again is samples and frame_rate == FRAME_RATE
+    assert not samples.flags.writeable
+    assert decode_cache.stats()["hits"] == 1 and decode_cache.stats()["misses"] == 1
+
+
+def test_evicted_buffer_is_spilled_and_reloaded(tmp_path, sources):
+    decode_cache = small_cache(tmp_path)
+    first, _ = decode_cache.get(sources[0])
+    first = np.array(first)
+    decode_cache.get(sources[1])  # Вытесняет первый буфер на диск
+    assert decode_cache.stats()["entries"] == 1
+    assert decode_cache.stats()["bytes_spilled"] > 0
+
+    reloaded, frame_rate = decode_cache.get(sources[0])
+    assert isinstance(reloaded, np.memmap) and frame_rate == FRAME_RATE
+    np.testing.assert_array_equal(reloaded, first)
+    assert decode_cache.stats()["disk_hits"] == 1
+
+
+def test_persisted_pcm_is_found_by_the_next_session(tmp_path, sources):
+    spill_path = small_cache(tmp_path).persist(sources[2])
+    assert os.path.exists(spill_path) and os.path.exists(dsp.sidecar_path(spill_path))
+
+    next_session = small_cache(tmp_path)
+    samples, _ = next_session.get(sources[2])
+    np.testing.assert_array_equal(samples, dsp.read_wav(sources[2])[0])
+    assert next_session.stats()["disk_hits"] == 1 and next_session.stats()["misses"] == 0
+
+
+def test_changed_source_is_decoded_again(tmp_path, sources):
+    decode_cache = small_cache(tmp_path)
+    decode_cache.persist(sources[0])
+    dsp.write_wav(make_signal(0.25, seed=7), FRAME_RATE, sources[0])
+    os.utime(sources[0], ns=(0, 0))
+    samples, _ = decode_cache.get(sources[0])
+    assert len(samples) == FRAME_RATE // 4
+    assert decode_cache.stats()["misses"] == 2
+
+
+def test_spill_directory_is_trimmed_to_its_limit(tmp_path, sources):
+    decode_cache = dsp.DecodedAudioCache(1, str(tmp_path / "spill"), 400 * 1024)
+    for path in sources:
+        decode_cache.persist(path)
+    assert decode_cache.bytes_spilled <= 400 * 1024
+    assert len(decode_cache._spill_entries()) == 2
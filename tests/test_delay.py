@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import dsp
+from conftest import FRAME_RATE
+
+
+def tap_sum(samples, delay, gain, repetitions):
+    """Эталон: каждый повтор накладывается отдельно."""
+    expected = samples.astype(np.float64)
+    for i in range(1, repetitions + 1):
+        expected[i * delay:] += gain ** i * samples[:-i * delay]
+    return expected
+
+
+@pytest.mark.parametrize("repetitions", [1, 2, 5, 10])
+def test_delay_matches_tap_sum(signal, repetitions):
+    delay = dsp._ms_to_frames(30, FRAME_RATE)
+    gain = dsp._db_to_gain(3)
+    expected = tap_sum(signal, delay, gain, repetitions)
+    result = dsp.apply_delay(signal.copy(), FRAME_RATE, delay_ms=30, decay_dB=3, repetitions=repetitions)
+    np.testing.assert_allclose(result, expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("block", [1000, 1440, 65536])
+def test_delay_blocks_match_whole_signal(signal, block):
+    """Блоки короче, равные и длиннее задержки дают тот же результат, что и весь сигнал."""
+    delay = dsp._ms_to_frames(30, FRAME_RATE)
+    gain = dsp._db_to_gain(3)
+    line = dsp.MultiTapDelay(delay, gain, 3)
+    streamed = signal.copy()
+    for start in range(0, len(streamed), block):
+        line.process_block(streamed[start:start + block])
+    np.testing.assert_allclose(streamed, tap_sum(signal, delay, gain, 3), atol=1e-5)
+
+
+def test_feedback_delay_matches_recursion(signal):
+    delay = dsp._ms_to_frames(30, FRAME_RATE)
+    gain = dsp._db_to_gain(6)
+    expected = signal.astype(np.float64)
+    for start in range(delay, len(expected)):
+        expected[start] += gain * expected[start - delay]
+    result = dsp.apply_delay(signal.copy(), FRAME_RATE, delay_ms=30, decay_dB=6, feedback=True)
+    np.testing.assert_allclose(result, expected, atol=1e-5)
+
+
+def test_undamped_feedback_delay_is_rejected(signal):
+    with pytest.raises(ValueError):
+        dsp.apply_delay(signal.copy(), FRAME_RATE, delay_ms=30, decay_dB=0, feedback=True)
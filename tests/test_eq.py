@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import dsp
+from conftest import FRAME_RATE
+
+
+def direct_form(samples, sos):
+    """Эталон: каскад секций прямой формы I, отсчёт за отсчётом."""
+    y = samples.astype(np.float64)
+    for b0, b1, b2, _, a1, a2 in sos:
+        x, y = y, np.zeros_like(y)
+        for n in range(len(x)):
+            y[n] = b0 * x[n]
+            if n >= 1:
+                y[n] += b1 * x[n - 1] - a1 * y[n - 1]
+            if n >= 2:
+                y[n] += b2 * x[n - 2] - a2 * y[n - 2]
+    return y
+
+
+def test_eq_at_zero_db_is_identity(signal):
+    bands = [("peak", 1000.0, 0.0, 1.0), ("lowshelf", 100.0, 0.0, 0.7071)]
+    assert dsp.eq_sections(FRAME_RATE, 0.0, 0.0, bands) == []
+    result = dsp.apply_eq(signal.copy(), FRAME_RATE, low_gain=0.0, high_gain=0.0, bands=bands)
+    np.testing.assert_array_equal(result, signal)
+
+
+@pytest.mark.parametrize("kind", ["lowshelf", "highshelf", "peak"])
+def test_zero_gain_section_passes_signal(signal, kind):
+    """Секция с нулевым усилением — тождественная (b == a)."""
+    section = dsp.design_biquad(kind, 1000.0, FRAME_RATE, 0.0)
+    result = dsp.apply_sos(signal.copy(), FRAME_RATE, [section])
+    np.testing.assert_allclose(result, signal, atol=1e-5)
+
+
+def test_eq_matches_direct_form(signal):
+    sos = dsp.eq_sections(FRAME_RATE, 3.0, -2.0, [("peak", 1000.0, 4.0, 1.0), ("highpass", 40.0, 0.0, 0.7071)])
+    head = signal[:4800]
+    result = dsp.apply_sos(head.copy(), FRAME_RATE, sos)
+    np.testing.assert_allclose(result, direct_form(head, sos), atol=1e-5)
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pytest
+
+import dsp
+import mixdown
+from conftest import FRAME_RATE, make_signal
+
+FPS = 24
+FRAME_START, FRAME_END = 1, 48
+
+
+def emitter(name, source, starts, duration=12, gain=1.0, pan=0.0, rate=1.0):
+    """Описание источника в формате spatial.describe_emitters с постоянными огибающими."""
+    frames = FRAME_END - FRAME_START + 1
+    return {
+        "name": name,
+        "source": source,
+        "starts": list(starts),
+        "duration": duration,
+        "gain": np.full(frames, gain, dtype=np.float32),
+        "pan": np.full(frames, pan, dtype=np.float32),
+        "rate": np.full(frames, rate, dtype=np.float32),
+    }
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return [dsp.encode_audio(make_signal(1.0, seed=seed), FRAME_RATE, str(tmp_path / f"source_{seed}.npy"), "npy")
+            for seed in range(2)]
+
+
+def render(tmp_path, specs, name="mix.npy", **kwargs):
+    output = str(tmp_path / name)
+    mixdown.render_mixdown(specs, output, FRAME_RATE, FPS, FRAME_START, FRAME_END, "npy", **kwargs)
+    return dsp.load_npy(output)[0]
+
+
+def test_pan_gains_are_constant_power():
+    pan = np.linspace(-1.0, 1.0, 41)
+    left, right = mixdown.pan_gains(pan)
+    np.testing.assert_allclose(left ** 2 + right ** 2, 2.0)
+    np.testing.assert_allclose(mixdown.pan_gains(0.0), (1.0, 1.0))
+    np.testing.assert_allclose(mixdown.pan_gains(-1.0), (np.sqrt(2.0), 0.0), atol=1e-12)
+
+
+def test_triggers_are_placed_and_trimmed(tmp_path, sources):
+    mix = render(tmp_path, [emitter("A", sources[0], starts=[1, 25], duration=12, gain=0.5)])
+    assert mix.shape == (mixdown.mix_length(FRAME_RATE, FPS, FRAME_START, FRAME_END), 2)
+
+    window = 12 * FRAME_RATE // FPS  # Звук обрезается по длине интервала записи
+    offset = 24 * FRAME_RATE // FPS
+    source = dsp.load_npy(sources[0])[0]
+    expected = np.zeros_like(mix)
+    expected[:window] += 0.5 * source[:window]
+    expected[offset:offset + window] += 0.5 * source[:window]
+    np.testing.assert_allclose(mix, expected, atol=1e-6)
+
+
+def test_hard_pan_silences_the_other_channel(tmp_path, sources):
+    mix = render(tmp_path, [emitter("A", sources[0], starts=[1], pan=1.0)])
+    assert np.abs(mix[:, 0]).max() < 1e-6 and np.abs(mix[:, 1]).max() > 0.1
+
+
+def test_mix_is_the_sum_of_the_stems(tmp_path, sources):
+    specs = [emitter("A/1", sources[0], starts=[1], pan=-0.5), emitter("B", sources[1], starts=[13], gain=0.7)]
+    stems = tmp_path / "stems"
+    mix = render(tmp_path, specs, stems_directory=str(stems), max_workers=1)
+    names = sorted(os.listdir(stems))
+    assert [mixdown.stem_filename(spec["name"], "npy") for spec in specs] == [n for n in names if n.endswith(".npy")]
+    total = sum(dsp.load_npy(str(stems / mixdown.stem_filename(spec["name"], "npy")))[0] for spec in specs)
+    np.testing.assert_allclose(mix, total, atol=1e-6)
+
+
+def test_process_pool_matches_in_process(tmp_path, sources):
+    specs = [emitter("A", sources[0], starts=[1, 20], rate=1.1), emitter("B", sources[1], starts=[5], pan=0.3)]
+    in_process = render(tmp_path, specs, "serial.npy", max_workers=1)
+    pooled = render(tmp_path, specs, "pool.npy", max_workers=2)
+    np.testing.assert_array_equal(pooled, in_process)
+
+
+def test_unit_rate_time_warp_is_identity():
+    """Без шума: интерполирующий фильтр срезает полосу у частоты Найквиста."""
+    t = np.arange(FRAME_RATE // 5) / FRAME_RATE
+    source = np.stack([np.sin(2 * np.pi * 440 * t), np.sin(2 * np.pi * 1760 * t)], axis=1).astype(np.float32)
+    rates = np.ones(10)
+    warped = dsp.time_warp(source, rates, FRAME_RATE / FPS, length=len(source) // 2)
+    # Первые отсчёты окна интерполяции захватывают нули до начала сигнала
+    edge = dsp.RESAMPLE_ZERO_CROSSINGS
+    np.testing.assert_allclose(warped[edge:], source[edge:len(source) // 2], atol=1e-4)
+
+
+def test_empty_scene_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        render(tmp_path, [])
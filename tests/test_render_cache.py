@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import pytest
+
+import cache
+import dsp
+from conftest import FRAME_RATE, make_signal
+
+EFFECTS = [("reverb", {"delay_ms": 100, "decay_dB": 6}), ("eq", {"low_gain": 3.0, "high_gain": -2.0})]
+
+
+@pytest.fixture
+def render_cache(tmp_path):
+    return cache.RenderCache(str(tmp_path / "renders"), 64 * 1024 * 1024)
+
+
+@pytest.fixture
+def source(tmp_path):
+    return dsp.write_wav(make_signal(0.1), FRAME_RATE, str(tmp_path / "source.wav"))
+
+
+def test_key_is_stable(render_cache, source, tmp_path):
+    key = render_cache.key(source, EFFECTS, "wav16")
+    assert key == render_cache.key(source, [tuple(e) for e in EFFECTS], "wav16")
+    # Новый экземпляр (следующий сеанс) и копия файла с тем же содержимым дают тот же ключ
+    copy = shutil.copy(source, str(tmp_path / "copy.wav"))
+    assert cache.RenderCache(str(tmp_path / "other"), 1).key(copy, EFFECTS, "wav16") == key
+
+
+def test_key_ignores_parameter_order_and_float_noise(render_cache, source):
+    effects = [("reverb", {"decay_dB": 6, "delay_ms": 100}), ("eq", {"high_gain": -2.0, "low_gain": 3.0 + 1e-9})]
+    assert render_cache.key(source, effects, "wav16") == render_cache.key(source, EFFECTS, "wav16")
+
+
+def test_key_changes_with_inputs(render_cache, source):
+    key = render_cache.key(source, EFFECTS, "wav16")
+    assert render_cache.key(source, EFFECTS, "flac") != key
+    assert render_cache.key(source, EFFECTS, "wav16", output_rate=44100) != key
+    assert render_cache.key(source, EFFECTS[:1], "wav16") != key
+    assert render_cache.key(source, [EFFECTS[0], ("eq", {"low_gain": 4.0, "high_gain": -2.0})], "wav16") != key
+
+
+def test_key_follows_source_content(render_cache, source):
+    key = render_cache.key(source, EFFECTS, "wav16")
+    dsp.write_wav(make_signal(0.1, seed=1), FRAME_RATE, source)
+    os.utime(source, ns=(0, 0))  # mtime меняется, даже если запись уложилась в тот же тик
+    assert render_cache.key(source, EFFECTS, "wav16") != key
+
+
+def test_file_parameters_are_keyed_by_content(render_cache, source, tmp_path):
+    ir = dsp.write_wav(make_signal(0.05, seed=2), FRAME_RATE, str(tmp_path / "ir.wav"))
+    moved = shutil.copy(ir, str(tmp_path / "moved_ir.wav"))
+    key = render_cache.key(source, [("convolution_reverb", {"ir_filepath": ir})], "wav16")
+    assert render_cache.key(source, [("convolution_reverb", {"ir_filepath": moved})], "wav16") == key
+
+
+def test_callable_effects_are_not_cached(render_cache, source):
+    assert render_cache.key(source, EFFECTS + [lambda samples, frame_rate: samples], "wav16") is None
+
+
+def test_render_is_served_from_cache(render_cache, source, monkeypatch):
+    path = render_cache.render(source, EFFECTS, "wav16")
+    assert path == render_cache.path_for(render_cache.key(source, EFFECTS, "wav16"), "wav16")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("повторный рендер вместо попадания в кэш")
+
+    monkeypatch.setattr(dsp, "process_audio", fail)
+    assert render_cache.render(source, EFFECTS, "wav16") == path
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import dsp
+from conftest import FRAME_RATE, make_signal
+
+CHAINS = {
+    "fir": [("gain", {"gain_db": -3.0}), ("delay", {"delay_ms": 120, "decay_dB": 3, "repetitions": 3}),
+            ("eq", {"low_gain": 3.0, "high_gain": -2.0}), ("lowpass", {"cutoff_frequency": 3000})],
+    # Хвост обратной связи длиннее MAX_FIR_SECONDS — обрабатывается линией задержки (STREAM_PROCESSORS)
+    "feedback": [("reverb", {"delay_ms": 50, "decay_dB": 6}),
+                 ("delay", {"delay_ms": 300, "decay_dB": 1, "feedback": True}),
+                 ("eq", {"low_gain": -4.0})],
+}
+
+
+@pytest.fixture
+def source(tmp_path):
+    # Несколько блоков STREAM_BLOCK_FRAMES и неполный последний блок
+    return dsp.write_wav(make_signal(2.1), FRAME_RATE, str(tmp_path / "source.wav"))
+
+
+def render(source, output, effects, streaming):
+    assert dsp.process_audio(source, output, effects, "npy", streaming=streaming) == output
+    samples, frame_rate = dsp.load_npy(output)
+    assert frame_rate == FRAME_RATE
+    return samples
+
+
+@pytest.mark.parametrize("chain", sorted(CHAINS))
+def test_stream_matches_in_memory(tmp_path, source, chain):
+    effects = CHAINS[chain]
+    stages = dsp.compile_stream(effects, FRAME_RATE)
+    assert stages is not None
+    latency = sum(stage.latency for stage in stages)
+
+    in_memory = render(source, str(tmp_path / "memory.npy"), effects, streaming=False)
+    streamed = render(source, str(tmp_path / "stream.npy"), effects, streaming=True)
+    assert streamed.shape == in_memory.shape
+    # Хвосты шагов в потоке не обрезаются, поэтому последние latency отсчётов могут отличаться
+    end = len(in_memory) - latency
+    np.testing.assert_allclose(streamed[:end], in_memory[:end], atol=1e-4)
+
+
+def test_stream_without_effects_copies_input(tmp_path, source):
+    streamed = render(source, str(tmp_path / "stream.npy"), [], streaming=True)
+    np.testing.assert_array_equal(streamed, dsp.read_wav(source)[0])
+
+
+def test_unstreamable_chain_falls_back_to_memory(tmp_path, source):
+    effects = [("pitch_shift", {"semitones": 2})]
+    assert dsp.compile_stream(effects, FRAME_RATE) is None
+    streamed = render(source, str(tmp_path / "stream.npy"), effects, streaming=True)
+    in_memory = render(source, str(tmp_path / "memory.npy"), effects, streaming=False)
+    np.testing.assert_array_equal(streamed, in_memory)